@@ -3,17 +3,24 @@
 Цели:
  - Сконцентрировать доступ к данным (токены, сертификаты, отчёты, регионы, email-конфиг)
  - Инкапсулировать преобразования структур для вкладок GUI
- - Обеспечить точку для последующего кеширования и фоновых обновлений
+ - Следить за файлами конфигурации и каталогом output (QFileSystemWatcher),
+   перечитывать в фоновом потоке только изменившиеся части и сообщать об этом
+   сигналами tokensChanged, certificatesChanged, regionsChanged,
+   reportsChanged, emailConfigChanged
 """
 from __future__ import annotations
 
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 import json
+import os
 import threading
 import sys
 
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
 # Добавляем корень репозитория и импортируем через пакет scripts.*
 root_path = Path(__file__).parent.parent
 scripts_path = root_path / "scripts"
@@ -32,15 +39,36 @@ try:
         mask_token
     )
     from scripts.region_manager import load_regions_data, save_regions_data
-    from scripts.file_utils import get_reports_list
+    from scripts.report_index import get_report_index
     from scripts.email_utils import load_email_config
 except ImportError as e:
     # Отложенный импорт — допустимо в ранних стадиях; логировать в stdout
     print(f"[DataManager] Import error: {e}")
 
 
-class DataManager:
+# Файлы в scripts/ и части данных, которые из них загружаются
+WATCHED_FILES = {
+    "true_api_tokens.json": "tokens",
+    "certificates.json": "certs",
+    "cert_thumbprints.txt": "certs",
+    "regions.json": "regions",
+    "email_config.json": "email",
+}
+
+# Пауза перед обновлением: серия изменений (запись через временный файл,
+# загрузка нескольких отчетов) обрабатывается одним обновлением
+REFRESH_DELAY_MS = 500
+
+
+class DataManager(QObject):
+    tokensChanged = pyqtSignal()
+    certificatesChanged = pyqtSignal()
+    regionsChanged = pyqtSignal()
+    reportsChanged = pyqtSignal()
+    emailConfigChanged = pyqtSignal()
+
     _instance: Optional["DataManager"] = None
+    _initialized = False
     _lock = threading.Lock()
 
     def __new__(cls):
@@ -50,6 +78,11 @@ class DataManager:
         return cls._instance
 
     def __init__(self):
+        # Синглтон: повторный вызов DataManager() не сбрасывает кеши
+        if DataManager._initialized:
+            return
+        super().__init__()
+        DataManager._initialized = True
         # Кеши
         self._tokens: Dict[str, str] = {}
         self._tokens_generated_at: str = "-"
@@ -58,16 +91,21 @@ class DataManager:
         self._regions: Dict[str, Any] = {}
         self._reports_raw: Dict[str, List[Dict[str, Any]]] = {}
         self._email_config: Dict[str, Any] | None = None
+        self._file_keys: Dict[str, Any] = {}
+        self._pending_parts: set = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data-refresh")
         self.refresh_all(initial=True)
+        self._setup_watcher()
 
     # -------------------- PUBLIC API --------------------
     def refresh_all(self, initial: bool = False):
-        """Полное обновление данных."""
-        self._load_tokens()
-        self._load_certs()
-        self._load_regions()
-        self._load_reports()
-        self._load_email()
+        """Полное синхронное обновление данных."""
+        for part in self._loaders():
+            self._reload(part, emit=not initial)
+
+    def refresh_async(self, parts: Optional[List[str]] = None):
+        """Обновление частей данных ("tokens", "certs", "regions", "reports", "email") в фоновом потоке."""
+        self._executor.submit(self._refresh_parts, list(parts or self._loaders()))
 
     # Tokens
     def list_tokens(self) -> List[Dict[str, str]]:
@@ -86,7 +124,7 @@ class DataManager:
         data["generated_at"] = datetime.now().isoformat()
         ok = save_tokens_file(data)
         if ok:
-            self._load_tokens()
+            self._reload("tokens")
         return ok
 
     def update_token(self, old_name: str, new_name: str, new_value: Optional[str]) -> bool:
@@ -106,7 +144,7 @@ class DataManager:
         data["generated_at"] = datetime.now().isoformat()
         ok = save_tokens_file(data)
         if ok:
-            self._load_tokens()
+            self._reload("tokens")
         return ok
 
     def delete_token(self, name: str) -> bool:
@@ -118,7 +156,7 @@ class DataManager:
             data["generated_at"] = datetime.now().isoformat()
             ok = save_tokens_file(data)
             if ok:
-                self._load_tokens()
+                self._reload("tokens")
             return ok
         return False
 
@@ -135,7 +173,7 @@ class DataManager:
         data["certificates"] = certs
         ok = save_certificates_file(data)
         if ok:
-            self._load_certs()
+            self._reload("certs")
         # thumbprints
         tps = load_thumbprints_file()
         if thumbprint not in tps:
@@ -159,7 +197,7 @@ class DataManager:
         found["name"] = new_name
         ok = save_certificates_file({"certificates": certs})
         if ok:
-            self._load_certs()
+            self._reload("certs")
         return ok
 
     def delete_certificate(self, name: str) -> bool:
@@ -170,7 +208,7 @@ class DataManager:
             return False
         ok = save_certificates_file({"certificates": new_list})
         if ok:
-            self._load_certs()
+            self._reload("certs")
         return ok
 
     # Regions
@@ -189,10 +227,15 @@ class DataManager:
         }
         ok = save_regions_data(data)
         if ok:
-            self._load_regions()
+            self._reload("regions")
         return ok
 
     # Reports
+    @property
+    def report_index(self):
+        """Общий каталог отчётов (scripts/report_index.py)."""
+        return get_report_index(refresh=False)
+
     def list_reports_flat(self) -> List[Dict[str, Any]]:
         flat: List[Dict[str, Any]] = []
         for cert, items in self._reports_raw.items():
@@ -219,6 +262,103 @@ class DataManager:
             from main import run_daily_process as core_run  # type: ignore
         return core_run()
 
+    def shutdown(self):
+        """Остановить наблюдение и дождаться фонового обновления"""
+        if hasattr(self, "_watcher"):
+            self._refresh_timer.stop()
+            self._watcher.removePaths(self._watcher.files() + self._watcher.directories())
+        self._executor.shutdown(wait=True)
+
+    # -------------------- WATCHER --------------------
+    def _setup_watcher(self):
+        """Наблюдение за scripts/ (файлы конфигурации) и output/ с подкаталогами сертификатов"""
+        self._watcher = QFileSystemWatcher(self)
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self._refresh_timer.timeout.connect(self._flush_pending)
+
+        # Каталог нужен потому, что файлы сохраняются атомарной заменой,
+        # после которой наблюдение за самим файлом теряется
+        paths = [str(scripts_path)] + [str(scripts_path / name) for name in WATCHED_FILES]
+        self._watch_paths(paths)
+        self._watch_reports_dirs()
+
+        self._watcher.fileChanged.connect(self._on_path_changed)
+        self._watcher.directoryChanged.connect(self._on_path_changed)
+
+    def _watch_paths(self, paths: List[str]):
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        new_paths = [p for p in paths if p not in watched and os.path.exists(p)]
+        if new_paths:
+            self._watcher.addPaths(new_paths)
+
+    def _watch_reports_dirs(self):
+        """Добавить в наблюдение output/ и новые каталоги сертификатов"""
+        base = Path(self.report_index.base_dir)
+        if not base.is_dir():
+            return
+        paths = [str(base)]
+        try:
+            paths.extend(str(p) for p in base.iterdir() if p.is_dir())
+        except OSError:
+            pass
+        self._watch_paths(paths)
+
+    @staticmethod
+    def _file_key(path: Path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _on_path_changed(self, path: str):
+        changed = Path(path)
+        base = Path(self.report_index.base_dir)
+        if changed == base or changed.parent == base:
+            self._pending_parts.add("reports")
+        else:
+            for name, part in WATCHED_FILES.items():
+                if self._file_key(scripts_path / name) != self._file_keys.get(name):
+                    self._pending_parts.add(part)
+            # Замененный файл снова ставится на наблюдение
+            self._watch_paths([str(scripts_path / name) for name in WATCHED_FILES])
+        if self._pending_parts:
+            self._refresh_timer.start()
+
+    def _flush_pending(self):
+        parts, self._pending_parts = self._pending_parts, set()
+        if "reports" in parts:
+            self._watch_reports_dirs()
+        self.refresh_async(sorted(parts))
+
+    def _refresh_parts(self, parts: List[str]):
+        for part in parts:
+            try:
+                self._reload(part)
+            except Exception as e:
+                print(f"[DataManager] Ошибка обновления {part}: {e}")
+
+    def _loaders(self) -> Dict[str, Any]:
+        return {
+            "tokens": (self._load_tokens, self.tokensChanged),
+            "certs": (self._load_certs, self.certificatesChanged),
+            "regions": (self._load_regions, self.regionsChanged),
+            "reports": (self._load_reports, self.reportsChanged),
+            "email": (self._load_email, self.emailConfigChanged),
+        }
+
+    def _reload(self, part: str, emit: bool = True):
+        """Загрузить часть данных и отправить сигнал, если она изменилась"""
+        for name, file_part in WATCHED_FILES.items():
+            if file_part == part:
+                self._file_keys[name] = self._file_key(scripts_path / name)
+        loader, signal = self._loaders()[part]
+        changed = loader()
+        if emit and changed is not False:
+            signal.emit()
+
     # -------------------- INTERNAL LOADERS --------------------
     def _load_tokens(self):
         data = load_tokens_file()
@@ -232,12 +372,21 @@ class DataManager:
 
     def _load_regions(self):
         self._regions = load_regions_data() or {}
+        self.report_index.set_regions(self._regions)
 
-    def _load_reports(self):
+    def _load_reports(self) -> bool:
         try:
-            self._reports_raw = get_reports_list() or {}
+            index = self.report_index
+            changed = index.refresh()
+            index.set_regions(self._regions)
+            self._reports_raw = {
+                cert: index.reports_for_cert(cert)
+                for cert in index.certificates()
+            }
+            return changed
         except Exception:
             self._reports_raw = {}
+            return True
 
     def _load_email(self):
         try:
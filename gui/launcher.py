@@ -24,11 +24,13 @@ def check_python_version():
 
 def check_dependencies():
     """Проверка и установка зависимостей"""
-    try:
-        # Проверяем PyQt6
-        import PyQt6
+    # Пакеты ищутся через find_spec без импорта; если окружение не менялось
+    # с последней успешной проверки, pip не запускается вовсе
+    from dependency_manager import is_installed, check_requirements_file
+
+    if is_installed("PyQt6"):
         print("✓ PyQt6 установлен")
-    except ImportError:
+    else:
         print("❌ PyQt6 не установлен")
         print("Установка PyQt6...")
         try:
@@ -41,25 +43,17 @@ def check_dependencies():
     # Проверяем основные зависимости GUI
     gui_requirements = GUI_DIR / "requirements.txt"
     if gui_requirements.exists():
-        try:
-            print("Проверка зависимостей GUI...")
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", "-r", str(gui_requirements)
-            ])
+        if check_requirements_file(str(gui_requirements)):
             print("✓ Зависимости GUI установлены")
-        except subprocess.CalledProcessError:
+        else:
             print("⚠️ Некоторые зависимости GUI могут быть не установлены")
     
     # Проверяем зависимости основной системы
     scripts_requirements = SCRIPTS_DIR / "requirements.txt"
     if scripts_requirements.exists():
-        try:
-            print("Проверка зависимостей основной системы...")
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", "-r", str(scripts_requirements)
-            ])
+        if check_requirements_file(str(scripts_requirements)):
             print("✓ Зависимости основной системы установлены")
-        except subprocess.CalledProcessError:
+        else:
             print("⚠️ Некоторые зависимости основной системы могут быть не установлены")
     
     return True
@@ -111,6 +105,12 @@ def main():
     # Настраиваем окружение
     setup_environment()
     
+    if "--profile-imports" in sys.argv:
+        # Профиль времени импорта при холодном старте GUI
+        from dependency_manager import print_import_profile
+        print_import_profile("main_window", cwd=str(GUI_DIR))
+        return 0
+    
     # Проверяем и устанавливаем зависимости
     if not check_dependencies():
         print("❌ Ошибка установки зависимостей")
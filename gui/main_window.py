@@ -46,7 +46,8 @@ def ensure_basic_files():
             except Exception:
                 pass
     # Создание минимальных, если нет
-    (root / 'regions.json').write_text((root / 'regions.json').read_text(encoding='utf-8') if (root / 'regions.json').exists() else '{}', encoding='utf-8')
+    if not (root / 'regions.json').exists():
+        (root / 'regions.json').write_text('{}', encoding='utf-8')
     if not (root / 'email_config.json').exists():
         template = {"smtp_server": "smtp.example.com", "smtp_port": 587, "sender_email": "user@example.com", "sender_password": "", "recipient_emails": []}
         (root / 'email_config.json').write_text(json.dumps(template, ensure_ascii=False, indent=2), encoding='utf-8')
@@ -60,17 +61,16 @@ def ensure_basic_files():
     if not (root / 'cert_inns.json').exists():
         (root / 'cert_inns.json').write_text(json.dumps({}, ensure_ascii=False, indent=2), encoding='utf-8')
 
-ensure_basic_files()
 
 try:
     from PyQt6.QtWidgets import (
         QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
         QGridLayout, QPushButton, QLabel, QTextEdit, QTabWidget,
-        QTableWidget, QTableWidgetItem, QProgressBar, QStatusBar,
+        QTableWidget, QTableWidgetItem, QTableView, QProgressBar, QStatusBar,
         QSplitter, QFrame, QScrollArea, QGroupBox, QComboBox,
         QLineEdit, QDateEdit, QCheckBox, QSpinBox, QFileDialog,
     QMessageBox, QDialog, QDialogButtonBox, QFormLayout, QInputDialog,
-    QTreeWidget, QTreeWidgetItem, QHeaderView, QStyle, QListWidget, QListWidgetItem, QStackedWidget
+    QTreeView, QHeaderView, QStyle, QListWidget, QListWidgetItem, QStackedWidget
     )
     from PyQt6.QtCore import (
         Qt, QTimer, QThread, pyqtSignal, QPropertyAnimation,
@@ -98,9 +98,14 @@ try:
         save_thumbprints_file
     )
     from scripts.region_manager import load_regions_data
+    from scripts.config_store import load_json, save_json
     from scripts.scheduler import Scheduler, check_if_running
-    import scripts.main as scripts_main
+    from scripts.report_index import UNDEFINED_REGION
     from gui.data_manager import get_data_manager
+    from gui.workers import TaskWorker
+    from scripts.log_tail import DEFAULT_MAX_LINES as LOG_DISPLAY_LINES
+    from gui.widgets import LogTailWatcher
+    from gui.models import ReportsTableModel, ReportsFilterProxyModel, ButtonDelegate, ReportRole, FileTreeModel
 except ImportError as e:
     print(f"Ошибка импорта модулей системы: {e}")
     print("Убедитесь, что все файлы системы находятся в папке scripts")
@@ -310,18 +315,18 @@ class ModernStyle:
             margin: 5px;
         }}
         
-        QTreeWidget {{
+        QTreeView {{
             border: 1px solid {ModernStyle.BORDER};
             border-radius: 4px;
             background-color: {ModernStyle.SURFACE};
             alternate-background-color: {ModernStyle.BACKGROUND};
         }}
         
-        QTreeWidget::item {{
+        QTreeView::item {{
             padding: 5px;
         }}
         
-        QTreeWidget::item:selected {{
+        QTreeView::item:selected {{
             background-color: {ModernStyle.PRIMARY};
             color: white;
         }}
@@ -866,11 +871,7 @@ class TokenManagementTab(QWidget):
     # --- CERT TС→ИНН EDITOR ---
     def _load_cert_inns(self) -> dict:
         try:
-            path = scripts_path / 'cert_inns.json'
-            if not path.exists():
-                return {}
-            with path.open('r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json(str(scripts_path / 'cert_inns.json'), {})
             if isinstance(data, dict):
                 return data
             return {}
@@ -880,9 +881,7 @@ class TokenManagementTab(QWidget):
 
     def _save_cert_inns(self, data: dict) -> bool:
         try:
-            path = scripts_path / 'cert_inns.json'
-            with path.open('w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            save_json(str(scripts_path / 'cert_inns.json'), data)
             return True
         except Exception as e:
             self.logger.error(f"Не удалось сохранить cert_inns.json: {e}")
@@ -969,69 +968,89 @@ class ReportsTab(QWidget):
         filters_group.setLayout(filters_layout)
         layout.addWidget(filters_group)
         
-        # Таблица отчетов
-        self.reports_table = QTableWidget()
-        self.reports_table.setColumnCount(6)
-        self.reports_table.setHorizontalHeaderLabels([
-            "Дата", "Регион", "Тип нарушения", "Количество", "Статус", "Действия"
-        ])
+        # Таблица отчетов: модель с подгрузкой строк, сортировка и фильтр через прокси
+        self.reports_model = ReportsTableModel(parent=self)
+        self.reports_model.status_color = QColor(ModernStyle.SUCCESS)
+        self.reports_proxy = ReportsFilterProxyModel(self)
+        self.reports_proxy.setSourceModel(self.reports_model)
+        
+        self.reports_table = QTableView()
+        self.reports_table.setModel(self.reports_proxy)
+        self.reports_table.setSortingEnabled(True)
+        self.reports_table.sortByColumn(ReportsTableModel.DATE, Qt.SortOrder.DescendingOrder)
+        self.reports_table.horizontalHeader().sortIndicatorChanged.connect(self._fetch_visible_reports)
         self.reports_table.horizontalHeader().setStretchLastSection(True)
+        self.reports_table.verticalHeader().setVisible(False)
         self.reports_table.setAlternatingRowColors(True)
-        self.reports_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.reports_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.reports_table.setMouseTracking(True)
+        
+        self.view_delegate = ButtonDelegate(self.reports_table)
+        self.view_delegate.clicked.connect(self._on_view_clicked)
+        self.reports_table.setItemDelegateForColumn(ReportsTableModel.ACTIONS, self.view_delegate)
         layout.addWidget(self.reports_table)
         
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        
         self.setLayout(layout)
         
         # Загрузка данных
-        self.load_reports()
         self.load_regions()
+        self.load_reports()
         
         # Подключение сигналов
         search_btn.clicked.connect(self.search_reports)
         export_btn.clicked.connect(self.export_reports)
-        refresh_btn.clicked.connect(self.load_reports)
+        refresh_btn.clicked.connect(self.refresh_reports)
+        data = get_data_manager()
+        data.reportsChanged.connect(self.load_reports)
+        data.regionsChanged.connect(self.load_reports)
         
+    def refresh_reports(self):
+        """Перечитать каталог отчетов в фоне; таблица обновится по сигналу DataManager"""
+        get_data_manager().refresh_async(["regions", "reports"])
+
     def load_reports(self):
-        """Загрузка violations_*.json по сертификатам"""
+        """Загрузка списка отчетов из индекса; содержимое читается только для видимых строк"""
         try:
-            base = Path(__file__).parent.parent / 'output'
-            rows = []
-            if base.exists():
-                for cert_dir in sorted(base.iterdir()):
-                    if not cert_dir.is_dir():
-                        continue
-                    for f in cert_dir.glob('violations_*.json'):
-                        try:
-                            with f.open('r', encoding='utf-8') as jf:
-                                data = json.load(jf)
-                            date = data.get('date', '')
-                            violations = data.get('violations', {})
-                            total = sum(violations.values()) if isinstance(violations, dict) else 0
-                            rows.append({
-                                'date': date,
-                                'region': cert_dir.name,
-                                'violation_type': 'Всего групп',
-                                'count': total,
-                                'status': 'Готов',
-                                'path': str(f)
-                            })
-                        except Exception as ie:
-                            self.logger.error(f"Ошибка чтения {f}: {ie}")
-            self.reports_table.setRowCount(len(rows))
-            for r_index, rdata in enumerate(rows):
-                self.reports_table.setItem(r_index, 0, QTableWidgetItem(rdata['date']))
-                self.reports_table.setItem(r_index, 1, QTableWidgetItem(rdata['region']))
-                self.reports_table.setItem(r_index, 2, QTableWidgetItem(rdata['violation_type']))
-                self.reports_table.setItem(r_index, 3, QTableWidgetItem(str(rdata['count'])))
-                status_item = QTableWidgetItem(rdata['status'])
-                status_item.setBackground(QColor(ModernStyle.SUCCESS))
-                self.reports_table.setItem(r_index, 4, status_item)
-                btn = QPushButton("Просмотр")
-                btn.setMaximumWidth(80)
-                btn.clicked.connect(lambda _, p=rdata['path']: self.view_report(p))
-                self.reports_table.setCellWidget(r_index, 5, btn)
+            # Индекс поддерживается в актуальном состоянии DataManager
+            index = get_data_manager().report_index
+            regions = load_regions_data()
+            region_names = {
+                code: info.get('name', code) if isinstance(info, dict) else str(info)
+                for code, info in regions.items()
+            }
+            region_names.setdefault(UNDEFINED_REGION, "Не назначен")
+            # Порядок задает модель по выбранной колонке
+            self.reports_model.set_reports(index, index.all_reports(), region_names)
+            self.apply_filters()
         except Exception as e:
             self.logger.error(f"Ошибка загрузки отчетов: {e}")
+    
+    def apply_filters(self):
+        """Применение фильтров по датам и региону"""
+        region = self.region_combo.currentData()
+        self.reports_proxy.set_filters(
+            self.date_from.date().toString("yyyy-MM-dd"),
+            self.date_to.date().toString("yyyy-MM-dd"),
+            region
+        )
+        self._fetch_visible_reports()
+    
+    def _fetch_visible_reports(self, *args):
+        """Фильтр видит только подгруженные строки: догружаем, пока экран не заполнится"""
+        while self.reports_model.canFetchMore() and self.reports_proxy.rowCount() < ReportsTableModel.FETCH_BATCH:
+            self.reports_model.fetchMore()
+        self.count_label.setText(
+            f"Показано: {self.reports_proxy.rowCount()} (загружено {self.reports_model.rowCount()} "
+            f"из {self.reports_model.total_count()})"
+        )
+    
+    def _on_view_clicked(self, proxy_index):
+        report = self.reports_proxy.data(proxy_index, ReportRole)
+        if report:
+            self.view_report(report['path'])
 
     def view_report(self, path: str):
         try:
@@ -1064,8 +1083,7 @@ class ReportsTab(QWidget):
             
     def search_reports(self):
         """Поиск отчетов по фильтрам"""
-        QMessageBox.information(self, "Поиск", "Выполняется поиск отчетов...")
-        self.load_reports()
+        self.apply_filters()
         
     def export_reports(self):
         """Экспорт отчетов"""
@@ -1086,8 +1104,11 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.logger = get_logger("gui_main")
+        ensure_basic_files()
         self.data = get_data_manager()
         self.init_ui()
+        for signal in (self.data.tokensChanged, self.data.certificatesChanged, self.data.reportsChanged):
+            signal.connect(self.update_status_cards)
         self.setup_status_bar()
         self.setup_timer()
         
@@ -1287,9 +1308,10 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(toolbar_layout)
         
-        # Файловое дерево
-        self.file_tree = QTreeWidget()
-        self.file_tree.setHeaderLabels(["Имя", "Размер", "Дата изменения", "Тип"])
+        # Файловое дерево: папки читаются при раскрытии
+        self.file_tree = QTreeView()
+        self.file_tree.setSortingEnabled(True)
+        self.file_tree.sortByColumn(0, Qt.SortOrder.AscendingOrder)
         layout.addWidget(self.file_tree)
         
         widget.setLayout(layout)
@@ -1407,10 +1429,17 @@ class MainWindow(QMainWindow):
                 font-family: 'Consolas', 'Courier New', monospace;
             }
         """)
+        # Старые строки удаляются автоматически (+1 строка пометки)
+        self.log_display.document().setMaximumBlockCount(LOG_DISPLAY_LINES + 1)
         layout.addWidget(self.log_display)
         
         widget.setLayout(layout)
         
+        # Выбранный файл не перечитывается: дописанные строки добавляются по мере записи
+        self.log_tail_watcher = LogTailWatcher(LOG_DISPLAY_LINES, self)
+        self.log_tail_watcher.reset.connect(self._show_log_lines)
+        self.log_tail_watcher.lines_appended.connect(self._append_log_lines)
+        
         # Загрузка списка логов
         self.load_log_files()
         
@@ -1512,6 +1541,12 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         self.status_bar.addPermanentWidget(self.progress_bar)
         
+        # Отмена фоновой операции
+        self.cancel_task_btn = QPushButton("Отменить")
+        self.cancel_task_btn.setVisible(False)
+        self.cancel_task_btn.clicked.connect(self.cancel_task)
+        self.status_bar.addPermanentWidget(self.cancel_task_btn)
+        
         # Время
         self.time_label = QLabel()
         self.status_bar.addPermanentWidget(self.time_label)
@@ -1541,19 +1576,13 @@ class MainWindow(QMainWindow):
             self.scheduler_status.setStyleSheet(f"color: {ModernStyle.ERROR};")
             
     def update_status_cards(self):
-        """Обновление карточек статуса через DataManager"""
+        """Обновление карточек статуса из кешей DataManager"""
         try:
-            self.data.refresh_all()
             active_tokens = sum(1 for t in self.data.list_tokens() if t.get('token'))
             self.status_cards['tokens'].set_value(str(active_tokens))
             self.status_cards['certificates'].set_value(str(len(self.data.list_certificates())))
-            # Считаем violations_*.json
-            base = Path(__file__).parent.parent / 'output'
-            report_files = 0
-            if base.exists():
-                for cert_dir in base.iterdir():
-                    if cert_dir.is_dir():
-                        report_files += len(list(cert_dir.glob('violations_*.json')))
+            # Считаем violations_*.json по каталогу отчетов
+            report_files = self.data.report_index.count()
             self.status_cards['reports'].set_value(str(report_files))
             self.status_cards['violations'].set_value(str(report_files))
             self.last_update_label.setText(f"Последнее обновление: {datetime.now().strftime('%H:%M:%S')}")
@@ -1561,61 +1590,23 @@ class MainWindow(QMainWindow):
             self.logger.error(f"Ошибка обновления статуса: {e}")
             
     def load_file_tree(self):
-        """Загрузка файлового дерева"""
-        self.file_tree.clear()
-        
+        """Загрузка файлового дерева (модель сама следит за изменениями файлов)"""
         try:
             scripts_path = Path(__file__).parent.parent / "scripts"
-            self._add_directory_to_tree(scripts_path, self.file_tree.invisibleRootItem())
+            old_model = self.file_tree.model()
+            self.file_model = FileTreeModel(str(scripts_path), self.file_tree)
+            self.file_tree.setModel(self.file_model)
+            self.file_tree.setRootIndex(self.file_model.root_index)
+            self.file_tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+            if old_model is not None:
+                old_model.deleteLater()
         except Exception as e:
             self.logger.error(f"Ошибка загрузки файлового дерева: {e}")
+
+    def _selected_file_path(self) -> Optional[str]:
+        """Путь выбранного в дереве файла или папки"""
+        return self.file_model.path_at(self.file_tree.currentIndex())
             
-    def _add_directory_to_tree(self, path: Path, parent_item):
-        """Рекурсивное добавление директории в дерево"""
-        try:
-            for item_path in sorted(path.iterdir()):
-                if item_path.name.startswith('.'):
-                    continue
-                    
-                item = QTreeWidgetItem(parent_item)
-                item.setText(0, item_path.name)
-                
-                if item_path.is_dir():
-                    item.setText(3, "Папка")
-                    item.setData(0, Qt.ItemDataRole.UserRole, str(item_path))
-                    # Добавляем содержимое папки (ограничиваем глубину)
-                    if len(str(item_path).split(os.sep)) < 10:
-                        self._add_directory_to_tree(item_path, item)
-                else:
-                    # Файл
-                    try:
-                        stat = item_path.stat()
-                        size = self._format_file_size(stat.st_size)
-                        modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
-                        
-                        item.setText(1, size)
-                        item.setText(2, modified)
-                        item.setText(3, item_path.suffix or "Файл")
-                        item.setData(0, Qt.ItemDataRole.UserRole, str(item_path))
-                    except:
-                        pass
-                        
-        except PermissionError:
-            pass
-        except Exception as e:
-            self.logger.error(f"Ошибка при обходе директории {path}: {e}")
-            
-    def _format_file_size(self, size_bytes: int) -> str:
-        """Форматирование размера файла"""
-        if size_bytes == 0:
-            return "0 B"
-        
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f} TB"
-        
     def load_settings(self):
         """Загрузка настроек"""
         try:
@@ -1656,48 +1647,109 @@ class MainWindow(QMainWindow):
             self.logger.error(f"Ошибка сохранения настроек: {e}")
             QMessageBox.critical(self, "Ошибка", f"Ошибка сохранения настроек: {e}")
             
+    # Фоновые операции
+    def _start_task(self, func, title: str, on_finished=None, *args) -> bool:
+        """Запуск операции в TaskWorker с выводом прогресса и журнала"""
+        worker = getattr(self, '_task_worker', None)
+        if worker is not None and worker.isRunning():
+            QMessageBox.information(self, 'Инфо', 'Дождитесь завершения текущей операции')
+            return False
+        
+        worker = TaskWorker(func, *args, parent=self)
+        self._task_worker = worker
+        
+        self.progress_bar.setVisible(True)
+        if worker.supports_progress:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+        else:
+            self.progress_bar.setRange(0, 0)
+        self.cancel_task_btn.setVisible(worker.supports_cancel)
+        self.cancel_task_btn.setEnabled(True)
+        self.events_text.append(f'▶ {title}')
+        
+        def on_progress(percent, message):
+            self.progress_bar.setValue(percent)
+            self.progress_bar.setFormat(f"{percent}%")
+            if message:
+                self.status_bar.showMessage(message)
+        
+        def on_completed(ok, error):
+            self.progress_bar.setVisible(False)
+            self.progress_bar.setRange(0, 100)
+            self.cancel_task_btn.setVisible(False)
+            self.status_bar.clearMessage()
+            if error:
+                self.events_text.append(f'Ошибка: {error}')
+            if on_finished:
+                on_finished(ok)
+            # Изменения файлов обычно уже пойманы наблюдателем DataManager
+            self.data.refresh_async()
+        
+        worker.progress.connect(on_progress)
+        worker.log_message.connect(self.events_text.append)
+        worker.completed.connect(on_completed)
+        worker.finished.connect(self._on_task_thread_finished)
+        worker.start()
+        return True
+    
+    def _on_task_thread_finished(self):
+        worker = self.sender()
+        if worker is getattr(self, '_task_worker', None):
+            self._task_worker = None
+        if worker is not None:
+            worker.deleteLater()
+    
+    def cancel_task(self):
+        """Отмена текущей фоновой операции"""
+        worker = getattr(self, '_task_worker', None)
+        if worker is not None and worker.isRunning():
+            worker.cancel()
+            self.cancel_task_btn.setEnabled(False)
+            self.events_text.append('⏹ Отмена запрошена, операция остановится после текущего шага')
+    
+    def closeEvent(self, event):
+        """Остановка фоновой операции перед закрытием окна"""
+        worker = getattr(self, '_task_worker', None)
+        if worker is not None and worker.isRunning():
+            if QMessageBox.question(self, 'Подтверждение', 'Операция еще выполняется. Отменить ее и закрыть окно?',
+                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            worker.cancel()
+            worker.wait(10000)
+        self.data.shutdown()
+        super().closeEvent(event)
+    
     # Методы для быстрых действий
     def run_daily_process(self):
-        if hasattr(self, '_daily_busy') and self._daily_busy:
+        worker = getattr(self, '_task_worker', None)
+        if worker is not None and worker.isRunning():
             QMessageBox.information(self, 'Инфо', 'Обработка уже выполняется')
             return
         if QMessageBox.question(self, 'Подтверждение', 'Запустить ежедневную обработку?',
                                  QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes:
             return
-        self._daily_busy = True
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)
-        self.events_text.append('▶ Старт ежедневной обработки')
-        QTimer.singleShot(100, self._do_daily_process)
-
-    def _do_daily_process(self):
-        core_run = scripts_main.run_daily_process
-        ok = False
-        try:
-            ok = core_run()
-        except Exception as e:
-            self.events_text.append(f'Ошибка: {e}')
-        self.progress_bar.setVisible(False)
-        self.progress_bar.setRange(0, 100)
-        if ok:
-            self.events_text.append('✅ Ежедневная обработка завершена')
-        else:
-            self.events_text.append('❌ Ежедневная обработка завершилась с ошибкой')
-        self._daily_busy = False
-        self.update_status_cards()
+        
+        def on_finished(ok):
+            if ok:
+                self.events_text.append('✅ Ежедневная обработка завершена')
+            else:
+                self.events_text.append('❌ Ежедневная обработка завершилась с ошибкой')
+        
+        # Модуль обработки загружается при первом запуске, а не при старте окна
+        import scripts.main as scripts_main
+        self._start_task(scripts_main.run_daily_process, 'Старт ежедневной обработки', on_finished)
             
     def refresh_tokens(self):
-        refresh_daily_tokens = scripts_main.refresh_daily_tokens
-        self.events_text.append('▶ Обновление токенов...')
-        try:
-            ok = refresh_daily_tokens()
+        def on_finished(ok):
             if ok:
                 self.events_text.append('✓ Токены обновлены')
             else:
                 self.events_text.append('✗ Ошибка обновления токенов')
-        except Exception as e:
-            self.events_text.append(f'Ошибка обновления: {e}')
-        self.update_status_cards()
+        
+        import scripts.main as scripts_main
+        self._start_task(scripts_main.refresh_daily_tokens, 'Обновление токенов...', on_finished)
         
     def send_report(self):
         """Отправка отчета по email"""
@@ -1742,15 +1794,37 @@ class MainWindow(QMainWindow):
             if not ok:
                 return
                 
-            # Отправка отчета
-            try:
-                from scripts.send_daily_report import process_and_send_reports
-                process_and_send_reports()
-                QMessageBox.information(self, "Успех", "Отчет успешно отправлен")
-                self.events_text.append('✅ Отчет отправлен по email')
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Ошибка отправки отчета: {e}")
-                self.events_text.append(f'❌ Ошибка отправки отчета: {e}')
+            # Отправка отчета в фоне
+            from scripts.send_daily_report import process_and_send_reports
+            from scripts.email_outbox import get_outbox_status, STATE_PENDING, STATE_FAILED
+            
+            def on_finished(ok):
+                if ok:
+                    QMessageBox.information(self, "Успех", "Отчет успешно отправлен")
+                    self.events_text.append('✅ Отчет отправлен по email')
+                    return
+                # Недоставленные письма остаются в очереди email_outbox.db
+                undelivered = [
+                    row for row in get_outbox_status()['recent']
+                    if row['state'] in (STATE_PENDING, STATE_FAILED)
+                ]
+                if not undelivered:
+                    QMessageBox.critical(self, "Ошибка", "Ошибка отправки отчета")
+                    self.events_text.append('❌ Ошибка отправки отчета')
+                    return
+                lines = [
+                    f"{row['region']} за {row['report_date']}: "
+                    f"{'ожидает повторной отправки' if row['state'] == STATE_PENDING else 'не доставлен'}"
+                    f"{' (' + row['last_error'] + ')' if row['last_error'] else ''}"
+                    for row in undelivered[:10]
+                ]
+                QMessageBox.warning(
+                    self, "Отправка не завершена",
+                    "Не все отчеты доставлены:\n" + "\n".join(lines)
+                )
+                self.events_text.append(f'⚠️ Не доставлено отчетов: {len(undelivered)}')
+            
+            self._start_task(process_and_send_reports, 'Отправка отчетов по email...', on_finished)
                 
         except Exception as e:
             self.logger.error(f"Ошибка в send_report: {e}")
@@ -1796,15 +1870,35 @@ class MainWindow(QMainWindow):
             
             layout.addLayout(buttons_layout)
             
+            # Запуск обработки в работающем планировщике (без повторной загрузки модулей)
+            run_now_btn = QPushButton("Выполнить обработку сейчас")
+            layout.addWidget(run_now_btn)
+            
             # Информация о следующем запуске
             info_text = QTextEdit()
             info_text.setReadOnly(True)
             info_text.setMaximumHeight(150)
             
             try:
-                from scripts.file_utils import check_last_run_info
-                next_run_info = check_last_run_info()
-                info_text.setPlainText(f"Информация о следующем запуске:\n{next_run_info}")
+                from scripts.scheduler_control import get_scheduler_status
+                status = get_scheduler_status()
+                if status:
+                    job_names = {
+                        "token_refresh": "Обновление токенов",
+                        "daily_report": "Обработка отчетов",
+                        "email_reports": "Рассылка отчетов",
+                    }
+                    lines = [
+                        f"{job_names.get(job, job)}: {next_run.replace('T', ' ')}"
+                        for job, next_run in status.get("next_runs", {}).items()
+                    ]
+                    for job in status.get("running_jobs", {}):
+                        lines.append(f"Выполняется: {job_names.get(job, job)}")
+                    info_text.setPlainText("Следующие запуски:\n" + "\n".join(lines))
+                else:
+                    from scripts.file_utils import check_last_run_info
+                    next_run_info = check_last_run_info()
+                    info_text.setPlainText(f"Информация о следующем запуске:\n{next_run_info}")
             except:
                 info_text.setPlainText("Информация о следующем запуске недоступна")
                 
@@ -1833,6 +1927,10 @@ class MainWindow(QMainWindow):
             
             def stop_scheduler():
                 try:
+                    from scripts.scheduler_control import request_stop
+                    if check_if_running() and not request_stop():
+                        QMessageBox.warning(dialog, "Ошибка", "Планировщик не ответил на запрос остановки")
+                        return
                     scheduler.stop()
                     QMessageBox.information(dialog, "Успех", "Планировщик остановлен")
                     status_label.setText("Статус: Остановлен")
@@ -1844,9 +1942,22 @@ class MainWindow(QMainWindow):
                 stop_scheduler()
                 QTimer.singleShot(1000, start_scheduler)
             
+            def run_now():
+                try:
+                    from scripts.scheduler_control import run_job_now
+                    if not check_if_running():
+                        QMessageBox.warning(dialog, "Ошибка", "Планировщик не запущен")
+                    elif run_job_now("daily_report"):
+                        QMessageBox.information(dialog, "Успех", "Ежедневная обработка поставлена в очередь планировщика")
+                    else:
+                        QMessageBox.warning(dialog, "Ошибка", "Планировщик не принял задачу")
+                except Exception as e:
+                    QMessageBox.critical(dialog, "Ошибка", f"Ошибка запуска обработки: {e}")
+            
             start_btn.clicked.connect(start_scheduler)
             stop_btn.clicked.connect(stop_scheduler)
             restart_btn.clicked.connect(restart_scheduler)
+            run_now_btn.clicked.connect(run_now)
             
             dialog.exec()
             
@@ -1925,17 +2036,15 @@ class MainWindow(QMainWindow):
     def create_new_folder(self):
         """Создание новой папки"""
         try:
-            current_item = self.file_tree.currentItem()
+            item_path = self._selected_file_path()
             base_path = Path(__file__).parent.parent / "scripts"
             
-            if current_item:
-                item_path = current_item.data(0, Qt.ItemDataRole.UserRole)
-                if item_path:
-                    path = Path(item_path)
-                    if path.is_file():
-                        base_path = path.parent
-                    else:
-                        base_path = path
+            if item_path:
+                path = Path(item_path)
+                if path.is_file():
+                    base_path = path.parent
+                else:
+                    base_path = path
             
             folder_name, ok = QInputDialog.getText(
                 self, "Новая папка", 
@@ -1947,7 +2056,6 @@ class MainWindow(QMainWindow):
                 try:
                     new_folder.mkdir(exist_ok=True)
                     QMessageBox.information(self, "Успех", f"Папка создана: {new_folder}")
-                    self.load_file_tree()
                 except Exception as e:
                     QMessageBox.critical(self, "Ошибка", f"Не удалось создать папку: {e}")
                     
@@ -1957,17 +2065,15 @@ class MainWindow(QMainWindow):
     def upload_file(self):
         """Загрузка файла"""
         try:
-            current_item = self.file_tree.currentItem()
+            item_path = self._selected_file_path()
             base_path = Path(__file__).parent.parent / "scripts"
             
-            if current_item:
-                item_path = current_item.data(0, Qt.ItemDataRole.UserRole)
-                if item_path:
-                    path = Path(item_path)
-                    if path.is_file():
-                        base_path = path.parent
-                    else:
-                        base_path = path
+            if item_path:
+                path = Path(item_path)
+                if path.is_file():
+                    base_path = path.parent
+                else:
+                    base_path = path
             
             file_path, _ = QFileDialog.getOpenFileName(
                 self, "Выберите файл для загрузки", "", "Все файлы (*)"
@@ -1990,7 +2096,6 @@ class MainWindow(QMainWindow):
                     import shutil
                     shutil.copy2(source, destination)
                     QMessageBox.information(self, "Успех", f"Файл загружен: {destination}")
-                    self.load_file_tree()
                     
                 except Exception as e:
                     QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки файла: {e}")
@@ -2001,13 +2106,12 @@ class MainWindow(QMainWindow):
     def copy_file(self):
         """Копирование файла"""
         try:
-            current_item = self.file_tree.currentItem()
-            if not current_item:
+            source_path = self._selected_file_path()
+            if not source_path:
                 QMessageBox.warning(self, "Предупреждение", "Выберите файл для копирования")
                 return
                 
-            source_path = current_item.data(0, Qt.ItemDataRole.UserRole)
-            if not source_path or not Path(source_path).exists():
+            if not Path(source_path).exists():
                 QMessageBox.warning(self, "Ошибка", "Выбранный файл не существует")
                 return
             
@@ -2037,7 +2141,6 @@ class MainWindow(QMainWindow):
                         shutil.copytree(source, destination, dirs_exist_ok=True)
                     
                     QMessageBox.information(self, "Успех", f"Скопировано в: {destination}")
-                    self.load_file_tree()
                     
                 except Exception as e:
                     QMessageBox.critical(self, "Ошибка", f"Ошибка копирования: {e}")
@@ -2048,13 +2151,12 @@ class MainWindow(QMainWindow):
     def edit_file(self):
         """Редактирование файла"""
         try:
-            current_item = self.file_tree.currentItem()
-            if not current_item:
+            file_path = self._selected_file_path()
+            if not file_path:
                 QMessageBox.warning(self, "Предупреждение", "Выберите файл для редактирования")
                 return
                 
-            file_path = current_item.data(0, Qt.ItemDataRole.UserRole)
-            if not file_path or not Path(file_path).is_file():
+            if not Path(file_path).is_file():
                 QMessageBox.warning(self, "Ошибка", "Выберите файл (не папку) для редактирования")
                 return
             
@@ -2116,13 +2218,12 @@ class MainWindow(QMainWindow):
     def delete_file(self):
         """Удаление файла или папки"""
         try:
-            current_item = self.file_tree.currentItem()
-            if not current_item:
+            file_path = self._selected_file_path()
+            if not file_path:
                 QMessageBox.warning(self, "Предупреждение", "Выберите файл или папку для удаления")
                 return
                 
-            file_path = current_item.data(0, Qt.ItemDataRole.UserRole)
-            if not file_path or not Path(file_path).exists():
+            if not Path(file_path).exists():
                 QMessageBox.warning(self, "Ошибка", "Выбранный элемент не существует")
                 return
             
@@ -2144,7 +2245,6 @@ class MainWindow(QMainWindow):
                         shutil.rmtree(path)
                     
                     QMessageBox.information(self, "Успех", f"{item_type.capitalize()} удален{'а' if item_type == 'папку' else ''}")
-                    self.load_file_tree()
                     
                 except Exception as e:
                     QMessageBox.critical(self, "Ошибка", f"Ошибка удаления: {e}")
@@ -2412,9 +2512,10 @@ class MainWindow(QMainWindow):
             self.logger.error(f"Ошибка загрузки списка логов: {e}")
 
     def load_selected_log(self, log_name):
-        """Загрузка выбранного лога"""
+        """Загрузка выбранного лога: последние строки и слежение за новыми"""
         try:
             if not log_name:
+                self.log_tail_watcher.set_path(None)
                 return
                 
             if log_name.startswith("root/"):
@@ -2422,31 +2523,28 @@ class MainWindow(QMainWindow):
             else:
                 log_path = Path(__file__).parent.parent / 'scripts' / 'logs' / log_name
             
-            if log_path.exists():
-                try:
-                    with open(log_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    # Показываем только последние 1000 строк для производительности
-                    lines = content.split('\n')
-                    if len(lines) > 1000:
-                        lines = lines[-1000:]
-                        content = '\n'.join(['... (показаны последние 1000 строк) ...'] + lines)
-                    
-                    self.log_display.setPlainText(content)
-                    
-                    # Прокручиваем к концу
-                    scrollbar = self.log_display.verticalScrollBar()
-                    scrollbar.setValue(scrollbar.maximum())
-                    
-                except UnicodeDecodeError:
-                    with open(log_path, 'r', encoding='cp1251') as f:
-                        content = f.read()
-                    self.log_display.setPlainText(content)
+            self.log_tail_watcher.set_path(str(log_path))
                     
         except Exception as e:
             self.logger.error(f"Ошибка загрузки лога {log_name}: {e}")
             self.log_display.setPlainText(f"Ошибка загрузки лога: {e}")
 
+    def _show_log_lines(self, lines: list):
+        """Показ последних строк лога после выбора файла или его ротации"""
+        content = '\n'.join(lines)
+        if len(lines) >= LOG_DISPLAY_LINES:
+            content = f'... (показаны последние {LOG_DISPLAY_LINES} строк) ...\n' + content
+        self.log_display.setPlainText(content)
+        self._scroll_log_to_end()
+
+    def _append_log_lines(self, lines: list):
+        self.log_display.append('\n'.join(lines))
+        self._scroll_log_to_end()
+
+    def _scroll_log_to_end(self):
+        scrollbar = self.log_display.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
     def clear_log_display(self):
         """Очистка отображения лога"""
         self.log_display.clear()
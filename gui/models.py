@@ -0,0 +1,289 @@
+"""
+Модели данных Qt для таблиц GUI
+
+ReportsTableModel показывает отчеты из общего индекса (scripts/report_index.py):
+строки подгружаются порциями по мере прокрутки (canFetchMore/fetchMore), а
+содержимое отчета читается только для видимых строк. Сортировка упорядочивает
+весь список отчетов в модели (а не только подгруженные строки), фильтрация
+выполняется через ReportsFilterProxyModel, кнопка «Просмотр» рисуется
+делегатом ButtonDelegate вместо отдельного виджета в каждой строке.
+
+FileTreeModel — дерево файлов вкладки «Файлы» на основе QFileSystemModel:
+каталог читается только при раскрытии, а размеры и даты собираются в
+фоновом потоке Qt, поэтому вкладка открывается сразу при любом объеме output/.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QEvent, QDir, pyqtSignal
+)
+from PyQt6.QtGui import QFileSystemModel
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+# Роль с записью отчета из индекса
+ReportRole = Qt.ItemDataRole.UserRole
+# Роль со значением для сортировки (числа сортируются как числа)
+SortRole = Qt.ItemDataRole.UserRole + 1
+# Роль с кодом региона для фильтра
+RegionRole = Qt.ItemDataRole.UserRole + 2
+
+class ReportsTableModel(QAbstractTableModel):
+    """Таблица отчетов violations_<дата>.json с порционной загрузкой"""
+
+    COLUMNS = ["Дата", "Регион", "Сертификат", "Количество", "Статус", "Действия"]
+    DATE, REGION, CERTIFICATE, COUNT, STATUS, ACTIONS = range(6)
+
+    # Строк за одну подгрузку
+    FETCH_BATCH = 200
+
+    def __init__(self, index=None, parent=None):
+        super().__init__(parent)
+        self._index = index
+        self._reports: List[Dict[str, Any]] = []
+        self._loaded = 0
+        self._counts: Dict[str, int] = {}
+        self._region_names: Dict[str, str] = {}
+        self._sort_column = self.DATE
+        self._sort_order = Qt.SortOrder.DescendingOrder
+        self.status_color = QColor("#10b981")
+
+    def set_reports(self, index, reports: List[Dict[str, Any]], region_names: Optional[Dict[str, str]] = None) -> None:
+        """Заменить список отчетов (записи индекса), показав первую порцию"""
+        self.beginResetModel()
+        self._index = index
+        self._reports = list(reports)
+        self._loaded = min(len(self._reports), self.FETCH_BATCH)
+        self._counts = {}
+        self._region_names = dict(region_names or {})
+        self._sort_reports()
+        self.endResetModel()
+
+    def total_count(self) -> int:
+        """Количество отчетов с учетом еще не подгруженных"""
+        return len(self._reports)
+
+    def report_at(self, row: int) -> Optional[Dict[str, Any]]:
+        if 0 <= row < self._loaded:
+            return self._reports[row]
+        return None
+
+    # ---- Сортировка ----
+
+    def _sort_reports(self) -> None:
+        keys = {
+            self.DATE: lambda report: (report['date'], report['certificate']),
+            self.REGION: lambda report: (self._region_name(report), report['date']),
+            self.CERTIFICATE: lambda report: (report['certificate'], report['date']),
+            # Количества берутся из индекса, файлы отчетов читаются один раз
+            self.COUNT: lambda report: (self._count(report), report['date']),
+        }
+        key = keys.get(self._sort_column)
+        if key is not None:
+            self._reports.sort(key=key, reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder) -> None:
+        """Отсортировать весь список отчетов и снова показать первую порцию"""
+        self.beginResetModel()
+        self._sort_column = column
+        self._sort_order = order
+        self._sort_reports()
+        self._loaded = min(len(self._reports), self.FETCH_BATCH)
+        self.endResetModel()
+
+    # ---- Порционная загрузка ----
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._loaded < len(self._reports)
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._reports) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    # ---- Данные ----
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def _count(self, report: Dict[str, Any]) -> int:
+        """Сумма нарушений; файл отчета читается при первом обращении"""
+        path = report['path']
+        if path not in self._counts:
+            self._counts[path] = self._index.total_violations(report) if self._index else 0
+        return self._counts[path]
+
+    def _region(self, report: Dict[str, Any]) -> str:
+        return self._index.region_for_cert(report['certificate']) if self._index else ""
+
+    def _region_name(self, report: Dict[str, Any]) -> str:
+        region = self._region(report)
+        return self._region_names.get(region, region)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        report = self._reports[index.row()]
+        column = index.column()
+
+        if role == ReportRole:
+            return report
+        if role == RegionRole:
+            return self._region(report)
+
+        if role in (Qt.ItemDataRole.DisplayRole, SortRole):
+            if column == self.DATE:
+                return report['date']
+            if column == self.REGION:
+                return self._region_name(report)
+            if column == self.CERTIFICATE:
+                return report['certificate']
+            if column == self.COUNT:
+                count = self._count(report)
+                return count if role == SortRole else str(count)
+            if column == self.STATUS:
+                return "Готов"
+            if column == self.ACTIONS:
+                return "Просмотр" if role == Qt.ItemDataRole.DisplayRole else None
+
+        if role == Qt.ItemDataRole.BackgroundRole and column == self.STATUS:
+            return self.status_color
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == self.COUNT:
+            return Qt.AlignmentFlag.AlignCenter
+
+        return None
+
+class ReportsFilterProxyModel(QSortFilterProxyModel):
+    """Фильтр отчетов по диапазону дат и региону"""
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder) -> None:
+        # Прокси видит только подгруженные строки, поэтому сортирует исходная
+        # модель, а прокси сохраняет ее порядок (колонка -1 - порядок строк модели)
+        self.sourceModel().sort(column, order)
+        super().sort(-1, Qt.SortOrder.AscendingOrder)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._date_from: Optional[str] = None
+        self._date_to: Optional[str] = None
+        self._region: Optional[str] = None
+        self.setSortRole(SortRole)
+
+    def set_filters(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    region: Optional[str] = None) -> None:
+        """
+        Установить фильтры
+
+        Args:
+            date_from: Начальная дата YYYY-MM-DD включительно (None — без ограничения)
+            date_to: Конечная дата YYYY-MM-DD включительно (None — без ограничения)
+            region: Код региона (None — все регионы)
+        """
+        self._date_from = date_from
+        self._date_to = date_to
+        self._region = region
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        model = self.sourceModel()
+        report = model.report_at(source_row)
+        if report is None:
+            return False
+        date = report['date']
+        if self._date_from and date < self._date_from:
+            return False
+        if self._date_to and date > self._date_to:
+            return False
+        if self._region:
+            region = model.data(model.index(source_row, ReportsTableModel.REGION), RegionRole)
+            if region != self._region:
+                return False
+        return True
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Рисует кнопку в ячейке и сообщает о нажатии сигналом clicked"""
+
+    clicked = pyqtSignal(QModelIndex)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 3, -4, -3)
+        button.text = str(index.data(Qt.ItemDataRole.DisplayRole) or "")
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            button.state |= QStyle.StateFlag.State_MouseOver
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and \
+                event.button() == Qt.MouseButton.LeftButton and \
+                option.rect.contains(event.position().toPoint()):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+def format_file_size(size_bytes: float) -> str:
+    """Форматирование размера файла"""
+    if size_bytes == 0:
+        return "0 B"
+
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} TB"
+
+class FileTreeModel(QFileSystemModel):
+    """Ленивое дерево файлов с русскими заголовками"""
+
+    COLUMNS = ["Имя", "Размер", "Дата изменения", "Тип"]
+    NAME, SIZE, MODIFIED, TYPE = range(4)
+
+    def __init__(self, root_path: str, parent=None):
+        super().__init__(parent)
+        # Скрытые файлы (.git, .env и т.п.) не показываются
+        self.setFilter(QDir.Filter.AllEntries | QDir.Filter.NoDotAndDotDot | QDir.Filter.AllDirs)
+        self.setReadOnly(True)
+        self.root_index = self.setRootPath(root_path)
+
+    def path_at(self, index: QModelIndex) -> Optional[str]:
+        """Путь к файлу или папке в строке index"""
+        if not index.isValid():
+            return None
+        return self.filePath(index)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole \
+                and 0 <= section < len(self.COLUMNS):
+            return self.COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid() and index.column() != self.NAME:
+            column = index.column()
+            is_dir = self.isDir(index)
+            if column == self.SIZE:
+                return "" if is_dir else format_file_size(self.size(index))
+            if column == self.MODIFIED:
+                return self.lastModified(index).toString("yyyy-MM-dd HH:mm")
+            if column == self.TYPE:
+                if is_dir:
+                    return "Папка"
+                suffix = self.fileInfo(index).suffix()
+                return f".{suffix}" if suffix else "Файл"
+        return super().data(index, role)
@@ -6,9 +6,12 @@ try:
     from PyQt6.QtWidgets import (
         QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
         QFrame, QScrollArea, QTextEdit, QProgressBar, QGroupBox,
-        QListWidget, QListWidgetItem, QSizePolicy, QSpacerItem
+        QSizePolicy, QSpacerItem, QLineEdit, QListView
+    )
+    from PyQt6.QtCore import (
+        Qt, QTimer, pyqtSignal, QThread, QPropertyAnimation, QRect, QObject, QFileSystemWatcher,
+        QAbstractListModel, QModelIndex
     )
-    from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread, QPropertyAnimation, QRect
     from PyQt6.QtGui import QFont, QColor, QPalette, QPainter, QLinearGradient, QBrush
 except ImportError:
     print("PyQt6 не установлен. Установите его командой: pip install PyQt6")
@@ -34,6 +37,8 @@ except ImportError:
     def get_logger(name):
         return DummyLogger()
 
+from log_tail import LogTail, DEFAULT_MAX_LINES
+
 
 class AnimatedCard(QFrame):
     """Анимированная карточка с эффектом наведения"""
@@ -126,15 +131,73 @@ class AnimatedCard(QFrame):
         super().mousePressEvent(event)
 
 
+class LogTailWatcher(QObject):
+    """
+    Слежение за файлом лога (scripts/log_tail.py)
+
+    Новые строки читаются по сигналам QFileSystemWatcher начиная с
+    запомненного смещения. Каталог файла тоже наблюдается: при ротации
+    RotatingFileHandler переименовывает файл и создает новый.
+
+    Сигналы:
+        lines_appended(list): строки, дописанные в файл
+        reset(list): последние строки после смены файла, ротации или усечения
+    """
+
+    lines_appended = pyqtSignal(list)
+    reset = pyqtSignal(list)
+
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._tail: LogTail = None
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_changed)
+        self._watcher.directoryChanged.connect(self._on_changed)
+
+    def set_path(self, path: str = None) -> None:
+        """Начать слежение за файлом (None — остановить) и отправить его последние строки"""
+        watched = self._watcher.files() + self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        if not path:
+            self._tail = None
+            self.reset.emit([])
+            return
+        self._tail = LogTail(str(path), self.max_lines)
+        self._watch()
+        self.reset.emit(self._tail.read_tail())
+
+    def _watch(self) -> None:
+        path = Path(self._tail.path)
+        for watched_path in (path.parent, path):
+            if watched_path.exists() and str(watched_path) not in self._watcher.files() + self._watcher.directories():
+                self._watcher.addPath(str(watched_path))
+
+    def _on_changed(self, _path: str) -> None:
+        if self._tail is None:
+            return
+        # После ротации наблюдение за старым файлом теряется
+        self._watch()
+        lines, was_reset = self._tail.read_new_lines()
+        if was_reset:
+            self.reset.emit(lines)
+        elif lines:
+            self.lines_appended.emit(lines)
+
+
 class LogViewer(QWidget):
     """Виджет для просмотра логов в реальном времени"""
     
+    # Строк, показываемых из файла
+    MAX_LINES = 50
+    
     def __init__(self, log_file_path: str = None):
         super().__init__()
         self.log_file_path = log_file_path
         self.logger = get_logger("gui_log_viewer")
         self.setup_ui()
-        self.setup_timer()
+        self.setup_tail()
         
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -172,28 +235,47 @@ class LogViewer(QWidget):
         layout.addWidget(self.log_text)
         self.setLayout(layout)
         
-    def setup_timer(self):
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_logs)
-        self.update_timer.start(2000)  # Обновление каждые 2 секунды
+    def setup_tail(self):
+        # Файл не перечитывается целиком: добавляются только новые строки
+        self.tail_watcher = LogTailWatcher(self.MAX_LINES, self)
+        self.tail_watcher.reset.connect(self._show_lines)
+        self.tail_watcher.lines_appended.connect(self._append_lines)
+        self.tail_watcher.set_path(self.log_file_path)
+        
+    def set_log_file(self, log_file_path: str = None):
+        """Сменить отображаемый файл лога"""
+        self.log_file_path = log_file_path
+        self.tail_watcher.set_path(log_file_path)
         
     def update_logs(self):
-        """Обновление содержимого логов"""
+        """Повторное чтение последних строк логов"""
         try:
-            if self.log_file_path and Path(self.log_file_path).exists():
-                with open(self.log_file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Показываем только последние 50 строк
-                    lines = content.split('\n')
-                    recent_lines = lines[-50:] if len(lines) > 50 else lines
-                    self.log_text.setPlainText('\n'.join(recent_lines))
-                    
-                    # Прокручиваем к концу
-                    scrollbar = self.log_text.verticalScrollBar()
-                    scrollbar.setValue(scrollbar.maximum())
+            self.tail_watcher.set_path(self.log_file_path)
         except Exception as e:
             self.logger.error(f"Ошибка обновления логов: {e}")
             
+    def _show_lines(self, lines: list):
+        self.log_text.setPlainText('\n'.join(lines))
+        self._scroll_to_end()
+        
+    def _append_lines(self, lines: list):
+        try:
+            self.log_text.append('\n'.join(lines))
+            # Показываем только последние MAX_LINES строк
+            extra = self.log_text.document().blockCount() - self.MAX_LINES
+            if extra > 0:
+                cursor = self.log_text.textCursor()
+                cursor.movePosition(cursor.MoveOperation.Start)
+                cursor.movePosition(cursor.MoveOperation.NextBlock, cursor.MoveMode.KeepAnchor, extra)
+                cursor.removeSelectedText()
+            self._scroll_to_end()
+        except Exception as e:
+            self.logger.error(f"Ошибка обновления логов: {e}")
+            
+    def _scroll_to_end(self):
+        scrollbar = self.log_text.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+            
     def clear_logs(self):
         """Очистка отображаемых логов"""
         self.log_text.clear()
@@ -468,14 +550,52 @@ class NotificationWidget(QFrame):
         self.deleteLater()
 
 
+class DataListModel(QAbstractListModel):
+    """Строки DataTableWidget: показываются только записи с индексами из rows"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._data: list = []
+        self._rows: list = []
+        self._texts: dict = {}
+
+    def set_rows(self, data: list, rows: list):
+        self.beginResetModel()
+        if data is not self._data:
+            self._data = data
+            self._texts = {}
+        self._rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = self._rows[index.row()]
+        # Текст строки формируется только для видимых строк
+        text = self._texts.get(row)
+        if text is None:
+            item = self._data[row]
+            text = " | ".join([f"{k}: {v}" for k, v in item.items()])
+            self._texts[row] = text
+        return text
+
+
 class DataTableWidget(QWidget):
     """Улучшенная таблица данных с поиском и фильтрацией"""
     
+    # Задержка поиска после последнего нажатия клавиши, мс
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self, headers: list):
         super().__init__()
         self.headers = headers
         self.data = []
-        self.filtered_data = []
+        self._search_index = []
+        self._matches = []
+        self._last_query = ""
         self.setup_ui()
         
     def setup_ui(self):
@@ -487,7 +607,13 @@ class DataTableWidget(QWidget):
         search_label = QLabel("Поиск:")
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Введите текст для поиска...")
-        self.search_input.textChanged.connect(self.filter_data)
+        
+        # Поиск запускается после паузы в наборе, а не на каждое нажатие
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_data(self.search_input.text()))
+        self.search_input.textChanged.connect(self.search_timer.start)
         
         search_layout.addWidget(search_label)
         search_layout.addWidget(self.search_input)
@@ -495,35 +621,50 @@ class DataTableWidget(QWidget):
         
         layout.addLayout(search_layout)
         
-        # Таблица (используем QListWidget для простоты)
-        self.table_list = QListWidget()
+        # Таблица: список на модели, элементы не пересоздаются при фильтрации
+        self.table_model = DataListModel(self)
+        self.table_list = QListView()
+        self.table_list.setUniformItemSizes(True)
+        self.table_list.setModel(self.table_model)
         layout.addWidget(self.table_list)
         
         self.setLayout(layout)
         
+    @property
+    def filtered_data(self) -> list:
+        """Записи, соответствующие текущему поисковому запросу"""
+        return [self.data[row] for row in self._matches]
+        
     def set_data(self, data: list):
         """Установка данных в таблицу"""
         self.data = data
-        self.filtered_data = data.copy()
-        self.update_display()
+        # Поисковый индекс: значения записи в нижнем регистре, строится один раз.
+        # Разделитель не дает совпасть строке на стыке двух значений
+        self._search_index = [
+            "\x00".join(str(value).lower() for value in item.values())
+            for item in data
+        ]
+        self._last_query = ""
+        self._matches = list(range(len(data)))
+        self.filter_data(self.search_input.text())
         
     def filter_data(self, search_text: str):
         """Фильтрация данных по поисковому запросу"""
-        if not search_text:
-            self.filtered_data = self.data.copy()
+        self.search_timer.stop()
+        query = search_text.lower()
+        if not query:
+            self._matches = list(range(len(self.data)))
         else:
-            self.filtered_data = [
-                item for item in self.data
-                if any(search_text.lower() in str(value).lower() for value in item.values())
-            ]
+            # Если запрос продолжает предыдущий, ищем только среди его результатов
+            if self._last_query and query.startswith(self._last_query):
+                candidates = self._matches
+            else:
+                candidates = range(len(self.data))
+            index = self._search_index
+            self._matches = [row for row in candidates if query in index[row]]
+        self._last_query = query
         self.update_display()
         
     def update_display(self):
         """Обновление отображения таблицы"""
-        self.table_list.clear()
-        
-        for item in self.filtered_data:
-            # Создаём строку для отображения
-            display_text = " | ".join([f"{k}: {v}" for k, v in item.items()])
-            list_item = QListWidgetItem(display_text)
-            self.table_list.addItem(list_item)
+        self.table_model.set_rows(self.data, self._matches)
@@ -0,0 +1,108 @@
+"""
+Фоновые задачи GUI
+
+TaskWorker выполняет длительные операции (ежедневная обработка, обновление
+токенов, рассылка отчетов) в отдельном QThread, чтобы окно не зависало.
+Прогресс, строки журнала и результат передаются в GUI через сигналы Qt,
+отмена выполняется через threading.Event, который проверяет сама операция.
+"""
+
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class _SignalLogHandler(logging.Handler):
+    """Передает записи журнала из потока задачи в сигнал"""
+
+    def __init__(self, signal, thread_id: int):
+        super().__init__(logging.INFO)
+        self._signal = signal
+        self._thread_id = thread_id
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S'))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Только записи самой задачи, а не остальных потоков приложения
+        if record.thread != self._thread_id:
+            return
+        try:
+            self._signal.emit(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+class TaskWorker(QThread):
+    """
+    Выполнение функции в отдельном потоке
+
+    Если функция принимает аргументы cancel_event и progress_callback, они
+    передаются ей автоматически.
+
+    Сигналы:
+        progress(int, str): процент выполнения и описание текущего шага
+        log_message(str): строка журнала, записанная во время выполнения
+        completed(bool, str): успех и текст ошибки (пустой при успехе)
+    """
+
+    progress = pyqtSignal(int, str)
+    log_message = pyqtSignal(str)
+    completed = pyqtSignal(bool, str)
+
+    def __init__(self, func: Callable[..., Any], *args, parent=None, **kwargs):
+        super().__init__(parent)
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel_event = threading.Event()
+        self.result: Any = None
+
+        try:
+            parameters = inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            parameters = {}
+        if 'cancel_event' in parameters:
+            self._kwargs.setdefault('cancel_event', self._cancel_event)
+        if 'progress_callback' in parameters:
+            self._kwargs.setdefault('progress_callback', self._report_progress)
+
+    @property
+    def supports_cancel(self) -> bool:
+        return self._kwargs.get('cancel_event') is self._cancel_event
+
+    @property
+    def supports_progress(self) -> bool:
+        return 'progress_callback' in self._kwargs
+
+    def _report_progress(self, percent: int, message: str = "") -> None:
+        self.progress.emit(int(percent), message)
+
+    def cancel(self) -> None:
+        """Запросить отмену; задача остановится после текущего шага"""
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> None:
+        handler = _SignalLogHandler(self.log_message, threading.get_ident())
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        error: Optional[str] = None
+        try:
+            self.result = self._func(*self._args, **self._kwargs)
+        except SystemExit as e:
+            # Некоторые модули scripts завершают процесс при ошибках API
+            error = f"Операция прервана (код {e.code})"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            root_logger.removeHandler(handler)
+
+        if error is not None:
+            self.completed.emit(False, error)
+        elif self.is_cancelled():
+            self.completed.emit(False, "Операция отменена")
+        else:
+            # Функции scripts возвращают False при ошибке
+            self.completed.emit(bool(self.result), "")
@@ -0,0 +1,423 @@
+"""
+Backfill Module
+
+This module downloads historical violation reports without the interactive
+prompts of get_violations.py: every combination of certificate, product
+group and 90-day window of the period becomes a job that creates a dispenser
+task, waits for it, downloads the file and counts its rows.
+
+    python backfill.py --start 2022-01-01 --groups all --workers 8 --rate 1
+    python backfill.py --start first --certs "ООО Ромашка" --groups 2,8
+
+Jobs run in a thread pool, task creation goes through a shared rate limiter
+and every state change is appended to a journal next to the checkpoint file
+(backfill_checkpoint.json and backfill_checkpoint.journal.jsonl by default);
+the journal is replayed on load and folded into the checkpoint when a run
+ends. Running the same command again, or
+just "python backfill.py" with the same checkpoint, resumes: finished windows
+are skipped, created tasks are polled instead of being created again and
+failed windows are retried up to --max-attempts times. Reports are saved to
+output/<certificate>/backfill.
+
+Periods start no earlier than the first violation of the participant in the
+group, and windows that earlier backfills found empty are not requested;
+both are cached per (INN, group) by violation_dates.py.
+
+Tokens are read from true_api_tokens.json and are valid for about 10 hours;
+refresh them before resuming a long backfill.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from logger_config import get_logger, log_exception
+from config_store import load_json, save_json
+from get_violations import ViolationsReport, PRODUCT_GROUPS, NO_VIOLATIONS, date_windows, validate_date
+from get_report import ReportDownloader, DOWNLOAD_EMPTY, DOWNLOAD_FORBIDDEN
+from http_session import RateLimiter
+from tracing import span, trace_run
+from violation_dates import get_violation_dates_cache
+from xlsx_utils import iter_csv_rows
+
+# Set up logger
+backfill_logger = get_logger("backfill")
+
+CHECKPOINT_FILE = "backfill_checkpoint.json"
+
+# The dispenser accepts periods of up to 91 days
+WINDOW_DAYS = 90
+DEFAULT_WORKERS = 4
+# Task creations per second over all workers
+DEFAULT_RATE = 1.0
+MAX_ATTEMPTS = 3
+
+# Job states; FINAL_STATES are not run again
+PENDING, CREATED, DOWNLOADED, DONE, EMPTY, FORBIDDEN, FAILED = (
+    "pending", "created", "downloaded", "done", "empty", "forbidden", "failed"
+)
+FINAL_STATES = (DONE, EMPTY, FORBIDDEN)
+
+def count_report_rows(file_path: str) -> int:
+    """
+    Count data rows of a downloaded report (CSV, or ZIP with a CSV inside)
+
+    Unlike report_processor.read_csv_with_encoding, an unreadable file raises
+    instead of counting as 0, so it is never taken for an empty window.
+
+    Raises:
+        ValueError: if the file cannot be decoded or has no header
+    """
+    rows = (row for row in iter_csv_rows(file_path) if row)
+    try:
+        if next(rows, None) is None:
+            raise ValueError(f"Report {file_path} has no header")
+        return sum(1 for _ in rows)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Could not decode report {file_path}: {e}")
+
+def journal_path(checkpoint_path: str) -> str:
+    """Journal of job changes made since the checkpoint was last written"""
+    return os.path.splitext(checkpoint_path)[0] + ".journal.jsonl"
+
+def job_key(cert: str, group: int, start: str, end: str) -> str:
+    return f"{cert}|{group}|{start}|{end}"
+
+class Backfill:
+    """Jobs of a backfill and their checkpoint"""
+
+    def __init__(self, checkpoint_path: str = CHECKPOINT_FILE, output_dir: str = "output"):
+        self.checkpoint_path = checkpoint_path
+        self.journal_path = journal_path(checkpoint_path)
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._journal = None
+        state = load_json(checkpoint_path) or {}
+        self.created_at = state.get("created_at", datetime.now().isoformat())
+        self.jobs: Dict[str, Dict[str, Any]] = state.get("jobs", {})
+        if self._replay_journal():
+            self.save()
+
+    def _replay_journal(self) -> int:
+        """Apply job changes of an interrupted run; returns the number of changes"""
+        try:
+            f = open(self.journal_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+        replayed = 0
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be cut by an interrupted write
+                    break
+                job = self.jobs.get(entry.get("key"))
+                if job is not None:
+                    job.update(entry.get("changes", {}))
+                    replayed += 1
+        backfill_logger.info(f"Replayed {replayed} job changes from {self.journal_path}")
+        return replayed
+
+    def save(self) -> None:
+        """Write the whole checkpoint and start an empty journal"""
+        with self._lock:
+            save_json(self.checkpoint_path, {
+                "created_at": self.created_at,
+                "updated_at": datetime.now().isoformat(),
+                "jobs": self.jobs,
+            })
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def update(self, job: Dict[str, Any], **changes) -> None:
+        """Change a job and append the change to the journal"""
+        changes["updated_at"] = datetime.now().isoformat()
+        line = json.dumps(
+            {"key": job_key(job["cert"], job["group"], job["start"], job["end"]), "changes": changes},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            job.update(changes)
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(line + "\n")
+            self._journal.flush()
+
+    def plan(self, tokens: Dict[str, str], groups: List[int], start_date: str, end_date: str,
+             window_days: int = WINDOW_DAYS, limiter: Optional[RateLimiter] = None) -> int:
+        """
+        Add the windows of a period to the jobs; windows already planned keep their state
+
+        Windows verified to be empty by earlier backfills (violation_dates.py)
+        are not added, nor are any windows of a certificate and group for
+        which the API reports no violations at all.
+
+        Args:
+            tokens: Certificate name -> token
+            groups: Product group codes
+            start_date: First day YYYY-MM-DD, or 'first' for the date of the
+                first violation of every certificate and group; a given day
+                before the first violation is moved to it
+            end_date: Last day YYYY-MM-DD
+            window_days: Days per dispenser task
+            limiter: Rate limiter of the first violation date requests
+
+        Returns:
+            int: Number of jobs added
+        """
+        cache = get_violation_dates_cache()
+        added = skipped = 0
+        no_violations = []
+        for cert, token in tokens.items():
+            client = ViolationsReport(token)
+            for group in groups:
+                if limiter and not (client.inn and cache.lookup_first_date(client.inn, group)):
+                    limiter.acquire()
+                first = client.find_first_violation_date(group)
+                if first == NO_VIOLATIONS:
+                    no_violations.append(f"{cert}/{group}")
+                    continue
+                if start_date == "first":
+                    # Same default as get_first_violation_date
+                    start = first or (datetime.now() - timedelta(days=365 * 3)).strftime("%Y-%m-%d")
+                else:
+                    # Windows before the first violation hold no data
+                    start = max(start_date, first) if first else start_date
+                empty = cache.empty_windows(client.inn, group) if client.inn else set()
+                for window_start, window_end in date_windows(start, end_date, window_days):
+                    if (window_start, window_end) in empty:
+                        skipped += 1
+                        continue
+                    key = job_key(cert, group, window_start, window_end)
+                    if key not in self.jobs:
+                        self.jobs[key] = {
+                            "cert": cert, "inn": client.inn, "group": group,
+                            "start": window_start, "end": window_end, "status": PENDING, "attempts": 0,
+                        }
+                        added += 1
+        if no_violations:
+            backfill_logger.info(f"No violations reported for {', '.join(no_violations)}, nothing planned")
+        if skipped:
+            backfill_logger.info(f"Skipped {skipped} windows known to be empty")
+        self.save()
+        return added
+
+    def runnable(self, max_attempts: int = MAX_ATTEMPTS) -> List[Dict[str, Any]]:
+        """Jobs still to run, oldest windows first"""
+        jobs = [
+            job for job in self.jobs.values()
+            if job["status"] not in FINAL_STATES and job.get("attempts", 0) < max_attempts
+        ]
+        return sorted(jobs, key=lambda job: (job["start"], job["cert"], job["group"]))
+
+    def summary(self) -> Dict[str, Any]:
+        """Job counts by state and downloaded rows by product group"""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        statuses: Dict[str, int] = {}
+        rows: Dict[str, int] = {}
+        for job in jobs:
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+            if job.get("rows"):
+                name = PRODUCT_GROUPS.get(job["group"], f"Группа {job['group']}")
+                rows[name] = rows.get(name, 0) + job["rows"]
+        return {"jobs": len(jobs), "statuses": statuses, "rows": rows}
+
+    def run_job(self, job: Dict[str, Any], token: str, limiter: RateLimiter,
+                stop_event: threading.Event) -> None:
+        """Create, download and count one window; failures are recorded in the job"""
+        cert, group = job["cert"], job["group"]
+        try:
+            with span("backfill_window", cert=cert, group=group, start=job["start"], end=job["end"]):
+                if not job.get("task_id"):
+                    if not limiter.acquire(stop_event):
+                        return
+                    with span("create_task", cert=cert, group=group):
+                        result = ViolationsReport(token).create_violations_task(
+                            start_date=job["start"], end_date=job["end"], product_group_code=group
+                        )
+                    if not result:
+                        # No access to the group
+                        self.update(job, status=FORBIDDEN)
+                        return
+                    if not result.get("id"):
+                        raise RuntimeError(f"No task id in response: {result}")
+                    self.update(job, status=CREATED, task_id=result["id"])
+
+                if job["status"] in (CREATED, PENDING, FAILED):
+                    reports_dir = os.path.join(self.output_dir, cert, "backfill")
+                    os.makedirs(reports_dir, exist_ok=True)
+                    downloader = ReportDownloader(token, group)
+                    with span("download_task", cert=cert, group=group, task=job["task_id"]):
+                        downloaded = downloader.monitor_and_download(job["task_id"], reports_dir)
+                    if not downloaded:
+                        # A failed or stuck task is created anew on the next attempt
+                        self.update(job, status=FAILED, task_id=None, attempts=job.get("attempts", 0) + 1,
+                                    error="Task failed or was not ready in time")
+                        return
+                    if downloader.last_status == DOWNLOAD_FORBIDDEN:
+                        # The task was created, but the file is denied (403)
+                        self.update(job, status=FORBIDDEN)
+                        return
+                    if downloader.last_status == DOWNLOAD_EMPTY:
+                        # 204: the dispenser has no rows for the window
+                        self.update(job, status=EMPTY)
+                        self._remember_empty(job)
+                        return
+                    if downloader.last_file is None:
+                        raise RuntimeError("Download finished without a file")
+                    self.update(job, status=DOWNLOADED, file=downloader.last_file)
+
+                if job["status"] == DOWNLOADED:
+                    with span("count_rows", cert=cert, group=group):
+                        rows = count_report_rows(job["file"])
+                    self.update(job, status=DONE, rows=rows, error=None)
+                    if not rows:
+                        # Parsed with a header and no data rows
+                        self._remember_empty(job)
+        except Exception as e:
+            log_exception(backfill_logger, e, f"Backfill of {cert}, group {group}, {job['start']}..{job['end']} failed")
+            self.update(job, status=FAILED, attempts=job.get("attempts", 0) + 1, error=str(e))
+
+    @staticmethod
+    def _remember_empty(job: Dict[str, Any]) -> None:
+        if job.get("inn"):
+            get_violation_dates_cache().add_empty_window(job["inn"], job["group"], job["start"], job["end"])
+
+    def run(self, tokens: Dict[str, str], workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+            max_attempts: int = MAX_ATTEMPTS, stop_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Run the remaining jobs
+
+        Args:
+            tokens: Certificate name -> token
+            workers: Windows processed at the same time
+            rate: Task creations per second
+            max_attempts: Attempts per window before it is given up
+            stop_event: Optional threading.Event; once set no new windows are
+                started and waiting for the rate limiter stops
+
+        Returns:
+            Dictionary from summary()
+        """
+        stop_event = stop_event or threading.Event()
+        limiter = RateLimiter(rate)
+        jobs = self.runnable(max_attempts)
+        total = len(jobs)
+        backfill_logger.info(f"Backfill: {total} windows to process with {workers} workers")
+
+        finished = [0]
+        progress_lock = threading.Lock()
+
+        def run_one(job):
+            if stop_event.is_set():
+                return
+            token = tokens.get(job["cert"])
+            if not token:
+                self.update(job, status=FAILED, attempts=max_attempts, error="No token for certificate")
+            else:
+                self.run_job(job, token, limiter, stop_event)
+            with progress_lock:
+                finished[0] += 1
+                backfill_logger.info(
+                    f"[{finished[0]}/{total}] {job['cert']}, group {job['group']}, "
+                    f"{job['start']}..{job['end']}: {job['status']}"
+                )
+
+        started = time.perf_counter()
+        with trace_run("backfill", windows=total):
+            executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill")
+            try:
+                wait_futures([executor.submit(run_one, job) for job in jobs])
+            except KeyboardInterrupt:
+                backfill_logger.warning("Backfill interrupted, finishing the windows in progress")
+                stop_event.set()
+                raise
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+                self.save()
+
+        summary = self.summary()
+        backfill_logger.info(f"Backfill finished in {time.perf_counter() - started:.0f} s: {summary['statuses']}")
+        return summary
+
+def load_backfill_tokens(cert_names: Optional[List[str]] = None) -> Dict[str, str]:
+    """Tokens of the given certificates (all when None) from true_api_tokens.json"""
+    from token_utils import load_tokens
+    tokens = dict(load_tokens())
+    if cert_names is None:
+        return tokens
+    missing = [name for name in cert_names if name not in tokens]
+    if missing:
+        backfill_logger.warning(f"No tokens for: {', '.join(missing)}")
+    return {name: tokens[name] for name in cert_names if name in tokens}
+
+def parse_groups(value: Optional[str]) -> List[int]:
+    """'all', a comma-separated list of codes, or None for products.txt"""
+    if value is None:
+        from main import load_product_groups
+        return load_product_groups()
+    if value.strip().lower() == "all":
+        return sorted(PRODUCT_GROUPS)
+    return [int(code) for code in value.split(",") if code.strip()]
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Выгрузка исторических отчетов о нарушениях без диалогов")
+    parser.add_argument("--start", help="Дата начала (YYYY-MM-DD) или 'first' - дата первого нарушения")
+    parser.add_argument("--end", help="Дата окончания (по умолчанию вчера)")
+    parser.add_argument("--groups", help="Коды товарных групп через запятую или 'all' (по умолчанию products.txt)")
+    parser.add_argument("--certs", help="Имена сертификатов через запятую (по умолчанию все с токенами)")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Дней в одном задании (не более 91)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Одновременно обрабатываемых интервалов")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Создаваемых заданий в секунду")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="Попыток на интервал")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Файл состояния для продолжения")
+    parser.add_argument("--output-dir", default="output", help="Папка отчетов")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать план")
+    args = parser.parse_args()
+
+    if not 1 <= args.window_days <= 91:
+        parser.error("--window-days должно быть от 1 до 91")
+
+    cert_names = [name.strip() for name in args.certs.split(",")] if args.certs else None
+    tokens = load_backfill_tokens(cert_names)
+    if not tokens:
+        print("Не найдены токены. Сначала обновите токены (get_tokens.py)")
+        return
+
+    backfill = Backfill(args.checkpoint, args.output_dir)
+    if args.start:
+        start = "first" if args.start.lower() == "first" else validate_date(args.start)
+        end = validate_date(args.end) if args.end else (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        added = backfill.plan(tokens, parse_groups(args.groups), start, end, args.window_days,
+                              RateLimiter(args.rate))
+        print(f"Запланировано новых интервалов: {added}")
+    elif not backfill.jobs:
+        parser.error("Укажите --start или файл состояния прежней выгрузки (--checkpoint)")
+
+    remaining = backfill.runnable(args.max_attempts)
+    print(f"Интервалов в {args.checkpoint}: {len(backfill.jobs)}, к выполнению: {len(remaining)}")
+    if args.dry_run:
+        for job in remaining:
+            print(f"{job['cert']}: группа {job['group']}, {job['start']} - {job['end']} ({job['status']})")
+        return
+
+    try:
+        summary = backfill.run(tokens, args.workers, args.rate, args.max_attempts)
+    except KeyboardInterrupt:
+        print(f"\nПрервано. Для продолжения запустите: python backfill.py --checkpoint {args.checkpoint}")
+        return
+    print(f"Состояния интервалов: {summary['statuses']}")
+    for name, rows in sorted(summary["rows"].items()):
+        print(f"{name}: {rows}")
+
+if __name__ == "__main__":
+    main()
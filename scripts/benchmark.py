@@ -0,0 +1,359 @@
+"""
+Benchmark Module
+
+This module times the report processing functions on synthetic violation
+reports (synthetic_reports.py) of growing size:
+
+    python benchmark.py --rows 1000,10000,100000 --repeat 3
+    python benchmark.py --cases read_csv_main,process_reports --rows 1000000
+    python benchmark.py --baseline benchmarks/baseline.json --threshold 0.2
+
+Generated files are kept in benchmarks/data and reused by later runs. The
+results (time of every run, min/median/mean, rows per second and, with
+--memory, the peak of Python allocations) are saved to
+benchmarks/results_<timestamp>.json. With --baseline the medians are compared
+to an earlier result file and the exit code is 1 when any case got slower by
+more than the threshold; --save-baseline stores the run as
+benchmarks/baseline.json.
+
+Cases that would not finish in reasonable time or memory at a size (pandas
+DataFrames of millions of rows, Excel files beyond the sheet limit) are
+skipped and listed in the results.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from logger_config import get_logger, log_exception
+from synthetic_reports import WRITERS
+
+# Set up logger
+benchmark_logger = get_logger("benchmark")
+
+BENCHMARK_DIR = "benchmarks"
+DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+DEFAULT_ROWS = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+
+# Limits of the cases that load a whole report into memory
+PANDAS_MAX_ROWS = 2000000
+EXCEL_MAX_ROWS = 1048575
+
+# Email benchmark: one certificate per this many violation rows
+EMAIL_ROWS_PER_CERT = 1000
+EMAIL_GROUPS = 40
+
+class Case(NamedTuple):
+    """A benchmarked function"""
+    name: str
+    description: str
+    # Input file format, see data_file(); None when the case builds its own input
+    data_format: Optional[str]
+    run: Callable[[str, int], Any]
+    max_rows: Optional[int] = None
+
+def _read_csv_main(path: str, rows: int) -> int:
+    from main import read_csv_with_encoding
+    return read_csv_with_encoding(path)
+
+def _read_csv_processor(path: str, rows: int) -> int:
+    from report_processor import read_csv_with_encoding
+    return read_csv_with_encoding(path)
+
+def _try_read_file(path: str, rows: int) -> int:
+    from process_report import try_read_file_with_encodings
+    df, _, _ = try_read_file_with_encodings(path)
+    return len(df) if df is not None else 0
+
+def _process_reports(path: str, rows: int) -> int:
+    from process_report import process_reports
+    return len(process_reports(path))
+
+def _aggregate(path: str, rows: int) -> int:
+    from aggregate_violations import aggregate_violations
+    result = aggregate_violations([path])
+    return sum(
+        count
+        for regions in result["statistics"].values()
+        for violations in regions.values()
+        for count in violations.values()
+    )
+
+def _convert_file(path: str, rows: int) -> bool:
+    import tempfile
+    from convert_reports import convert_file
+    with tempfile.TemporaryDirectory(prefix="crpt_benchmark_") as output_dir:
+        return convert_file(path, os.path.join(output_dir, "converted.csv"))
+
+def _count_xlsx(path: str, rows: int) -> int:
+    from xlsx_utils import count_xlsx_rows
+    return count_xlsx_rows(path)
+
+def _count_xlsx_pandas(path: str, rows: int) -> int:
+    # Reference: a whole DataFrame built only for its length
+    import pandas as pd
+    return len(pd.read_excel(path, engine='openpyxl'))
+
+def _iter_xlsx(path: str, rows: int) -> int:
+    from xlsx_utils import iter_xlsx_rows
+    return sum(1 for _ in iter_xlsx_rows(path)) - 1
+
+def _render_email(path: str, rows: int) -> int:
+    from email_utils import create_html_message
+    from report_templates import render_regional_report, regional_report_subject
+
+    certs = max(1, rows // EMAIL_ROWS_PER_CERT)
+    cert_reports = {
+        f"ТС {cert:04d}": {
+            f"Товарная группа {group}": (cert * 31 + group * 17) % (2 * EMAIL_ROWS_PER_CERT // EMAIL_GROUPS)
+            for group in range(1, EMAIL_GROUPS + 1)
+        }
+        for cert in range(certs)
+    }
+    html = render_regional_report("Москва", "2025-01-01", cert_reports)
+    message = create_html_message(regional_report_subject("Москва", "2025-01-01"), html,
+                                  ["benchmark@example.com"], {"sender_email": "reports@example.com"})
+    return len(message.as_bytes())
+
+CASES = [
+    Case("read_csv_main", "main.read_csv_with_encoding (row count of the pipeline)", "csv", _read_csv_main),
+    Case("read_csv_processor", "report_processor.read_csv_with_encoding", "csv", _read_csv_processor),
+    Case("try_read_file", "process_report.try_read_file_with_encodings", "csv", _try_read_file,
+         PANDAS_MAX_ROWS),
+    Case("process_reports", "process_report.process_reports on a ZIP report", "zip", _process_reports,
+         PANDAS_MAX_ROWS),
+    Case("aggregate_violations", "aggregate_violations.aggregate_violations", "json", _aggregate,
+         PANDAS_MAX_ROWS),
+    Case("convert_file", "convert_reports.convert_file (CSV and XLSX output)", "csv", _convert_file,
+         PANDAS_MAX_ROWS),
+    Case("count_xlsx", "xlsx_utils.count_xlsx_rows (row count of report_processor)", "xlsx", _count_xlsx),
+    Case("count_xlsx_pandas", "Row count through pandas.read_excel, for reference", "xlsx", _count_xlsx_pandas,
+         EXCEL_MAX_ROWS),
+    Case("iter_xlsx_rows", "xlsx_utils.iter_xlsx_rows (streamed sheet XML)", "xlsx", _iter_xlsx),
+    Case("render_email", f"Regional email, one certificate per {EMAIL_ROWS_PER_CERT} rows", None,
+         _render_email),
+]
+
+def data_file(data_format: str, rows: int, data_dir: str = DATA_DIR) -> str:
+    """
+    Get a synthetic report of the given size, generating it on first use
+
+    Args:
+        data_format: 'csv', 'xlsx', 'json' or 'zip' (a CSV packed the way
+            the API delivers reports)
+        rows: Number of violation rows
+        data_dir: Directory of the generated files
+
+    Returns:
+        Path of the file
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"violations_{rows}.{data_format}")
+    if os.path.exists(path):
+        return path
+
+    started = time.perf_counter()
+    # Written under a temporary name so an interrupted run leaves no broken file
+    partial = path + ".partial"
+    if data_format == "zip":
+        csv_path = data_file("csv", rows, data_dir)
+        with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.write(csv_path, f"violations_{rows}.csv")
+    else:
+        WRITERS[data_format](partial, rows)
+    os.replace(partial, path)
+    benchmark_logger.info(f"Generated {path} in {time.perf_counter() - started:.1f} s")
+    return path
+
+def _measure(case: Case, path: Optional[str], rows: int, repeat: int, memory: bool,
+             warm_up: bool = False) -> Dict[str, Any]:
+    if warm_up:
+        # Untimed run, so that module imports and first-call caches are not measured
+        case.run(path, rows)
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = case.run(path, rows)
+        times.append(time.perf_counter() - started)
+
+    entry = {
+        "case": case.name,
+        "rows": rows,
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2) if path else None,
+        "runs": [round(seconds, 4) for seconds in times],
+        "min_s": round(min(times), 4),
+        "median_s": round(statistics.median(times), 4),
+        "mean_s": round(statistics.mean(times), 4),
+        "rows_per_s": round(rows / statistics.median(times)) if statistics.median(times) else None,
+        "result": result,
+    }
+    if memory:
+        # A separate run: tracemalloc slows the code down several times
+        tracemalloc.start()
+        try:
+            case.run(path, rows)
+            entry["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return entry
+
+def run_benchmarks(rows_list: List[int], case_names: Optional[List[str]] = None, repeat: int = DEFAULT_REPEAT,
+                   memory: bool = False, data_dir: str = DATA_DIR, quiet: bool = True) -> Dict[str, Any]:
+    """
+    Run the benchmark cases on every size
+
+    Args:
+        rows_list: Report sizes in rows
+        case_names: Names of the cases to run, all when None
+        repeat: Timed runs per case and size
+        memory: Also measure the peak of Python allocations
+        data_dir: Directory of the generated files
+        quiet: Suppress the console output of the benchmarked code
+
+    Returns:
+        Dictionary with 'meta', 'results' and 'skipped'
+    """
+    cases = [case for case in CASES if case_names is None or case.name in case_names]
+    results, skipped = [], []
+    warmed = set()
+
+    for rows in rows_list:
+        for case in cases:
+            if case.max_rows is not None and rows > case.max_rows:
+                skipped.append({"case": case.name, "rows": rows, "reason": f"more than {case.max_rows} rows"})
+                continue
+            try:
+                path = data_file(case.data_format, rows, data_dir) if case.data_format else None
+                with open(os.devnull, "w") as sink, \
+                        contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+                    entry = _measure(case, path, rows, repeat, memory, warm_up=case.name not in warmed)
+                warmed.add(case.name)
+            except Exception as e:
+                log_exception(benchmark_logger, e, f"Benchmark {case.name} failed at {rows} rows")
+                skipped.append({"case": case.name, "rows": rows, "reason": f"error: {e}"})
+                continue
+            results.append(entry)
+            print(f"{case.name:<22} {rows:>9} rows  median {entry['median_s']:>9.4f} s  "
+                  f"{entry['rows_per_s'] or 0:>11} rows/s")
+
+    return {"meta": _meta(repeat), "results": results, "skipped": skipped}
+
+def _meta(repeat: int) -> Dict[str, Any]:
+    meta = {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+    }
+    try:
+        import pandas
+        meta["pandas"] = pandas.__version__
+    except ImportError:
+        meta["pandas"] = None
+    return meta
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare the medians of two benchmark runs
+
+    Args:
+        current: Results of run_benchmarks()
+        baseline: Earlier results in the same format
+        threshold: Relative slowdown counted as a regression (0.2 = 20%)
+
+    Returns:
+        List of dictionaries with 'case', 'rows', 'baseline_s', 'current_s',
+        'change' and 'regression', for the (case, rows) pairs of both runs
+    """
+    previous = {(entry["case"], entry["rows"]): entry for entry in baseline.get("results", [])}
+    comparison = []
+    for entry in current.get("results", []):
+        before = previous.get((entry["case"], entry["rows"]))
+        if not before or not before.get("median_s"):
+            continue
+        change = entry["median_s"] / before["median_s"] - 1
+        comparison.append({
+            "case": entry["case"],
+            "rows": entry["rows"],
+            "baseline_s": before["median_s"],
+            "current_s": entry["median_s"],
+            "change": round(change, 3),
+            "regression": change > threshold,
+        })
+    return comparison
+
+def format_comparison(comparison: List[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<22} {'rows':>9} {'baseline, s':>12} {'current, s':>11} {'change':>8}"]
+    for entry in comparison:
+        mark = "  REGRESSION" if entry["regression"] else ""
+        lines.append(
+            f"{entry['case']:<22} {entry['rows']:>9} {entry['baseline_s']:>12.4f} "
+            f"{entry['current_s']:>11.4f} {entry['change']:>+8.1%}{mark}"
+        )
+    return "\n".join(lines)
+
+def save_results(results: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Write benchmark results, to benchmarks/results_<timestamp>.json by default"""
+    path = path or os.path.join(BENCHMARK_DIR, f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+    return path
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Замеры производительности обработки отчетов на синтетических данных")
+    parser.add_argument("--rows", default=",".join(str(rows) for rows in DEFAULT_ROWS),
+                        help="Размеры отчетов в строках через запятую (от 1000 до 10000000)")
+    parser.add_argument("--cases", help="Замеры через запятую (по умолчанию все): " +
+                        ", ".join(case.name for case in CASES))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Повторов каждого замера")
+    parser.add_argument("--memory", action="store_true", help="Измерять пиковое потребление памяти (tracemalloc)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Папка сгенерированных отчетов")
+    parser.add_argument("--output", help="Файл результатов (по умолчанию benchmarks/results_<время>.json)")
+    parser.add_argument("--baseline", help="Файл результатов для сравнения")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимое замедление относительно базового замера (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Сохранить результаты в {BASELINE_FILE}")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод замеряемых функций")
+    args = parser.parse_args()
+
+    case_names = [name.strip() for name in args.cases.split(",")] if args.cases else None
+    unknown = set(case_names or []) - {case.name for case in CASES}
+    if unknown:
+        parser.error(f"Неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    rows_list = [int(rows) for rows in args.rows.split(",")]
+    results = run_benchmarks(rows_list, case_names, args.repeat, args.memory, args.data_dir, quiet=not args.verbose)
+    for entry in results["skipped"]:
+        print(f"{entry['case']:<22} {entry['rows']:>9} rows  пропущен: {entry['reason']}")
+    print(f"Результаты сохранены в {save_results(results, args.output)}")
+    if args.save_baseline:
+        print(f"Базовый замер сохранен в {save_results(results, BASELINE_FILE)}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparison = compare_results(results, json.load(f), args.threshold)
+        print(format_comparison(comparison))
+        regressions = [entry for entry in comparison if entry["regression"]]
+        if regressions:
+            print(f"Замедление более чем на {args.threshold:.0%}: {len(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ import csv
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
+from http_session import api_base_url
 
 # Константы
 PRODUCT_GROUPS = {
@@ -46,7 +47,7 @@ PRODUCT_GROUPS = {
     38: "Лекарственные средства"
 }
 
-BASE_URL = "https://markirovka.crpt.ru/api/v3/true-api"
+BASE_URL = api_base_url()
 TEST_DATE = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
 class CertificateDiagnostic:
@@ -0,0 +1,233 @@
+"""
+Configuration Store Module
+
+This module provides a single cache for the JSON configuration files
+(regions.json, certificates.json, cert_inns.json, true_api_tokens.json,
+email_config.json, scheduler_config.json). Parsed documents and the reverse
+indexes derived from them (TC -> region, thumbprint -> certificate,
+certificate -> ТС/ИНН pairs) are kept in memory until the file's
+modification time or size changes. Writes go through a temporary file and
+an atomic rename, so readers never see a half-written config.
+"""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from logger_config import get_logger, log_exception
+
+# Set up logger
+config_logger = get_logger("config")
+
+REGIONS_FILE = 'regions.json'
+CERTIFICATES_FILE = 'certificates.json'
+CERT_INNS_FILE = 'cert_inns.json'
+TOKENS_FILE = 'true_api_tokens.json'
+EMAIL_CONFIG_FILE = 'email_config.json'
+
+class ConfigStore:
+    """Cache of parsed JSON files invalidated by mtime/size"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Tuple[tuple, Any]] = {}
+        self._derived: Dict[Tuple[str, str], Tuple[tuple, Any]] = {}
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[tuple]:
+        """Identity of the file's current version, None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _document(self, path: str) -> Tuple[Optional[tuple], Any]:
+        """Return (version key, parsed document) reading the file only when it changed"""
+        path = os.path.abspath(path)
+        key = self._file_key(path)
+
+        with self._lock:
+            cached = self._documents.get(path)
+            if cached and cached[0] == key:
+                return cached
+
+            if key is None:
+                self._documents.pop(path, None)
+                return None, None
+
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            config_logger.debug(f"Loaded {os.path.basename(path)} from disk")
+            self._documents[path] = (key, data)
+            return key, data
+
+    def exists(self, path: str) -> bool:
+        """Check if the config file exists"""
+        return self._file_key(os.path.abspath(path)) is not None
+
+    def load(self, path: str, default: Any = None, copy_result: bool = True) -> Any:
+        """
+        Get the parsed contents of a JSON file
+
+        Args:
+            path: Path to the file
+            default: Value returned when the file does not exist
+            copy_result: Return a deep copy so callers may modify it freely
+
+        Returns:
+            Parsed document or default
+
+        Raises:
+            ValueError: if the file is not valid JSON
+        """
+        _, data = self._document(path)
+        if data is None:
+            return default
+        return copy.deepcopy(data) if copy_result else data
+
+    def save(self, path: str, data: Any) -> None:
+        """
+        Write a JSON file atomically and update the cache
+
+        Raises:
+            OSError: if the file could not be written
+        """
+        path = os.path.abspath(path)
+        directory = os.path.dirname(path)
+
+        with self._lock:
+            fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(path):
+                    shutil.copymode(path, temp_path)
+                self._replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            self._documents[path] = (self._file_key(path), copy.deepcopy(data))
+
+    @staticmethod
+    def _replace(source: str, target: str, attempts: int = 5) -> None:
+        """os.replace with a few retries for files briefly locked by readers on Windows"""
+        for attempt in range(attempts):
+            try:
+                os.replace(source, target)
+                return
+            except PermissionError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.1 * (attempt + 1))
+
+    def derived(self, path: str, name: str, builder: Callable[[Any], Any], default: Any = None) -> Any:
+        """
+        Get a value computed from a document, recomputed only when the file changes
+
+        Args:
+            path: Path to the source file
+            name: Name of the derived value
+            builder: Function building the value from the parsed document
+            default: Document passed to builder when the file does not exist
+
+        Returns:
+            The derived value (shared, callers must not modify it)
+        """
+        key, data = self._document(path)
+        cache_key = (os.path.abspath(path), name)
+
+        with self._lock:
+            cached = self._derived.get(cache_key)
+            if cached and cached[0] == key:
+                return cached[1]
+
+            value = builder(data if data is not None else default)
+            self._derived[cache_key] = (key, value)
+            return value
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop cached data for one file or for all files"""
+        with self._lock:
+            if path is None:
+                self._documents.clear()
+                self._derived.clear()
+                return
+            path = os.path.abspath(path)
+            self._documents.pop(path, None)
+            for cache_key in [k for k in self._derived if k[0] == path]:
+                del self._derived[cache_key]
+
+_store = ConfigStore()
+
+def get_config_store() -> ConfigStore:
+    """Get the process-wide configuration store"""
+    return _store
+
+def load_json(path: str, default: Any = None) -> Any:
+    """Load a JSON config through the shared store (returns a private copy)"""
+    return _store.load(path, default)
+
+def save_json(path: str, data: Any) -> None:
+    """Atomically save a JSON config through the shared store"""
+    _store.save(path, data)
+
+# -------------------- Reverse indexes --------------------
+
+def _build_tc_region_map(regions: Dict[str, Any]) -> Dict[str, str]:
+    mapping = {}
+    for region_id, region_data in (regions or {}).items():
+        if isinstance(region_data, dict):
+            for tc in region_data.get('tc_list', []):
+                mapping[tc] = region_id
+    return mapping
+
+def _build_thumbprint_map(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {
+        cert['thumbprint']: cert
+        for cert in (data or {}).get('certificates', [])
+        if cert.get('thumbprint')
+    }
+
+def _build_cert_inn_pairs(data: Dict[str, Any]) -> Dict[str, List[Tuple[str, str]]]:
+    result = {}
+    for cert_name, pairs in (data or {}).items():
+        result[cert_name] = [
+            (tc, inn)
+            for pair in pairs if isinstance(pair, dict)
+            for tc, inn in pair.items()
+        ]
+    return result
+
+def get_tc_region_map() -> Dict[str, str]:
+    """TC name -> region id, from regions.json"""
+    try:
+        return _store.derived(REGIONS_FILE, 'tc_region', _build_tc_region_map, {})
+    except Exception as e:
+        log_exception(config_logger, e, "Error building TC to region index")
+        return {}
+
+def get_thumbprint_map() -> Dict[str, Dict[str, Any]]:
+    """Certificate thumbprint -> certificate entry, from certificates.json"""
+    try:
+        return _store.derived(CERTIFICATES_FILE, 'thumbprint', _build_thumbprint_map, {})
+    except Exception as e:
+        log_exception(config_logger, e, "Error building thumbprint index")
+        return {}
+
+def get_cert_inn_pairs() -> Dict[str, List[Tuple[str, str]]]:
+    """Certificate name -> list of (ТС, ИНН) pairs, from cert_inns.json"""
+    try:
+        return _store.derived(CERT_INNS_FILE, 'cert_inn_pairs', _build_cert_inn_pairs, {})
+    except Exception as e:
+        log_exception(config_logger, e, "Error building certificate ИНН index")
+        return {}
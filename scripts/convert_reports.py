@@ -1,90 +1,109 @@
 import os
 import sys
 import csv
+import zipfile
 import chardet
 import pandas as pd
 from datetime import datetime
 from logger_config import get_logger, log_exception
 from get_violations import PRODUCT_GROUPS
+from xlsx_utils import (
+    map_zip_members, open_report, read_report_head, sniff_csv_format, write_rows_xlsx, zip_csv_members
+)
 
 # Настройка логгера
 logger = get_logger("reports_converter")
 
-def detect_encoding(file_path):
+def detect_encoding(file_path, member=None, raw_data=None):
     """
-    Определяет кодировку бинарного файла
+    Определяет кодировку бинарного файла или файла внутри ZIP-архива
+    
+    Args:
+        raw_data: Уже прочитанное начало файла (иначе читается до 1MB)
     """
     try:
-        with open(file_path, 'rb') as f:
-            raw_data = f.read(1024*1024)  # Читаем до 1MB для анализа
-            result = chardet.detect(raw_data)
-            encoding = result['encoding'] or 'utf-8'
-            confidence = result['confidence']
-            logger.info(f"Обнаружена кодировка: {encoding} (достоверность: {confidence})")
-            return encoding, confidence
+        if raw_data is None:
+            raw_data = read_report_head(file_path, member)  # Читаем до 1MB для анализа
+        result = chardet.detect(raw_data)
+        encoding = result['encoding'] or 'utf-8'
+        confidence = result['confidence']
+        logger.info(f"Обнаружена кодировка: {encoding} (достоверность: {confidence})")
+        return encoding, confidence
     except Exception as e:
         logger.error(f"Ошибка при определении кодировки: {str(e)}")
         return 'utf-8', 0
 
-def try_read_csv_with_encodings(file_path):
+def read_zip_csv(file_path):
     """
-    Пытается прочитать CSV-файл с различными кодировками и разделителями
+    Читает CSV-файлы прямо из ZIP-архива, без распаковки на диск.
+    Несколько файлов архива читаются параллельно и объединяются
     
     Returns:
-        DataFrame или None в случае неудачи
+        DataFrame, кодировка и разделитель первого файла или None, None, None
     """
-    encodings = ['cp1251', 'utf-8', 'utf-8-sig', 'windows-1251', 'latin1', 'iso-8859-1']
-    separators = [';', ',', '\t', '|']
+    members = zip_csv_members(file_path)
+    if not members:
+        logger.error(f"В ZIP-архиве нет CSV-файлов: {file_path}")
+        return None, None, None
+    logger.info(f"Файл является ZIP-архивом, CSV-файлов: {len(members)}")
     
-    # Добавляем обнаруженную кодировку в начало списка
-    detected_encoding, confidence = detect_encoding(file_path)
-    if detected_encoding and detected_encoding not in encodings:
-        encodings.insert(0, detected_encoding)
-        
-    for encoding in encodings:
-        for separator in separators:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding, sep=separator, error_bad_lines=False)
-                if len(df.columns) > 1:  # Проверяем, что файл корректно разобран
-                    logger.info(f"Успешно прочитан файл с кодировкой: {encoding}, разделитель: {separator}")
-                    return df, encoding, separator
-            except Exception as e:
-                # Просто продолжаем с другими комбинациями
-                pass
+    results = [result for result in map_zip_members(file_path, try_read_csv_with_encodings, members)
+               if result[0] is not None]
+    if not results:
+        return None, None, None
+    
+    df = results[0][0] if len(results) == 1 else pd.concat([result[0] for result in results], ignore_index=True)
+    return df, results[0][1], results[0][2]
+
+def try_read_csv_with_encodings(file_path, member=None):
+    """
+    Читает CSV-файл, определяя кодировку и разделитель по его началу
+    
+    Файл разбирается один раз; другая подходящая кодировка пробуется, только
+    если дальше в файле встретились байты, которые выбранная не декодирует.
+    
+    Args:
+        file_path: Путь к CSV-файлу или ZIP-архиву
+        member: Имя CSV-файла внутри архива (по умолчанию читаются все CSV архива)
+    
+    Returns:
+        DataFrame, кодировка и разделитель или None, None, None в случае неудачи
+    """
+    if member is None and zipfile.is_zipfile(file_path):
+        return read_zip_csv(file_path)
     
-    # Если стандартные методы не сработали, пробуем прочитать как бинарный файл
+    source = f"{file_path}:{member}" if member else file_path
     try:
-        # Бинарное чтение и попытка декодирования
-        with open(file_path, 'rb') as f:
-            content = f.read()
-            
-        # Пробуем найти заголовок или структуру данных
-        from io import BytesIO
-        import struct
-        
-        # Проверяем наличие ZIP-сигнатуры
-        if content.startswith(b'PK\x03\x04'):
-            logger.info("Файл является ZIP-архивом")
-            import zipfile
-            with zipfile.ZipFile(BytesIO(content)) as zf:
-                for name in zf.namelist():
-                    if name.endswith('.csv'):
-                        with zf.open(name) as csv_file:
-                            csv_content = csv_file.read()
-                            # Записываем извлеченный CSV во временный файл
-                            temp_file = file_path + ".extracted.csv"
-                            with open(temp_file, 'wb') as f:
-                                f.write(csv_content)
-                            logger.info(f"Извлечен CSV из ZIP: {name}, сохранен как {temp_file}")
-                            # Рекурсивно вызываем для извлеченного файла
-                            return try_read_csv_with_encodings(temp_file)
-        
-        logger.error(f"Не удалось прочитать файл: {file_path}")
-        return None, None, None
-        
+        head = read_report_head(file_path, member)
     except Exception as e:
-        logger.error(f"Ошибка при обработке бинарного файла: {str(e)}")
+        logger.error(f"Не удалось прочитать файл {source}: {str(e)}")
         return None, None, None
+    
+    # Обнаруженная кодировка проверяется первой
+    detected_encoding, confidence = detect_encoding(file_path, member, head)
+    encodings = [detected_encoding, 'cp1251', 'utf-8', 'utf-8-sig', 'windows-1251', 'latin1', 'iso-8859-1']
+    encodings, separator = sniff_csv_format(head, encodings)
+    if not encodings or separator is None:
+        logger.error(f"Не удалось определить кодировку и разделитель файла: {source}")
+        return None, None, None
+    
+    for encoding in encodings:
+        try:
+            with open_report(file_path, member) as stream:
+                df = pd.read_csv(stream, encoding=encoding, sep=separator, on_bad_lines='skip')
+            if len(df.columns) > 1:  # Проверяем, что файл корректно разобран
+                logger.info(f"Успешно прочитан файл с кодировкой: {encoding}, разделитель: {separator}")
+                return df, encoding, separator
+            break
+        except UnicodeDecodeError:
+            # Начало файла декодировалось, а дальше встретились другие байты
+            continue
+        except Exception as e:
+            logger.error(f"Ошибка при разборе файла {source}: {str(e)}")
+            break
+    
+    logger.error(f"Не удалось прочитать файл: {source}")
+    return None, None, None
 
 def convert_file(input_path, output_path):
     """
@@ -110,9 +129,11 @@ def convert_file(input_path, output_path):
         # Сохраняем в читаемый формат
         df.to_csv(output_path, encoding='utf-8', index=False)
         
-        # Также сохраняем в формате Excel для более удобного просмотра
+        # Также сохраняем в формате Excel для более удобного просмотра; строки
+        # пишутся потоком, сверх лимита Excel - на следующие листы
         excel_path = output_path.replace('.csv', '.xlsx')
-        df.to_excel(excel_path, index=False)
+        values = df.astype(object).where(df.notna(), None)
+        write_rows_xlsx(excel_path, values.itertuples(index=False, name=None), [str(col) for col in df.columns])
         
         logger.info(f"Файл успешно конвертирован: {input_path} -> {output_path}")
         logger.info(f"Также сохранен в Excel: {excel_path}")
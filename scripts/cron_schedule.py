@@ -0,0 +1,176 @@
+"""
+Cron Schedule Module
+
+This module provides parsing of schedule expressions used in
+scheduler_config.json and calculation of their fire times. Two forms are
+accepted: the short daily form "HH:MM" and standard five-field cron
+expressions ("minute hour day month weekday", e.g. "*/30 8-20 * * 1-5").
+Times are local and have minute resolution.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import FrozenSet, Optional
+
+DAILY_TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# (name, lowest value, highest value) of the five cron fields
+FIELDS = [
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+]
+
+# Expressions that never match (e.g. "0 0 31 2 *") are detected after this horizon
+SEARCH_HORIZON = timedelta(days=5 * 366)
+
+def _parse_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    """Parse one cron field into the set of matching values"""
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid step in {name} field: {text}")
+            step = int(step_text)
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ValueError(f"Invalid range in {name} field: {text}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            # "5/15" means every 15 starting from 5
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"Invalid {name} field: {text}")
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"{name.capitalize()} field out of range {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+class CronSchedule:
+    """Parsed schedule expression that can compute its next fire time"""
+
+    def __init__(self, expression: str):
+        """
+        Args:
+            expression: "HH:MM", a five-field cron expression or an alias like @daily
+
+        Raises:
+            ValueError: if the expression cannot be parsed
+        """
+        self.expression = str(expression).strip()
+        text = ALIASES.get(self.expression.lower(), self.expression)
+
+        match = DAILY_TIME_PATTERN.match(text)
+        if match:
+            hour, minute = int(match.group(1)), int(match.group(2))
+            if hour > 23 or minute > 59:
+                raise ValueError(f"Invalid time: {self.expression}")
+            text = f"{minute} {hour} * * *"
+
+        parts = text.split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f"Expected HH:MM or 5 cron fields, got: {self.expression}")
+
+        minutes, hours, days, months, weekdays = (
+            _parse_field(part, name, low, high)
+            for part, (name, low, high) in zip(parts, FIELDS)
+        )
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        # Both 0 and 7 mean Sunday
+        self.weekdays = frozenset(0 if day == 7 else day for day in weekdays)
+        self.days_restricted = parts[2] != '*'
+        self.weekdays_restricted = parts[4] != '*'
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expression!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CronSchedule) and self.expression == other.expression
+
+    def __hash__(self) -> int:
+        return hash(self.expression)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """Day-of-month and weekday check with the usual cron semantics"""
+        day_ok = moment.day in self.days
+        # datetime.weekday() is 0 for Monday, cron uses 0 for Sunday
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # When both fields are restricted cron fires if either of them matches
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Get the first fire time strictly after the given moment
+
+        Args:
+            moment: Naive local datetime
+
+        Returns:
+            datetime: Next fire time (seconds and microseconds are zero)
+
+        Raises:
+            ValueError: if the expression never matches
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + SEARCH_HORIZON
+
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"Schedule never fires: {self.expression}")
+
+    def last_before(self, moment: datetime, since: datetime) -> Optional[datetime]:
+        """
+        Get the latest fire time in the interval (since, moment]
+
+        Args:
+            moment: End of the interval
+            since: Start of the interval (exclusive)
+
+        Returns:
+            datetime or None if the schedule did not fire in the interval
+        """
+        latest = None
+        candidate = self.next_after(since)
+        while candidate <= moment:
+            latest = candidate
+            candidate = self.next_after(candidate)
+        return latest
@@ -1,75 +1,273 @@
-import importlib
+"""
+Dependency Manager Module
+
+This module provides the start-up dependency check of the CLI and the GUI.
+Packages are located with importlib.util.find_spec, which finds a module
+without executing it, so the check no longer imports pandas, telegram, docx
+and the other heavy packages. A successful check is cached in
+dependency_cache.json together with a fingerprint of the Python environment
+(interpreter, version and modification times of the sys.path directories,
+which change whenever a package is installed or removed); while the
+fingerprint matches, the check is skipped entirely.
+
+The module also reports an import-time profile of a start-up module:
+
+    python dependency_manager.py --profile main
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
 import subprocess
 import sys
-import os
 import time
-from typing import List, Dict, Set
+from typing import Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(SCRIPT_DIR, "dependency_cache.json")
 
-def check_and_install_dependencies():
+# Packages required by the CLI and their import names
+REQUIRED_PACKAGES = {
+    "requests": "requests",
+    "colorama": "colorama",
+    "python-telegram-bot": "telegram",
+    "pandas": "pandas",
+    "chardet": "chardet",
+    "cryptography": "cryptography",
+    "pytz": "pytz",
+    "python-docx": "docx",
+    "markdown": "markdown",
+}
+if sys.platform == "win32":
+    # For Windows-specific functionality
+    REQUIRED_PACKAGES["pywin32"] = "win32com"
+
+# Import names of distributions whose name differs from the module name;
+# None means the distribution has no module of its own to look for
+IMPORT_NAMES = {
+    "python-telegram-bot": "telegram",
+    "python-docx": "docx",
+    "pywin32": "win32com",
+    "pillow": "PIL",
+    "pyyaml": "yaml",
+    "pyqt6-qt6": None,
+    "pyqt6-sip": "PyQt6.sip",
+    "pytest-qt": "pytestqt",
+    "apscheduler": "apscheduler",
+    "pyjwt": "jwt",
+    "xlsxwriter": "xlsxwriter",
+}
+
+# Number of modules shown in the import-time profile
+PROFILE_TOP = 20
+
+def environment_fingerprint(extra: str = "") -> str:
     """
-    Check for and install all required dependencies
+    Get a fingerprint of the Python environment
+
+    Args:
+        extra: Additional text mixed into the fingerprint (e.g. the requirement list)
+
+    Returns:
+        str: Hex digest that changes when packages are installed or removed
     """
-    # Dictionary of required packages and their import names (if different)
-    required_packages = {
-        "requests": "requests",
-        "colorama": "colorama", 
-        "python-telegram-bot": "telegram",
-        "pandas": "pandas",
-        "chardet": "chardet",
-        "cryptography": "cryptography",
-        "pytz": "pytz",
-        "python-docx": "docx",
-        "markdown": "markdown",
-        "pywin32": "win32com",  # For Windows-specific functionality
-    }
-    
-    missing_packages = []
-    
-    # Check which packages are missing
-    print("Checking required dependencies...")
-    for package, import_name in required_packages.items():
+    parts = [sys.executable, sys.version, extra]
+    project_dir = os.path.dirname(SCRIPT_DIR)
+    for path in sys.path:
+        # The project directories change with every log or report written
+        if not path or os.path.abspath(path).startswith(project_dir):
+            continue
         try:
-            importlib.import_module(import_name)
-            # Successfully imported
-        except ImportError:
-            missing_packages.append(package)
-    
-    # Install missing packages
-    if missing_packages:
-        print(f"Installing missing dependencies: {', '.join(missing_packages)}")
-        for package in missing_packages:
-            try:
-                print(f"Installing {package}...")
-                subprocess.check_call([sys.executable, "-m", "pip", "install", package, "--upgrade"])
-                print(f"Successfully installed {package}")
-            except subprocess.CalledProcessError as e:
-                print(f"Failed to install {package}: {e}")
-            except Exception as e:
-                print(f"Error installing {package}: {e}")
-        
-        # Give a moment for installations to complete
-        time.sleep(2)
-        
-        # Verify installations
-        still_missing = []
-        for package, import_name in required_packages.items():
-            if package in missing_packages:
-                try:
-                    importlib.import_module(import_name)
-                    print(f"Successfully verified {package} installation")
-                except ImportError:
-                    still_missing.append(package)
-        
-        if still_missing:
-            print(f"Warning: Some packages could not be installed: {', '.join(still_missing)}")
-            return False
-        else:
-            print("All dependencies installed successfully!")
-            return True
-    else:
-        print("All required dependencies are already installed.")
+            parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+        except OSError:
+            continue
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def _load_cache() -> Dict[str, str]:
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(key: str, fingerprint: str) -> None:
+    cache = _load_cache()
+    cache[key] = fingerprint
+    try:
+        with open(CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError:
+        pass
+
+def is_installed(import_name: str) -> bool:
+    """Check whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(import_name) is not None
+    except (ImportError, ValueError):
+        # Raised for a submodule whose parent package is missing
+        return False
+
+def find_missing(packages: Dict[str, Optional[str]]) -> List[str]:
+    """
+    Get distributions whose modules cannot be found
+
+    Args:
+        packages: Mapping of distribution name to import name
+
+    Returns:
+        List of missing distribution names
+    """
+    return [package for package, import_name in packages.items()
+            if import_name and not is_installed(import_name)]
+
+def _marker_applies(marker: str) -> bool:
+    """Evaluate an environment marker of a requirements line"""
+    try:
+        from packaging.markers import Marker
+        return Marker(marker).evaluate({"extra": ""})
+    except ImportError:
+        pass
+    except Exception:
+        return False
+    # Without packaging only the platform markers used in this project are understood
+    match = re.fullmatch(r"\s*sys_platform\s*(==|!=)\s*['\"]([^'\"]+)['\"]\s*", marker)
+    if not match:
+        return False
+    return (sys.platform == match.group(2)) == (match.group(1) == "==")
+
+def parse_requirements(path: str) -> Dict[str, Optional[str]]:
+    """
+    Read a requirements file
+
+    Args:
+        path: Path to requirements.txt
+
+    Returns:
+        Mapping of distribution name to import name for the requirements
+        applying to this platform
+    """
+    packages = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            requirement, _, marker = line.partition(";")
+            if marker and not _marker_applies(marker):
+                continue
+            match = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", requirement.strip())
+            if not match:
+                continue
+            name = match.group(0)
+            key = name.lower()
+            packages[name] = IMPORT_NAMES.get(key, name.replace("-", "_"))
+    return packages
+
+def _pip_install(args: List[str]) -> bool:
+    try:
+        subprocess.check_call([sys.executable, "-m", "pip", "install"] + args)
         return True
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to install {' '.join(args)}: {e}")
+    except Exception as e:
+        print(f"Error installing {' '.join(args)}: {e}")
+    return False
+
+def _check(key: str, packages: Dict[str, Optional[str]], install_args: List[str],
+           use_cache: bool) -> Tuple[bool, List[str]]:
+    """Shared check: cached fingerprint, find_spec lookup, installation"""
+    extra = json.dumps(sorted(packages.items(), key=lambda item: item[0]))
+    if use_cache and _load_cache().get(key) == environment_fingerprint(extra):
+        return True, []
+
+    missing = find_missing(packages)
+    if missing:
+        print(f"Installing missing dependencies: {', '.join(missing)}")
+        _pip_install(install_args or missing)
+        importlib.invalidate_caches()
+        missing = find_missing(packages)
+
+    if not missing:
+        _save_cache(key, environment_fingerprint(extra))
+    return not missing, missing
+
+def check_and_install_dependencies(use_cache: bool = True) -> bool:
+    """
+    Check for and install all required dependencies
+
+    Args:
+        use_cache: Skip the check when the environment has not changed since
+            the last successful one
+
+    Returns:
+        bool: True if all packages are available
+    """
+    ok, missing = _check("required", REQUIRED_PACKAGES, [], use_cache)
+    if not ok:
+        print(f"Warning: Some packages could not be installed: {', '.join(missing)}")
+    return ok
+
+def check_requirements_file(path: str, use_cache: bool = True) -> bool:
+    """
+    Install a requirements file only if some of its packages are missing
+
+    Args:
+        path: Path to requirements.txt
+        use_cache: Skip the check when the environment has not changed
+
+    Returns:
+        bool: True if all packages are available
+    """
+    path = os.path.abspath(path)
+    ok, missing = _check(path, parse_requirements(path), ["-r", path], use_cache)
+    if not ok:
+        print(f"Warning: Some packages could not be installed: {', '.join(missing)}")
+    return ok
+
+def import_profile(module: str, cwd: Optional[str] = None) -> Tuple[List[Tuple[str, int, int]], float]:
+    """
+    Measure a cold import of a module in a fresh interpreter (python -X importtime)
+
+    Args:
+        module: Module to import, e.g. 'main' or 'main_window'
+        cwd: Working directory of the interpreter (defaults to the scripts directory)
+
+    Returns:
+        Tuple of (entries, wall_seconds); entries are (module, self_us,
+        cumulative_us) sorted by cumulative time, slowest first
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or SCRIPT_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"Import of {module} failed")
+    entries.sort(key=lambda entry: entry[2], reverse=True)
+    return entries, wall
+
+def print_import_profile(module: str, cwd: Optional[str] = None, top: int = PROFILE_TOP) -> None:
+    """Print the slowest imports of a cold import of a module"""
+    entries, wall = import_profile(module, cwd)
+    total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+    print(f"Cold import of {module}: {total / 1000:.0f} ms (interpreter start included: {wall * 1000:.0f} ms)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in entries[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
 
 if __name__ == "__main__":
-    # When run directly, check and install dependencies
-    check_and_install_dependencies()
+    if len(sys.argv) > 2 and sys.argv[1] == "--profile":
+        print_import_profile(sys.argv[2])
+    else:
+        # When run directly, check and install dependencies
+        check_and_install_dependencies(use_cache="--no-cache" not in sys.argv)
@@ -0,0 +1,393 @@
+"""
+Email Outbox Module
+
+This module provides a persistent SQLite-backed outbox for report emails.
+Report generation only enqueues rendered MIME messages; a background sender
+delivers them with exponential retry, so a slow or unavailable SMTP server
+never delays data processing.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from logger_config import get_logger, log_exception
+from email_utils import load_email_config, send_raw_message
+
+# Set up logger
+email_logger = get_logger("email")
+
+OUTBOX_DB = 'email_outbox.db'
+
+# Delivery states
+STATE_PENDING = 'pending'
+STATE_SENDING = 'sending'
+STATE_SENT = 'sent'
+STATE_FAILED = 'failed'
+
+# Retry policy: 1, 2, 4, ... minutes, capped at one hour
+MAX_ATTEMPTS = 8
+BASE_RETRY_DELAY = 60
+MAX_RETRY_DELAY = 3600
+
+# A message stuck in 'sending' longer than this belongs to a sender that died
+SENDING_TIMEOUT = 900
+
+# Upper bound for the sender's sleep between queue checks
+POLL_INTERVAL = 60
+
+# How long deliver_now waits for messages another sender is delivering
+DELIVERY_TIMEOUT = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    region TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    subject TEXT,
+    recipients TEXT NOT NULL,
+    message BLOB NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    sent_at TEXT,
+    UNIQUE (region, report_date)
+)
+"""
+
+def _connect(db_path: str = OUTBOX_DB) -> sqlite3.Connection:
+    """Open the outbox database, creating the schema if needed"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(_SCHEMA)
+    return conn
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff delay in seconds after the given number of failed attempts"""
+    return min(BASE_RETRY_DELAY * (2 ** max(attempts - 1, 0)), MAX_RETRY_DELAY)
+
+def enqueue_message(region: str, report_date: str, msg, recipients: List[str],
+                    db_path: str = OUTBOX_DB) -> bool:
+    """
+    Put a rendered message into the outbox
+
+    Messages are deduplicated by (region, report_date): a report that has
+    already been delivered is never sent again, while a pending or failed one
+    is replaced by the fresh rendering and its retry counter is reset.
+
+    Args:
+        region: Region identifier
+        report_date: Report date in YYYY-MM-DD format
+        msg: email.message.Message to deliver
+        recipients: List of recipient addresses
+        db_path: Path to the outbox database
+
+    Returns:
+        bool: True if the message is queued (or was already delivered), False otherwise
+    """
+    now = time.time()
+    timestamp = datetime.now().isoformat()
+
+    try:
+        conn = _connect(db_path)
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT state FROM outbox WHERE region = ? AND report_date = ?",
+                    (region, report_date)
+                ).fetchone()
+
+                if row and row['state'] in (STATE_SENT, STATE_SENDING):
+                    email_logger.info(
+                        f"Report for region {region} on {report_date} is already {row['state']}, skipping"
+                    )
+                    return True
+
+                conn.execute(
+                    """
+                    INSERT INTO outbox (region, report_date, subject, recipients, message, state,
+                                        attempts, next_attempt_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+                    ON CONFLICT (region, report_date) DO UPDATE SET
+                        subject = excluded.subject,
+                        recipients = excluded.recipients,
+                        message = excluded.message,
+                        state = excluded.state,
+                        attempts = 0,
+                        next_attempt_at = excluded.next_attempt_at,
+                        claimed_at = NULL,
+                        last_error = NULL,
+                        updated_at = excluded.updated_at
+                    """,
+                    (region, report_date, msg['Subject'], json.dumps(recipients, ensure_ascii=False),
+                     msg.as_bytes(), STATE_PENDING, now, timestamp, timestamp)
+                )
+        finally:
+            conn.close()
+
+        email_logger.info(f"Queued report for region {region} on {report_date} ({len(recipients)} recipients)")
+        return True
+
+    except Exception as e:
+        log_exception(email_logger, e, f"Error queueing report for region {region}")
+        return False
+
+def _claim_next(conn: sqlite3.Connection) -> Optional[sqlite3.Row]:
+    """Atomically mark the next due message as 'sending' and return it"""
+    now = time.time()
+
+    with conn:
+        # Give messages abandoned by a crashed sender back to the queue
+        conn.execute(
+            "UPDATE outbox SET state = ?, claimed_at = NULL WHERE state = ? AND claimed_at < ?",
+            (STATE_PENDING, STATE_SENDING, now - SENDING_TIMEOUT)
+        )
+
+        while True:
+            row = conn.execute(
+                "SELECT * FROM outbox WHERE state = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (STATE_PENDING, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            cursor = conn.execute(
+                "UPDATE outbox SET state = ?, claimed_at = ? WHERE id = ? AND state = ?",
+                (STATE_SENDING, now, row['id'], STATE_PENDING)
+            )
+            if cursor.rowcount == 1:
+                return row
+            # Another sender took it first, try the next one
+
+def _record_result(conn: sqlite3.Connection, row: sqlite3.Row, error: Optional[Exception]) -> None:
+    """Store the outcome of a delivery attempt"""
+    timestamp = datetime.now().isoformat()
+
+    with conn:
+        if error is None:
+            conn.execute(
+                "UPDATE outbox SET state = ?, attempts = attempts + 1, claimed_at = NULL, "
+                "last_error = NULL, updated_at = ?, sent_at = ? WHERE id = ?",
+                (STATE_SENT, timestamp, timestamp, row['id'])
+            )
+            return
+
+        attempts = row['attempts'] + 1
+        if attempts >= MAX_ATTEMPTS:
+            state, next_attempt = STATE_FAILED, row['next_attempt_at']
+        else:
+            state, next_attempt = STATE_PENDING, time.time() + _retry_delay(attempts)
+
+        conn.execute(
+            "UPDATE outbox SET state = ?, attempts = ?, next_attempt_at = ?, claimed_at = NULL, "
+            "last_error = ?, updated_at = ? WHERE id = ?",
+            (state, attempts, next_attempt, str(error), timestamp, row['id'])
+        )
+
+def drain_outbox(db_path: str = OUTBOX_DB, email_config: Optional[Dict] = None) -> int:
+    """
+    Deliver every message that is due
+
+    Args:
+        db_path: Path to the outbox database
+        email_config: Email configuration, loaded from file when omitted
+
+    Returns:
+        int: Number of messages delivered
+    """
+    conn = _connect(db_path)
+    delivered = 0
+
+    try:
+        while True:
+            row = _claim_next(conn)
+            if row is None:
+                break
+
+            if email_config is None:
+                email_config = load_email_config()
+
+            label = f"region {row['region']} on {row['report_date']}"
+            error = None
+            try:
+                if not email_config:
+                    raise RuntimeError("Email configuration is not available")
+                send_raw_message(row['message'], json.loads(row['recipients']), email_config)
+                delivered += 1
+                email_logger.info(f"Email report sent successfully for {label}")
+            except Exception as e:
+                error = e
+                attempts = row['attempts'] + 1
+                if attempts >= MAX_ATTEMPTS:
+                    log_exception(email_logger, e, f"Giving up on email report for {label} after {attempts} attempts")
+                else:
+                    email_logger.warning(
+                        f"Attempt {attempts} to send report for {label} failed: {e}. "
+                        f"Retrying in {int(_retry_delay(attempts))} seconds"
+                    )
+
+            _record_result(conn, row, error)
+    finally:
+        conn.close()
+
+    return delivered
+
+def seconds_until_next_attempt(db_path: str = OUTBOX_DB) -> Optional[float]:
+    """Return seconds until the earliest pending message is due, or None if the queue is empty"""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT MIN(next_attempt_at) AS due FROM outbox WHERE state = ?",
+            (STATE_PENDING,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    if row is None or row['due'] is None:
+        return None
+    return max(row['due'] - time.time(), 0.0)
+
+def get_delivery_states(keys: List[Tuple[str, str]], db_path: str = OUTBOX_DB) -> Dict[Tuple[str, str], str]:
+    """Get the state of messages identified by (region, report_date)"""
+    conn = _connect(db_path)
+    try:
+        states = {}
+        for region, report_date in keys:
+            row = conn.execute(
+                "SELECT state FROM outbox WHERE region = ? AND report_date = ?",
+                (region, report_date)
+            ).fetchone()
+            if row is not None:
+                states[(region, report_date)] = row['state']
+        return states
+    finally:
+        conn.close()
+
+def deliver_now(keys: List[Tuple[str, str]], db_path: str = OUTBOX_DB,
+                timeout: float = DELIVERY_TIMEOUT) -> Dict[Tuple[str, str], str]:
+    """
+    Make the first delivery attempt for queued messages and report the outcome
+
+    Messages that another sender is delivering at the moment are waited for;
+    messages whose attempt failed stay in the outbox for the background sender.
+
+    Args:
+        keys: Messages to report on, as (region, report_date)
+        db_path: Path to the outbox database
+        timeout: Seconds to wait for messages in the 'sending' state
+
+    Returns:
+        Dictionary mapping (region, report_date) to the delivery state
+    """
+    drain_outbox(db_path)
+    deadline = time.time() + timeout
+    while True:
+        states = get_delivery_states(keys, db_path)
+        if STATE_SENDING not in states.values() or time.time() >= deadline:
+            return states
+        time.sleep(1)
+
+def get_outbox_status(db_path: str = OUTBOX_DB, limit: int = 50) -> Dict:
+    """
+    Get delivery state of queued messages
+
+    Returns:
+        Dictionary with message counts per state and the most recent entries
+    """
+    try:
+        conn = _connect(db_path)
+        try:
+            counts = {
+                row['state']: row['total']
+                for row in conn.execute("SELECT state, COUNT(*) AS total FROM outbox GROUP BY state")
+            }
+            recent = [
+                dict(row) for row in conn.execute(
+                    "SELECT region, report_date, subject, state, attempts, last_error, "
+                    "created_at, updated_at, sent_at FROM outbox ORDER BY id DESC LIMIT ?",
+                    (limit,)
+                )
+            ]
+        finally:
+            conn.close()
+        return {'counts': counts, 'recent': recent}
+    except Exception as e:
+        log_exception(email_logger, e, "Error reading outbox status")
+        return {'counts': {}, 'recent': []}
+
+class OutboxSender:
+    """Background thread that keeps draining the outbox"""
+
+    def __init__(self, db_path: str = OUTBOX_DB, poll_interval: float = POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the sender thread if it is not running yet"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+            email_logger.info("Email outbox sender started")
+
+    def notify(self) -> None:
+        """Wake the sender up to check for new messages"""
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the sender thread"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        """Check if the sender thread is alive"""
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            delay = self.poll_interval
+            try:
+                drain_outbox(self.db_path)
+                due = seconds_until_next_attempt(self.db_path)
+                if due is not None:
+                    delay = min(delay, due)
+            except Exception as e:
+                log_exception(email_logger, e, "Error in email outbox sender")
+
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_outbox_sender() -> OutboxSender:
+    """Get the process-wide outbox sender, starting it on first use"""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = OutboxSender()
+        _sender.start()
+        return _sender
+
+if __name__ == "__main__":
+    # If run directly, deliver everything that is due and show the queue state
+    sent = drain_outbox()
+    status = get_outbox_status()
+    print(f"Delivered {sent} messages")
+    for state, total in sorted(status['counts'].items()):
+        print(f"{state}: {total}")
@@ -1,9 +1,15 @@
-import json
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.mime.application import MIMEApplication
 from datetime import datetime
 from logger_config import get_logger, log_exception
+from report_templates import render_cert_report, cert_report_subject
+from config_store import load_json, EMAIL_CONFIG_FILE
+from tracing import span
+from metrics import SMTP_SEND_SECONDS
 
 # Set up logger
 email_logger = get_logger("email")
@@ -11,14 +17,46 @@ email_logger = get_logger("email")
 def load_email_config():
     """Load email configuration from file"""
     try:
-        with open('email_config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            email_logger.info("Email configuration loaded successfully")
-            return config
+        config = load_json(EMAIL_CONFIG_FILE)
+        if config is None:
+            email_logger.error("File email_config.json not found")
+        return config
     except Exception as e:
         log_exception(email_logger, e, "Error loading email config")
         return None
 
+def create_html_message(subject: str, html: str, recipients: list, email_config: dict,
+                        attachments: list = None) -> MIMEMultipart:
+    """Build an HTML email message
+
+    Args:
+        subject: Message subject
+        html: Rendered HTML body
+        recipients: List of recipient addresses
+        email_config: Email configuration dictionary
+        attachments: Optional list of (filename, content bytes) tuples
+
+    Returns:
+        MIMEMultipart: Message ready to be sent or queued
+    """
+    body = MIMEMultipart('alternative')
+    body.attach(MIMEText(html, 'html'))
+
+    if attachments:
+        msg = MIMEMultipart('mixed')
+        msg.attach(body)
+        for filename, content in attachments:
+            part = MIMEApplication(content)
+            part.add_header('Content-Disposition', 'attachment', filename=('utf-8', '', filename))
+            msg.attach(part)
+    else:
+        msg = body
+
+    msg['Subject'] = subject
+    msg['From'] = email_config['sender_email']
+    msg['To'] = ', '.join(recipients)
+    return msg
+
 def send_violations_report(cert_name: str, violations_data: dict, email_config: dict) -> bool:
     """Send email with violations report
     
@@ -33,50 +71,16 @@ def send_violations_report(cert_name: str, violations_data: dict, email_config:
     try:
         email_logger.info(f"Preparing email report for {cert_name} on {violations_data['date']}")
         
-        # Create HTML content
-        html = f"""
-        <h2>Отчет о нарушениях маркировки за {violations_data['date']}</h2>
-        <h3>Сертификат: {cert_name}</h3>
-        <table border="1" style="border-collapse: collapse; width: 100%;">
-            <tr style="background-color: #f2f2f2;">
-                <th style="padding: 8px;">Товарная группа</th>
-                <th style="padding: 8px;">Количество нарушений</th>
-            </tr>
-        """
-        
-        total_violations = 0
-        for group, count in violations_data['violations'].items():
-            total_violations += count
-            html += f"""
-            <tr>
-                <td style="padding: 8px;">{group}</td>
-                <td style="padding: 8px; text-align: center;">{count}</td>
-            </tr>
-            """
-        
-        html += f"""
-            <tr style="background-color: #f2f2f2; font-weight: bold;">
-                <td style="padding: 8px;">Всего нарушений:</td>
-                <td style="padding: 8px; text-align: center;">{total_violations}</td>
-            </tr>
-        </table>
-        """
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"Отчет о нарушениях маркировки - {cert_name} - {violations_data['date']}"
-        msg['From'] = email_config['sender_email']
         recipients = email_config['recipient_emails']
-        msg['To'] = ', '.join(recipients)
-        msg.attach(MIMEText(html, 'html'))
+        msg = create_html_message(
+            cert_report_subject(cert_name, violations_data['date']),
+            render_cert_report(cert_name, violations_data),
+            recipients,
+            email_config
+        )
         
         email_logger.info(f"Sending email to {len(recipients)} recipients")
-        
-        # Send email
-        with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-            server.starttls()
-            server.login(email_config['sender_email'], email_config['sender_password'])
-            server.send_message(msg)
+        send_raw_message(msg.as_bytes(), recipients, email_config)
             
         email_logger.info(f"Email report sent successfully for {cert_name}")
         return True
@@ -85,6 +89,107 @@ def send_violations_report(cert_name: str, violations_data: dict, email_config:
         log_exception(email_logger, e, f"Error sending email report for {cert_name}")
         return False
 
+class SMTPConnectionPool:
+    """Keeps one logged-in SMTP connection open between messages
+
+    Connections are reused while they are younger than IDLE_TIMEOUT seconds
+    since the last message; a new one is opened when the configuration
+    changes or the server dropped the connection.
+    """
+
+    IDLE_TIMEOUT = 240
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._server = None
+        self._key = None
+        self._last_used = 0.0
+
+    def _close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+        self._server = None
+        self._key = None
+
+    def _connect(self, email_config: dict) -> smtplib.SMTP:
+        server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'], timeout=60)
+        try:
+            server.starttls()
+            server.login(email_config['sender_email'], email_config['sender_password'])
+        except Exception:
+            server.close()
+            raise
+        email_logger.debug(f"Opened SMTP connection to {email_config['smtp_server']}")
+        return server
+
+    def _get_server(self, email_config: dict) -> smtplib.SMTP:
+        key = (
+            email_config['smtp_server'], email_config['smtp_port'],
+            email_config['sender_email'], email_config['sender_password']
+        )
+        if self._server is not None and self._key == key \
+                and time.monotonic() - self._last_used < self.IDLE_TIMEOUT:
+            return self._server
+
+        self._close()
+        self._server = self._connect(email_config)
+        self._key = key
+        return self._server
+
+    def send(self, message_bytes: bytes, recipients: list, email_config: dict) -> None:
+        with self._lock:
+            for attempt in range(2):
+                reused = self._server is not None
+                server = self._get_server(email_config)
+                try:
+                    server.sendmail(email_config['sender_email'], recipients, message_bytes)
+                    self._last_used = time.monotonic()
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    # A pooled connection may have been closed by the server; retry once on a fresh one
+                    self._close()
+                    if not reused or attempt:
+                        raise
+                except Exception:
+                    self._close()
+                    raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+_smtp_pool = SMTPConnectionPool()
+
+def close_smtp_connections() -> None:
+    """Close the pooled SMTP connection"""
+    _smtp_pool.close()
+
+def send_raw_message(message_bytes: bytes, recipients: list, email_config: dict) -> None:
+    """Send an already rendered MIME message
+
+    Uses a pooled SMTP connection, so consecutive messages do not pay for a
+    new TLS handshake and login each time.
+
+    Args:
+        message_bytes: Serialized message (as produced by Message.as_bytes())
+        recipients: List of recipient addresses
+        email_config: Email configuration dictionary
+
+    Raises:
+        smtplib.SMTPException, OSError: if delivery fails
+    """
+    started = time.perf_counter()
+    result = "error"
+    try:
+        with span("smtp_send", recipients=len(recipients), bytes=len(message_bytes)):
+            _smtp_pool.send(message_bytes, recipients, email_config)
+        result = "success"
+    finally:
+        SMTP_SEND_SECONDS.observe(time.perf_counter() - started, result=result)
+
 def send_test_email(email_config=None):
     """Send a test email to verify configuration"""
     if not email_config:
@@ -106,10 +211,7 @@ def send_test_email(email_config=None):
         msg.attach(MIMEText(text, 'plain'))
         
         # Send email
-        with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-            server.starttls()
-            server.login(email_config['sender_email'], email_config['sender_password'])
-            server.send_message(msg)
+        send_raw_message(msg.as_bytes(), recipients, email_config)
             
         print("Test email sent successfully")
         email_logger.info(f"Test email sent to {', '.join(recipients)}")
@@ -1,4 +1,3 @@
-import requests
 import json
 import sys
 import time
@@ -6,6 +5,27 @@ from datetime import datetime
 import os
 from typing import List
 from token_utils import get_any_valid_token
+from http_session import get_session, api_base_url
+from tracing import span
+from metrics import (
+    TASKS_POLLED, TASKS_DOWNLOADED, TASKS_FAILED, BYTES_DOWNLOADED, DISPENSER_POLL_SECONDS
+)
+
+# Seconds between dispenser status checks; CRPT_POLL_INTERVAL overrides it
+# (e.g. for runs against the local mock server)
+POLL_INTERVAL = 20
+POLL_INTERVAL_ENV = "CRPT_POLL_INTERVAL"
+
+def poll_interval() -> float:
+    try:
+        return float(os.environ.get(POLL_INTERVAL_ENV, POLL_INTERVAL))
+    except ValueError:
+        return POLL_INTERVAL
+
+# Outcomes of ReportDownloader.download_result_file
+DOWNLOAD_SAVED = "saved"
+DOWNLOAD_EMPTY = "empty"          # 204, the report has no rows
+DOWNLOAD_FORBIDDEN = "forbidden"  # 403, no access to the product group
 
 class ReportDownloader:
     def __init__(self, token: str, product_group_code: int, is_sandbox: bool = False):
@@ -15,24 +35,31 @@ class ReportDownloader:
             product_group_code: Product group code (e.g. 2 for shoes)
             is_sandbox: Use sandbox environment if True
         """
-        self.base_url = "https://markirovka.sandbox.crptech.ru/api/v3/true-api" if is_sandbox else "https://markirovka.crpt.ru/api/v3/true-api"
+        self.base_url = api_base_url(is_sandbox)
         self.product_group_code = product_group_code
         self.headers = {
             'Authorization': f'Bearer {token}',
             'Accept': 'application/json'
         }
+        # Outcome of the last download_result_file call: path of the saved
+        # file and one of DOWNLOAD_SAVED, DOWNLOAD_EMPTY, DOWNLOAD_FORBIDDEN
+        self.last_file = None
+        self.last_status = None
 
     def get_task_status(self, task_id: str) -> dict:
         """Получает статус задания"""
         try:
-            response = requests.get(
-                f"{self.base_url}/dispenser/tasks/{task_id}",
-                headers=self.headers,
-                params={'pg': self.product_group_code}  # Add product group code
-            )
+            TASKS_POLLED.inc(group=self.product_group_code)
+            with DISPENSER_POLL_SECONDS.time(group=self.product_group_code):
+                response = get_session().get(
+                    f"{self.base_url}/dispenser/tasks/{task_id}",
+                    headers=self.headers,
+                    params={'pg': self.product_group_code}  # Add product group code
+                )
             response.raise_for_status()
             return response.json()
         except Exception as e:
+            TASKS_FAILED.inc(group=self.product_group_code, stage="poll")
             print(f"Ошибка при получении статуса задания: {e}")
             if hasattr(e, 'response'):
                 print(f"Ответ сервера: {e.response.text}")
@@ -50,11 +77,13 @@ class ReportDownloader:
             if task_ids:
                 params['task_ids'] = task_ids
 
-            response = requests.get(
-                f"{self.base_url}/dispenser/results",
-                headers=self.headers,
-                params=params
-            )
+            TASKS_POLLED.inc(group=self.product_group_code)
+            with DISPENSER_POLL_SECONDS.time(group=self.product_group_code):
+                response = get_session().get(
+                    f"{self.base_url}/dispenser/results",
+                    headers=self.headers,
+                    params=params
+                )
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -65,12 +94,14 @@ class ReportDownloader:
 
     def download_result_file(self, result_id: str, output_dir: str) -> bool:
         """Скачивает файл результата выгрузки"""
+        self.last_file = None
+        self.last_status = None
         try:
             params = {'pg': self.product_group_code}
 
             # Get task info
             try:
-                response = requests.get(
+                response = get_session().get(
                     f"{self.base_url}/dispenser/results/{result_id}",
                     headers=self.headers,
                     params={'pg': self.product_group_code}
@@ -82,7 +113,7 @@ class ReportDownloader:
                 task_info = None
 
             # Download file
-            response = requests.get(
+            response = get_session().get(
                 f"{self.base_url}/dispenser/results/{result_id}/file",
                 headers={**self.headers, 'Accept': '*/*'},
                 params=params
@@ -95,10 +126,14 @@ class ReportDownloader:
                 except:
                     err = response.text
                 print(f"Skip task {result_id}, no access: {err}")
+                TASKS_FAILED.inc(group=self.product_group_code, stage="access")
+                self.last_status = DOWNLOAD_FORBIDDEN
                 return True
      
             if response.status_code == 204:
                 print("Файл пуст")
+                TASKS_DOWNLOADED.inc(group=self.product_group_code)
+                self.last_status = DOWNLOAD_EMPTY
                 return True
 
             response.raise_for_status()
@@ -118,11 +153,16 @@ class ReportDownloader:
             filepath = os.path.join(output_dir, filename)
             with open(filepath, 'wb') as f:
                 f.write(response.content)
+            self.last_file = filepath
+            self.last_status = DOWNLOAD_SAVED
             print(f"Файл сохранен: {filepath}")
+            TASKS_DOWNLOADED.inc(group=self.product_group_code)
+            BYTES_DOWNLOADED.inc(len(response.content), group=self.product_group_code)
             
             return True
             
         except Exception as e:
+            TASKS_FAILED.inc(group=self.product_group_code, stage="download")
             print(f"Ошибка при скачивании файла: {e}")
             if hasattr(e, 'response'):
                 print(f"Ответ сервера: {e.response.text}")
@@ -134,10 +174,12 @@ class ReportDownloader:
         max_attempts = 60
         
         while attempt < max_attempts:
-            results = self.get_results_list(task_ids=[task_id])
+            with span("poll", group=self.product_group_code, task=task_id, attempt=attempt):
+                results = self.get_results_list(task_ids=[task_id])
             if not results or not results.get('list'):
                 print("No results data")
-                time.sleep(20)  # Wait 20 seconds before next attempt
+                with span("poll_wait", group=self.product_group_code, task=task_id):
+                    time.sleep(poll_interval())  # Wait before next attempt
                 attempt += 1
                 continue
 
@@ -147,17 +189,22 @@ class ReportDownloader:
             
             if status == 'SUCCESS':
                 print("Report ready, downloading...")
-                return self.download_result_file(result['id'], output_dir)
+                with span("download_file", group=self.product_group_code, task=task_id):
+                    return self.download_result_file(result['id'], output_dir)
             elif status == 'FAILED':
                 error = result.get('errorMessage') or result.get('fullErrorMessage')
                 print(f"Download error: {error}")
+                TASKS_FAILED.inc(group=self.product_group_code, stage="poll")
                 return False
             
-            print("Waiting 20 seconds before next check...")
-            time.sleep(20)
+            interval = poll_interval()
+            print(f"Waiting {interval:g} seconds before next check...")
+            with span("poll_wait", group=self.product_group_code, task=task_id):
+                time.sleep(interval)
             attempt += 1
 
         print("Maximum attempts reached")
+        TASKS_FAILED.inc(group=self.product_group_code, stage="poll")
         return False
 
 def read_task_ids(filename: str = 'violation_task_ids.txt') -> List[str]:
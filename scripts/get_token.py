@@ -3,28 +3,24 @@
 Поддерживает работу с сертификатами с указанием ИНН и ТС.
 """
 
-import requests
 import json
-import sys
 import base64
 import os
 import subprocess
 from datetime import datetime
 import colorama
 from colorama import Fore, Style
+from config_store import get_config_store, load_json, save_json, CERTIFICATES_FILE, CERT_INNS_FILE, TOKENS_FILE
+from http_session import get_session, api_base_url
 
 # Initialize colorama
 colorama.init(autoreset=True)
 
-# Базовый URL API
-BASE_URL = "https://markirovka.crpt.ru/api/v3/true-api"
-# BASE_URL = "https://markirovka.sandbox.crptech.ru/api/v3/true-api"  # Тестовый контур
-
 def get_auth_data():
     """Получает данные для подписи от сервера авторизации"""
     try:
-        response = requests.get(
-            f"{BASE_URL}/auth/key",
+        response = get_session().get(
+            f"{api_base_url()}/auth/key",
             headers={'Accept': 'application/json'}
         )
         response.raise_for_status()
@@ -32,9 +28,10 @@ def get_auth_data():
         return data['uuid'], data['data']
     except Exception as e:
         print(f"{Fore.RED}Ошибка при получении данных для аутентификации: {str(e)}")
-        if hasattr(e, 'response'):
+        if getattr(e, 'response', None) is not None:
             print(f"{Fore.RED}Ответ сервера: {e.response.text}")
-        sys.exit(1)
+        # Raised instead of exiting, so that the scheduler daemon keeps running
+        raise
 
 def save_data_to_sign(data_to_sign):
     """Сохраняет данные для подписи в файл"""
@@ -138,8 +135,8 @@ def get_token(uuid, signed_data, inn=None, use_mchd=False):
             print(f"{Fore.CYAN}Используем МЧДО: {use_mchd}")
             request_data['mchd'] = use_mchd
         
-        response = requests.post(
-            f"{BASE_URL}/auth/simpleSignIn",
+        response = get_session().post(
+            f"{api_base_url()}/auth/simpleSignIn",
             headers={
                 'Accept': 'application/json',
                 'Content-Type': 'application/json'
@@ -198,26 +195,17 @@ def save_tokens_json(tokens):
         # If file exists, try to merge with existing tokens
         existing_tokens = {}
         try:
-            if os.path.exists('true_api_tokens.json'):
-                with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    existing_tokens = data.get('tokens', {})
-        except:
+            existing_tokens = load_json(TOKENS_FILE, {}).get('tokens', {})
+        except Exception:
             pass
             
         # Merge with new tokens
         existing_tokens.update(tokens)
         
-        with open('true_api_tokens.json', 'w', encoding='utf-8') as f:
-            json.dump(
-                {
-                    "tokens": existing_tokens,
-                    "generated_at": datetime.now().isoformat()
-                }, 
-                f, 
-                indent=2,
-                ensure_ascii=False
-            )
+        save_json(TOKENS_FILE, {
+            "tokens": existing_tokens,
+            "generated_at": datetime.now().isoformat()
+        })
         print(f"\n{Fore.GREEN}Токены успешно сохранены в true_api_tokens.json")
         return True
     except Exception as e:
@@ -227,12 +215,11 @@ def save_tokens_json(tokens):
 def load_certificates():
     """Load certificates from certificates.json"""
     try:
-        with open('certificates.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('certificates', [])
-    except FileNotFoundError:
-        print(f"{Fore.RED}Файл certificates.json не найден")
-        return []
+        data = load_json(CERTIFICATES_FILE)
+        if data is None:
+            print(f"{Fore.RED}Файл certificates.json не найден")
+            return []
+        return data.get('certificates', [])
     except Exception as e:
         print(f"{Fore.RED}Ошибка при чтении файла certificates.json: {e}")
         return []
@@ -240,15 +227,11 @@ def load_certificates():
 def load_certificate_inns():
     """Load certificate to INN mapping"""
     try:
-        if not os.path.exists('cert_inns.json'):
+        if not get_config_store().exists(CERT_INNS_FILE):
             # Create empty file if it doesn't exist
-            with open('cert_inns.json', 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
+            save_json(CERT_INNS_FILE, {})
             return {}
-            
-        with open('cert_inns.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
+        return load_json(CERT_INNS_FILE, {})
     except Exception as e:
         print(f"{Fore.RED}Ошибка при загрузке ИНН сертификатов: {e}")
         return {}
@@ -256,8 +239,7 @@ def load_certificate_inns():
 def save_certificate_inns(cert_inns):
     """Save certificate INN mapping"""
     try:
-        with open('cert_inns.json', 'w', encoding='utf-8') as f:
-            json.dump(cert_inns, f, ensure_ascii=False, indent=2)
+        save_json(CERT_INNS_FILE, cert_inns)
         return True
     except Exception as e:
         print(f"{Fore.RED}Ошибка при сохранении ИНН сертификатов: {e}")
@@ -313,7 +295,11 @@ def get_tokens():
                         print(f"\n{Fore.CYAN}Получение токена для ТС {tc} с ИНН {inn}")
                         
                         # Получаем свежие данные для подписи для каждого запроса
-                        uuid, data_to_sign = get_auth_data()
+                        try:
+                            uuid, data_to_sign = get_auth_data()
+                        except Exception:
+                            print(f"{Fore.RED}Пропускаем ТС {tc}")
+                            continue
                         save_data_to_sign(data_to_sign)
                         
                         signature_path = sign_data_with_cryptcp("data_to_sign.txt", thumbprint)
@@ -338,7 +324,12 @@ def get_tokens():
                 # Если нет пар ТС-ИНН, пробуем без ИНН
                 
                 # Получаем данные для подписи
-                uuid, data_to_sign = get_auth_data()
+                try:
+                    uuid, data_to_sign = get_auth_data()
+                except Exception:
+                    # Ошибка уже выведена, остальные сертификаты обрабатываются дальше
+                    print(f"{Fore.RED}Пропускаем сертификат {name}")
+                    continue
                 save_data_to_sign(data_to_sign)
                 
                 signature_path = sign_data_with_cryptcp("data_to_sign.txt", thumbprint)
@@ -1,6 +1,6 @@
 import subprocess
 import json
-import os
+import time
 from datetime import datetime
 from get_token import (
     get_auth_data,
@@ -12,6 +12,17 @@ from get_token import (
     load_certificate_inns,
     save_certificate_inns
 )
+from config_store import (
+    get_config_store,
+    load_json,
+    save_json,
+    get_cert_inn_pairs,
+    CERTIFICATES_FILE,
+    CERT_INNS_FILE,
+    TOKENS_FILE
+)
+from tracing import span
+from metrics import TOKEN_REFRESH_SECONDS
 
 def get_cert_name(thumbprint):
     """Get certificate CN from issuer field"""
@@ -48,12 +59,11 @@ def get_cert_name(thumbprint):
 def load_certificates():
     """Load certificates configuration from JSON"""
     try:
-        with open('certificates.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('certificates', [])
-    except FileNotFoundError:
-        print("File certificates.json not found")
-        return []
+        data = load_json(CERTIFICATES_FILE)
+        if data is None:
+            print("File certificates.json not found")
+            return []
+        return data.get('certificates', [])
     except Exception as e:
         print(f"Error reading certificates: {e}")
         return []
@@ -61,13 +71,11 @@ def load_certificates():
 def load_certificate_inns():
     """Load certificate to INN mapping"""
     try:
-        with open('cert_inns.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # Create empty file if it doesn't exist
-        with open('cert_inns.json', 'w', encoding='utf-8') as f:
-            json.dump({}, f, ensure_ascii=False, indent=2)
-        return {}
+        if not get_config_store().exists(CERT_INNS_FILE):
+            # Create empty file if it doesn't exist
+            save_json(CERT_INNS_FILE, {})
+            return {}
+        return load_json(CERT_INNS_FILE, {})
     except Exception as e:
         print(f"Error loading certificate INNs: {e}")
         return {}
@@ -75,8 +83,7 @@ def load_certificate_inns():
 def save_certificate_inns(cert_inns):
     """Save certificate INN mapping"""
     try:
-        with open('cert_inns.json', 'w', encoding='utf-8') as f:
-            json.dump(cert_inns, f, ensure_ascii=False, indent=2)
+        save_json(CERT_INNS_FILE, cert_inns)
         return True
     except Exception as e:
         print(f"Error saving certificate INNs: {e}")
@@ -106,9 +113,15 @@ def load_mchd_settings():
         print(f"Error loading MCHD settings: {e}")
         return {}
 
-def get_tokens():
-    """Get tokens for all certificates"""
+def get_tokens(cancel_event=None):
+    """Get tokens for all certificates
+
+    Args:
+        cancel_event: Optional threading.Event; remaining certificates are
+            skipped once it is set
+    """
     tokens = {}
+    started = time.perf_counter()
     
     try:
         # Load certificates from certificates.json
@@ -124,6 +137,9 @@ def get_tokens():
         print(f"Found {len(certificates)} certificates")
         
         for cert in certificates:
+            if cancel_event is not None and cancel_event.is_set():
+                print("Token refresh cancelled")
+                break
             thumbprint = cert.get('thumbprint')
             name = cert.get('name', thumbprint)
             multi_inn = cert.get('multi_inn', False)
@@ -138,23 +154,29 @@ def get_tokens():
             
             # Check if we have saved ТС-ИНН pairs for this certificate
             cert_key = name if name else thumbprint
-            tc_inn_pairs = cert_inns.get(cert_key, [])
+            tc_inn_pairs = get_cert_inn_pairs().get(cert_key, [])
             
             if tc_inn_pairs:
                 print(f"Found saved ТС-ИНН pairs:")
-                for pair in tc_inn_pairs:
-                    for tc, inn in pair.items():
-                        # Модификация: обрабатываем ТС с пустым ИНН
-                        if inn.strip() == "":
-                            print(f"  {tc}: <без ИНН>")
-                        else:
-                            print(f"  {tc}: {inn}")
+                for tc, inn in tc_inn_pairs:
+                    # Модификация: обрабатываем ТС с пустым ИНН
+                    if inn.strip() == "":
+                        print(f"  {tc}: <без ИНН>")
+                    else:
+                        print(f"  {tc}: {inn}")
             
             # Get auth data and sign
-            uuid, data_to_sign = get_auth_data()
+            try:
+                with span("auth_data", cert=name):
+                    uuid, data_to_sign = get_auth_data()
+            except Exception:
+                # The error is already printed, the other certificates still get tokens
+                print(f"Skipping certificate {name}")
+                continue
             save_data_to_sign(data_to_sign)
             
-            signature_path = sign_data_with_cryptcp("data_to_sign.txt", thumbprint)
+            with span("sign", cert=name):
+                signature_path = sign_data_with_cryptcp("data_to_sign.txt", thumbprint)
             if not signature_path:
                 print("Could not create signature")
                 continue
@@ -166,11 +188,11 @@ def get_tokens():
             # If we have ТС-ИНН pairs, get token for each one, regardless of multi_inn setting
             if tc_inn_pairs:
                 # Process each ТС-ИНН pair
-                for pair in tc_inn_pairs:
-                    for tc, inn in pair.items():
-                        print(f"\nGetting token for ТС {tc}")
-                        
-                        # Модификация: не передаем параметр inn если он пустой
+                for tc, inn in tc_inn_pairs:
+                    print(f"\nGetting token for ТС {tc}")
+                    
+                    # Модификация: не передаем параметр inn если он пустой
+                    with span("token_request", cert=name, tc=tc):
                         if inn.strip() == "":
                             print(f"ТС {tc} используется без ИНН")
                             # Получаем токен без указания ИНН
@@ -178,16 +200,17 @@ def get_tokens():
                         else:
                             print(f"ТС {tc} с ИНН {inn}")
                             token, status = get_token(uuid, signed_data, inn=inn)
-                        
-                        # If we got a token
-                        if token and status == "success":
-                            print(f"Successfully got token for {name} - {tc}")
-                            # Store token with ТС identifier
-                            token_key = f"{name} - {tc}"
-                            tokens[token_key] = token
+                    
+                    # If we got a token
+                    if token and status == "success":
+                        print(f"Successfully got token for {name} - {tc}")
+                        # Store token with ТС identifier
+                        token_key = f"{name} - {tc}"
+                        tokens[token_key] = token
             else:
                 # If no ТС-ИНН pairs, try without ИНН
-                token, status = get_token(uuid, signed_data)
+                with span("token_request", cert=name):
+                    token, status = get_token(uuid, signed_data)
                 
                 # If we need to provide an ИНН
                 if status == "require_inn":
@@ -221,6 +244,7 @@ def get_tokens():
     except Exception as e:
         print(f"Error getting tokens: {e}")
     
+    TOKEN_REFRESH_SECONDS.observe(time.perf_counter() - started, result="success" if tokens else "failed")
     return tokens
 
 def save_token(cert_name, token):
@@ -239,26 +263,17 @@ def save_tokens(tokens):
         # If file exists, try to merge with existing tokens
         existing_tokens = {}
         try:
-            if os.path.exists('true_api_tokens.json'):
-                with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    existing_tokens = data.get('tokens', {})
-        except:
+            existing_tokens = load_json(TOKENS_FILE, {}).get('tokens', {})
+        except Exception:
             pass
             
         # Merge with new tokens
         existing_tokens.update(tokens)
         
-        with open('true_api_tokens.json', 'w', encoding='utf-8') as f:
-            json.dump(
-                {
-                    "tokens": existing_tokens,
-                    "generated_at": datetime.now().isoformat()
-                }, 
-                f, 
-                indent=2,
-                ensure_ascii=False
-            )
+        save_json(TOKENS_FILE, {
+            "tokens": existing_tokens,
+            "generated_at": datetime.now().isoformat()
+        })
         return True
     except Exception as e:
         print(f"Error saving tokens: {e}")
@@ -3,8 +3,15 @@ import json
 import sys
 import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from token_utils import get_any_valid_token
+from typing import List, Dict, Any, Optional
+from token_utils import get_any_valid_token, get_token_inn
+from http_session import get_session, api_base_url
+from metrics import TASKS_CREATED, TASKS_FAILED
+from violation_dates import get_violation_dates_cache
+
+# Result of find_first_violation_date when the API reports no violations;
+# None means the date could not be requested
+NO_VIOLATIONS = ""
 
 PRODUCT_GROUPS = {
     1: "Предметы одежды, бельё постельное, столовое, туалетное и кухонное",
@@ -86,64 +93,108 @@ class ViolationsReport:
             token: Токен авторизации
             is_sandbox: Использовать песочницу вместо боевого контура
         """
-        self.base_url = "https://markirovka.sandbox.crptech.ru/api/v3/true-api" if is_sandbox else "https://markirovka.crpt.ru/api/v3/true-api"
+        self.base_url = api_base_url(is_sandbox)
         self.headers = {
             'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
+        # ИНН участника - ключ кеша дат первых нарушений
+        self.inn = get_token_inn(token)
 
-    def get_first_violation_date(self, product_group_code: int) -> str:
+    def _request_first_violation_date(self, product_group_code: int) -> Optional[str]:
         """
-        Получает дату самого раннего нарушения для товарной группы
+        Запрашивает дату самого раннего нарушения у API
+
+        Returns:
+            Дата YYYY-MM-DD, NO_VIOLATIONS, если API явно ответил, что нарушений нет,
+            или None, если ответ ничего не говорит о нарушениях (404, пустое тело)
+        Raises:
+            requests.exceptions.RequestException: при сетевой ошибке или ошибке API
         """
-        try:
-            # Создаем запрос на получение первого нарушения
-            response = requests.get(
-                f"{self.base_url}/violations/first-date",
-                headers=self.headers,
-                params={
-                    'productGroupCode': product_group_code
-                }
-            )
+        # Создаем запрос на получение первого нарушения
+        response = get_session().get(
+            f"{self.base_url}/violations/first-date",
+            headers=self.headers,
+            params={
+                'productGroupCode': product_group_code
+            }
+        )
+        if response.status_code != 404:
             response.raise_for_status()
-            data = response.json()
-            
-            if data and isinstance(data, dict) and data.get('firstViolationDate'):
-                first_date = data['firstViolationDate'].split('T')[0]
-                print(f"Найдена первая дата нарушения: {first_date}")
-                return first_date
-            
-            # Если дата не найдена, пробуем альтернативный метод
-            alt_response = requests.get(
-                f"{self.base_url}/violations",
-                headers=self.headers,
-                params={
-                    'productGroupCode': product_group_code,
-                    'limit': 1,
-                    'orderBy': 'violationDate',
-                    'order': 'ASC'
-                }
-            )
-            alt_response.raise_for_status()
-            alt_data = alt_response.json()
-            
-            if alt_data and isinstance(alt_data, list) and len(alt_data) > 0:
-                first_date = alt_data[0].get('violationDate', '').split('T')[0]
-                if first_date:
-                    print(f"Найдена первая дата нарушения: {first_date}")
-                    return first_date
+            data = response.json() if response.content else None
+            if isinstance(data, dict) and 'firstViolationDate' in data:
+                if not data['firstViolationDate']:
+                    return NO_VIOLATIONS
+                return data['firstViolationDate'].split('T')[0]
 
-            # Если не удалось получить дату, используем дату 3 года назад
-            default_date = (datetime.now() - timedelta(days=365*3)).strftime("%Y-%m-%d")
-            print(f"Не удалось найти первую дату нарушения, используем: {default_date}")
-            return default_date
+        # Если дата не найдена, пробуем альтернативный метод
+        alt_response = get_session().get(
+            f"{self.base_url}/violations",
+            headers=self.headers,
+            params={
+                'productGroupCode': product_group_code,
+                'limit': 1,
+                'orderBy': 'violationDate',
+                'order': 'ASC'
+            }
+        )
+        if alt_response.status_code == 404:
+            return None
+        alt_response.raise_for_status()
+        alt_data = alt_response.json() if alt_response.content else None
+
+        if isinstance(alt_data, list):
+            if not alt_data:
+                return NO_VIOLATIONS
+            return alt_data[0].get('violationDate', '').split('T')[0] or None
+        return None
+
+    def find_first_violation_date(self, product_group_code: int, use_cache: bool = True) -> Optional[str]:
+        """
+        Получает дату самого раннего нарушения, используя кеш по (ИНН, товарная группа)
+
+        Args:
+            product_group_code: Код товарной группы
+            use_cache: Брать дату из кеша, если она проверялась недавно
+        Returns:
+            Дата YYYY-MM-DD, NO_VIOLATIONS, если API сообщил, что нарушений нет,
+            или None, если API недоступен или ответ ничего не говорит о нарушениях
+        """
+        cache = get_violation_dates_cache() if self.inn else None
+        if cache is not None and use_cache:
+            cached = cache.lookup_first_date(self.inn, product_group_code)
+            if cached is not None:
+                return cached['date'] or NO_VIOLATIONS
 
+        try:
+            first_date = self._request_first_violation_date(product_group_code)
         except Exception as e:
+            # Ошибка не кешируется: она ничего не говорит о наличии нарушений
             print(f"Ошибка при получении первой даты нарушения: {e}")
-            default_date = (datetime.now() - timedelta(days=365*3)).strftime("%Y-%m-%d")
-            print(f"Используем дату по умолчанию: {default_date}")
-            return default_date
+            return None
+
+        if first_date is None:
+            # Неизвестный ответ тоже не кешируется, используется запрошенный период
+            return None
+        if cache is not None:
+            cache.set_first_date(self.inn, product_group_code, first_date or None)
+        return first_date
+
+    def get_first_violation_date(self, product_group_code: int) -> str:
+        """
+        Получает дату самого раннего нарушения для товарной группы
+
+        Если дату узнать не удалось, возвращает дату 3 года назад
+        """
+        first_date = self.find_first_violation_date(product_group_code)
+        if first_date:
+            print(f"Найдена первая дата нарушения: {first_date}")
+            return first_date
+
+        default_date = (datetime.now() - timedelta(days=365*3)).strftime("%Y-%m-%d")
+        print(f"Не удалось найти первую дату нарушения, используем: {default_date}")
+        return default_date
 
     def create_violations_task(
         self,
@@ -219,7 +270,7 @@ class ViolationsReport:
         }
 
         try:
-            response = requests.post(
+            response = get_session().post(
                 f"{self.base_url}/dispenser/tasks",
                 headers=self.headers,
                 json=request_data
@@ -231,14 +282,42 @@ class ViolationsReport:
                 except:
                     err = response.text
                 print(f"Skip create task for group {product_group_code}, no access: {err}")
+                TASKS_FAILED.inc(group=product_group_code, stage="access")
                 return {}
             response.raise_for_status()
-            return response.json()
+            task = response.json()
+            TASKS_CREATED.inc(group=product_group_code)
+            return task
         except requests.exceptions.RequestException as e:
+            TASKS_FAILED.inc(group=product_group_code, stage="create")
             print(f"Ошибка при создании задания: {e}")
-            if hasattr(e, 'response'):
+            if getattr(e, 'response', None) is not None:
                 print(f"Ответ сервера: {e.response.text}")
-            sys.exit(1)
+            # Raised instead of exiting: one failed group must not stop the daily run
+            raise
+
+def date_windows(start_date: str, end_date: str, window_days: int = 90) -> List[tuple[str, str]]:
+    """
+    Разбивает период на интервалы, допустимые для одного задания выгрузки
+
+    Args:
+        start_date: Начальная дата в формате YYYY-MM-DD
+        end_date: Конечная дата в формате YYYY-MM-DD (включительно)
+        window_days: Длина интервала в днях
+    Returns:
+        Список кортежей (start_date, end_date), пустой для неверного периода
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    intervals = []
+    current_start = start
+    while current_start <= end:
+        # window_days - 1 дней + текущий день
+        current_end = min(current_start + timedelta(days=window_days - 1), end)
+        intervals.append((current_start.strftime("%Y-%m-%d"), current_end.strftime("%Y-%m-%d")))
+        current_start = current_end + timedelta(days=1)
+    return intervals
 
 def split_date_range(start_date: str, end_date: str, product_group_code: int, max_tasks: int = 10) -> List[tuple[str, str]]:
     """
@@ -253,38 +332,14 @@ def split_date_range(start_date: str, end_date: str, product_group_code: int, ma
         Список кортежей (start_date, end_date)
     """
     try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        total_days = (end - start).days + 1
-        
-        if total_days <= 0:
-            return []
-        
-        intervals = []
-        current_start = start
-        
-        while current_start < end:
-            # Определяем конец текущего интервала (не более 90 дней)
-            current_end = min(current_start + timedelta(days=89), end)  # 89 дней + текущий день = 90 дней
-            
-            intervals.append((
-                current_start.strftime("%Y-%m-%d"),
-                current_end.strftime("%Y-%m-%d")
-            ))
-            
-            # Если достигли максимального количества интервалов, сохраняем оставшиеся даты
-            if len(intervals) >= max_tasks:
-                if current_end < end:
-                    save_remaining_dates(
-                        (current_end + timedelta(days=1)).strftime("%Y-%m-%d"),
-                        end.strftime("%Y-%m-%d"),
-                        product_group_code
-                    )
-                    print("\nОставшиеся даты сохранены для следующего запуска")
-                break
-                
-            current_start = current_end + timedelta(days=1)
-        
+        intervals = date_windows(start_date, end_date)
+
+        # Если интервалов больше максимального количества, сохраняем оставшиеся даты
+        if len(intervals) > max_tasks:
+            save_remaining_dates(intervals[max_tasks][0], intervals[-1][1], product_group_code)
+            print("\nОставшиеся даты сохранены для следующего запуска")
+            intervals = intervals[:max_tasks]
+
         return intervals
 
     except Exception as e:
@@ -0,0 +1,150 @@
+"""
+HTTP Session Module
+
+This module provides the shared requests session used for True API calls.
+Keeping one session per process reuses TCP/TLS connections between requests
+and between scheduled jobs of the resident scheduler daemon. Requests get a
+default timeout, and responses with HTTP 429 are retried with backoff,
+honouring the Retry-After header.
+
+The True API address can be overridden with the CRPT_API_URL environment
+variable, e.g. to run the pipeline against the local mock server
+(mock_true_api.py).
+"""
+
+import os
+import threading
+import time
+from logger_config import get_logger
+
+# Set up logger
+http_logger = get_logger("http")
+
+# (connect, read) timeout in seconds used when a call does not pass its own
+DEFAULT_TIMEOUT = (10, 120)
+
+# Connections kept per host; the scheduler runs up to a few jobs in parallel
+POOL_SIZE = 10
+
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 2
+
+PRODUCTION_API_URL = "https://markirovka.crpt.ru/api/v3/true-api"
+SANDBOX_API_URL = "https://markirovka.sandbox.crptech.ru/api/v3/true-api"
+
+# Environment variable overriding the True API base URL
+API_URL_ENV = "CRPT_API_URL"
+
+_session = None
+_session_lock = threading.Lock()
+
+def _create_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class TimeoutSession(requests.Session):
+        """Session applying DEFAULT_TIMEOUT to requests without an explicit timeout"""
+
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+            return super().request(method, url, **kwargs)
+
+    # Only connection errors and 429 are retried: a 429 means the request was
+    # rejected before processing, so repeating even a POST is safe
+    retry = Retry(
+        total=RETRY_TOTAL,
+        connect=3,
+        read=0,
+        status=RETRY_TOTAL,
+        status_forcelist=(429,),
+        allowed_methods=None,
+        backoff_factor=RETRY_BACKOFF,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = TimeoutSession()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class RateLimiter:
+    """Token bucket limiting the rate of API calls made from several threads"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Calls per second, 0 or less disables the limit
+            burst: Calls allowed at once after a pause
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event=None) -> bool:
+        """
+        Wait until a call is allowed
+
+        Args:
+            cancel_event: Optional threading.Event that interrupts the wait
+
+        Returns:
+            bool: False if cancel_event was set while waiting
+        """
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if cancel_event is None:
+                time.sleep(wait)
+            elif cancel_event.wait(wait):
+                return False
+
+def api_base_url(is_sandbox: bool = False) -> str:
+    """
+    Get the True API base URL
+
+    Args:
+        is_sandbox: Use the sandbox environment instead of production
+
+    Returns:
+        str: Value of CRPT_API_URL if set, otherwise the production or sandbox URL
+    """
+    override = os.environ.get(API_URL_ENV, "").strip()
+    if override:
+        return override.rstrip('/')
+    return SANDBOX_API_URL if is_sandbox else PRODUCTION_API_URL
+
+def get_session():
+    """
+    Get the process-wide HTTP session
+
+    Returns:
+        requests.Session with connection pooling, retries on 429 and default timeouts
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+                http_logger.debug("HTTP session created")
+    return _session
+
+def close_session() -> None:
+    """Close pooled connections of the shared session"""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
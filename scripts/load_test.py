@@ -0,0 +1,238 @@
+"""
+Load Test Module
+
+This module runs the daily pipeline (main.run_daily_process) end to end
+against the local mock True API (mock_true_api.py) with generated
+certificates and product groups:
+
+    python load_test.py --certs 100 --groups 40 --rows 200 --task-delay 2
+
+The run happens in a separate working directory (a temporary one unless
+--workdir is given) with its own certificates.json, products.txt,
+true_api_tokens.json and output/, so the real configuration and reports are
+never touched. Tokens are obtained from the mock through /auth/key and
+/auth/simpleSignIn; CryptoPro signing is not needed, so the test runs on any
+machine. Without email_config.json in the working directory no mail is sent.
+
+At the end the duration, request counts of the mock, pipeline metrics and
+the path of the trace file (logs/traces in the working directory) are printed.
+"""
+
+import base64
+import contextlib
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from logger_config import get_logger, log_exception
+from config_store import save_json, CERTIFICATES_FILE, TOKENS_FILE
+from get_violations import PRODUCT_GROUPS
+from http_session import API_URL_ENV
+from get_report import POLL_INTERVAL_ENV
+from mock_true_api import MockTrueApi
+
+# Set up logger
+load_test_logger = get_logger("load_test")
+
+# Status checks against the mock need not wait 20 seconds
+DEFAULT_POLL_INTERVAL = 0.2
+
+# INNs of the generated certificates start here; mock tokens contain them
+BASE_INN = 7700000000
+
+SIGN_IN_ATTEMPTS = 3
+
+def product_groups(count: int) -> List[int]:
+    """
+    Get product group codes for the test
+
+    Known groups come first; beyond them codes from 100 upwards are used,
+    which the pipeline downloads but does not count (unknown group)
+    """
+    groups = sorted(PRODUCT_GROUPS)[:count]
+    groups += list(range(100, 100 + count - len(groups)))
+    return groups
+
+def prepare_workdir(workdir: str, certs: int, groups: List[int]) -> List[Dict[str, Any]]:
+    """Write the certificates and product groups of the test into workdir"""
+    os.makedirs(workdir, exist_ok=True)
+    certificates = [
+        {"name": f"Load Test {index:03d}", "thumbprint": f"{index:040x}", "multi_inn": False,
+         "inn": str(BASE_INN + index)}
+        for index in range(1, certs + 1)
+    ]
+    save_json(os.path.join(workdir, CERTIFICATES_FILE), {"certificates": certificates})
+    with open(os.path.join(workdir, "products.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(str(code) for code in groups) + "\n")
+    return certificates
+
+def issue_tokens(certificates: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Sign in every certificate at the mock and save true_api_tokens.json in the current directory"""
+    from get_token import get_auth_data, get_token
+
+    tokens = {}
+    for cert in certificates:
+        # Injected errors may hit the sign-in as well
+        status = None
+        for _ in range(SIGN_IN_ATTEMPTS):
+            try:
+                uuid, data = get_auth_data()
+            except Exception as e:
+                status = str(e)
+                continue
+            # The mock accepts any signature
+            signature = base64.b64encode(data.encode("utf-8")).decode("ascii")
+            token, status = get_token(uuid, signature, inn=cert["inn"])
+            if token and status == "success":
+                tokens[cert["name"]] = token
+                break
+        else:
+            load_test_logger.warning(f"No token for {cert['name']}: {status}")
+    save_json(TOKENS_FILE, {"tokens": tokens, "generated_at": datetime.now().isoformat()})
+    return tokens
+
+def _metrics_snapshot() -> Dict[str, float]:
+    import metrics
+    return {
+        "tasks_created": metrics.TASKS_CREATED.total(),
+        "tasks_polled": metrics.TASKS_POLLED.total(),
+        "tasks_downloaded": metrics.TASKS_DOWNLOADED.total(),
+        "tasks_failed": metrics.TASKS_FAILED.total(),
+        "bytes_downloaded": metrics.BYTES_DOWNLOADED.total(),
+        "rows_counted": metrics.ROWS_COUNTED.total(),
+    }
+
+def run_load_test(certs: int = 10, groups: int = 10, settings: Optional[Dict[str, Any]] = None,
+                  workdir: Optional[str] = None, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                  quiet: bool = True) -> Dict[str, Any]:
+    """
+    Run the daily pipeline against the mock API
+
+    Args:
+        certs: Number of generated certificates
+        groups: Number of product groups per certificate
+        settings: Mock settings (see mock_true_api.DEFAULT_SETTINGS)
+        workdir: Working directory of the run; a temporary one is created and
+            removed afterwards when None
+        poll_interval: Seconds between status checks of a task
+        quiet: Suppress the console output of the pipeline
+
+    Returns:
+        Dictionary with the results of the run
+    """
+    temporary = workdir is None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="crpt_load_test_"))
+    previous_cwd = os.getcwd()
+    previous_env = {name: os.environ.get(name) for name in (API_URL_ENV, POLL_INTERVAL_ENV)}
+
+    server = MockTrueApi(settings=settings)
+    base_url = server.start()
+    os.environ[API_URL_ENV] = base_url
+    os.environ[POLL_INTERVAL_ENV] = str(poll_interval)
+
+    result: Dict[str, Any] = {"certs": certs, "groups": groups, "workdir": workdir,
+                              "settings": server.settings}
+    try:
+        group_codes = product_groups(groups)
+        certificates = prepare_workdir(workdir, certs, group_codes)
+        os.chdir(workdir)
+
+        before = _metrics_snapshot()
+        with open(os.devnull, "w") as sink, \
+                contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            started = time.perf_counter()
+            tokens = issue_tokens(certificates)
+            token_seconds = time.perf_counter() - started
+
+            # Imported here: main loads the whole pipeline
+            from main import run_daily_process
+            started = time.perf_counter()
+            success = run_daily_process(refresh_tokens=False)
+            pipeline_seconds = time.perf_counter() - started
+        after = _metrics_snapshot()
+
+        traces = sorted(glob.glob(os.path.join(workdir, "logs", "traces", "*.json")), key=os.path.getmtime)
+        result.update({
+            "success": bool(success),
+            "tokens": len(tokens),
+            "token_seconds": round(token_seconds, 2),
+            "pipeline_seconds": round(pipeline_seconds, 2),
+            "tasks_per_second": round((after["tasks_downloaded"] - before["tasks_downloaded"]) /
+                                      pipeline_seconds, 1) if pipeline_seconds else 0,
+            "metrics": {name: after[name] - before[name] for name in after},
+            "report_files": len(glob.glob(os.path.join(workdir, "output", "*", "reports", "*"))),
+            "mock": server.stats(),
+            "trace": traces[-1] if traces else None,
+        })
+    except Exception as e:
+        log_exception(load_test_logger, e, "Error during load test")
+        result["success"] = False
+        result["error"] = str(e)
+    finally:
+        os.chdir(previous_cwd)
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        server.stop()
+        if temporary:
+            # The trace would be removed with the directory, keep it next to the logs
+            if result.get("trace"):
+                kept = os.path.join("logs", "traces", os.path.basename(result["trace"]))
+                os.makedirs(os.path.dirname(kept), exist_ok=True)
+                shutil.copy2(result["trace"], kept)
+                result["trace"] = os.path.abspath(kept)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    load_test_logger.info(
+        f"Load test {certs}x{groups}: success={result.get('success')}, "
+        f"pipeline {result.get('pipeline_seconds')} s, {result.get('mock', {}).get('total_requests')} requests"
+    )
+    return result
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Нагрузочный тест ежедневной обработки на локальной имитации True API")
+    parser.add_argument("--certs", type=int, default=10, help="Количество сертификатов")
+    parser.add_argument("--groups", type=int, default=10, help="Количество товарных групп")
+    parser.add_argument("--rows", type=int, help="Строк в каждом отчете")
+    parser.add_argument("--task-delay", type=float, help="Секунд до готовности задания")
+    parser.add_argument("--forbidden-ratio", type=float, help="Доля пар (сертификат, группа) с ответом 403")
+    parser.add_argument("--rate-limit", type=float, help="Запросов в секунду на токен, сверх - 429")
+    parser.add_argument("--error-rate", type=float, help="Доля запросов с ответом 500")
+    parser.add_argument("--failed-task-ratio", type=float, help="Доля заданий, завершающихся ошибкой")
+    parser.add_argument("--zip", action="store_true", help="Отдавать отчеты в ZIP, как настоящий API")
+    parser.add_argument("--mock-config", help="JSON-файл с настройками имитации (ключи DEFAULT_SETTINGS)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Секунд между проверками статуса задания")
+    parser.add_argument("--workdir", help="Рабочая папка теста (по умолчанию временная, удаляется после теста)")
+    parser.add_argument("--json", help="Сохранить результаты в JSON-файл")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод обработки")
+    args = parser.parse_args()
+
+    settings: Dict[str, Any] = {}
+    if args.mock_config:
+        with open(args.mock_config, "r", encoding="utf-8") as f:
+            settings.update(json.load(f))
+    # Only options given on the command line override --mock-config
+    for key in ("rows", "task_delay", "forbidden_ratio", "rate_limit", "error_rate", "failed_task_ratio"):
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+    if args.zip:
+        settings["zip"] = True
+
+    result = run_load_test(args.certs, args.groups, settings, args.workdir,
+                           args.poll_interval, quiet=not args.verbose)
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Log Tail Module
+
+This module provides incremental reading of log files written by
+logger_config (RotatingFileHandler, 10 MB per file). Instead of reading a
+whole file on every refresh, LogTail reads the last lines by seeking
+backwards from the end in blocks, remembers the byte offset of the last
+complete line and afterwards reads only the bytes appended since then.
+Rotation (the file was renamed and a new one created) and truncation are
+detected by the file identity and size, and reported so that the caller can
+show the tail of the new file.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+# Bytes read per step when searching backwards for line breaks
+BLOCK_SIZE = 64 * 1024
+
+# Lines kept by default, matching the old viewers of the Logs tab
+DEFAULT_MAX_LINES = 1000
+
+# Encodings tried for each line; old logs on Windows may be in cp1251
+ENCODINGS = ('utf-8', 'cp1251')
+
+def _decode(data: bytes) -> str:
+    for encoding in ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+def _split_lines(data: bytes) -> List[str]:
+    return [_decode(line).rstrip('\r') for line in data.split(b'\n')]
+
+def read_last_lines(path: str, count: int, block_size: int = BLOCK_SIZE) -> Tuple[List[str], int]:
+    """
+    Read the last complete lines of a file without reading all of it
+
+    Args:
+        path: Path to the file
+        count: Maximum number of lines to return
+        block_size: Bytes read per backward step
+
+    Returns:
+        Tuple of (lines, offset) where offset is the byte position right after
+        the last complete line; an unfinished last line is not returned
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        end = None
+        chunks: List[bytes] = []
+        newlines = 0
+
+        # Collect blocks from the end until count + 1 line breaks are seen
+        # (the extra one marks the start of the first returned line)
+        while position > 0 and newlines <= count:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size)
+            if end is None:
+                # Bytes after the last line break belong to a line still being written
+                last_break = chunk.rfind(b'\n')
+                if last_break == -1 and position > 0:
+                    chunks.insert(0, chunk)
+                    continue
+                end = position + last_break + 1
+            chunks.insert(0, chunk)
+            newlines += chunk.count(b'\n')
+
+    data = b''.join(chunks)
+    if end is None:
+        # No line break in the whole file
+        return [], 0
+    data = data[:end - position]
+    lines = _split_lines(data[:-1]) if data else []
+    if position > 0 and lines:
+        # The first line may start before the data that was read
+        lines = lines[1:]
+    return lines[-count:] if count > 0 else [], end
+
+class LogTail:
+    """Follows one log file and returns only new lines"""
+
+    def __init__(self, path: str, max_lines: int = DEFAULT_MAX_LINES):
+        self.path = path
+        self.max_lines = max_lines
+        self.offset = 0
+        self._identity: Optional[Tuple[int, int]] = None
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def read_tail(self) -> List[str]:
+        """
+        Read the last max_lines lines and start following the file from its end
+
+        Returns:
+            List of lines (empty if the file does not exist)
+        """
+        stat = self._stat()
+        if stat is None:
+            self.offset = 0
+            self._identity = None
+            return []
+        lines, self.offset = read_last_lines(self.path, self.max_lines)
+        self._identity = (stat.st_dev, stat.st_ino)
+        return lines
+
+    def read_new_lines(self) -> Tuple[List[str], bool]:
+        """
+        Read complete lines appended since the previous call
+
+        Returns:
+            Tuple of (lines, reset). reset is True when the file was rotated,
+            truncated or recreated; lines then contain the tail of the new file
+            and replace everything shown before
+        """
+        stat = self._stat()
+        if stat is None:
+            if self._identity is None:
+                return [], False
+            # Rotated away and the new file is not created yet
+            self.offset = 0
+            self._identity = None
+            return [], True
+
+        if self._identity != (stat.st_dev, stat.st_ino) or stat.st_size < self.offset:
+            return self.read_tail(), True
+        if stat.st_size == self.offset:
+            return [], False
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        last_break = data.rfind(b'\n')
+        if last_break == -1:
+            return [], False
+        self.offset += last_break + 1
+        lines = _split_lines(data[:last_break])
+        return lines[-self.max_lines:], False
@@ -1,7 +1,27 @@
+"""
+Logger Config Module
+
+This module provides the loggers of the system. Every named logger writes to
+the console and to logs/<name>.log (rotated at 10 MB). Log calls only put the
+record on an in-memory queue (QueueHandler); a single background thread
+(QueueListener) formats the records and does the console and file I/O, so
+worker threads never wait on the disk. Loggers are configured once: repeated
+get_logger() calls for the same name return the existing logger, and each log
+file has exactly one RotatingFileHandler.
+
+Structured output: with json_lines=True (or the CRPT_LOG_JSON=1 environment
+variable) records are also written to logs/<name>.jsonl, one JSON object per
+line including the fields passed through extra={...}.
+"""
+
 import os
+import json
+import atexit
 import logging
+import queue
+import threading
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 # Create logs directory if it doesn't exist
 logs_dir = os.path.join(os.getcwd(), "logs")
@@ -10,54 +30,142 @@ if not os.path.exists(logs_dir):
 
 # Removed Telegram bot functionality
 
-def setup_logger(name=None, log_level=logging.INFO):
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_BYTES = 10 * 1024 * 1024  # 10MB
+BACKUP_COUNT = 10
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'log_files'}
+
+_queue = queue.SimpleQueue()
+_listener = None
+_file_handlers = {}
+_console_handler = None
+_lock = threading.RLock()
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _LoggerQueueHandler(QueueHandler):
+    """Queues records of one logger, tagged with the files they go to"""
+
+    def __init__(self, log_files):
+        super().__init__(_queue)
+        self.log_files = tuple(log_files)
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.log_files = self.log_files
+        return record
+
+class _DispatchHandler(logging.Handler):
+    """Runs in the listener thread: writes a record to the console and its files"""
+
+    def handle(self, record):
+        _console_handler.handle(record)
+        for log_file in record.log_files:
+            handler = _file_handlers.get(log_file)
+            if handler is not None:
+                handler.handle(record)
+        return True
+
+def _ensure_listener():
+    global _listener, _console_handler
+    if _listener is not None:
+        return
+    _console_handler = logging.StreamHandler()
+    _console_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+    _listener = QueueListener(_queue, _DispatchHandler())
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def _file_handler(log_filename, json_lines=False):
+    """Get the only handler of a log file, creating it on first use"""
+    handler = _file_handlers.get(log_filename)
+    if handler is None:
+        handler = RotatingFileHandler(
+            os.path.join(logs_dir, log_filename),
+            maxBytes=MAX_BYTES,
+            backupCount=BACKUP_COUNT,
+            encoding='utf-8',
+            delay=True
+        )
+        if json_lines:
+            handler.setFormatter(JsonLinesFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+        _file_handlers[log_filename] = handler
+    return handler
+
+def setup_logger(name=None, log_level=logging.INFO, json_lines=None):
     """
     Configure and return a logger that logs to both console and file
     
     Args:
         name: Logger name (defaults to root logger if None)
         log_level: Logging level (INFO by default)
+        json_lines: Also write logs/<name>.jsonl; defaults to the CRPT_LOG_JSON
+            environment variable
         
     Returns:
         Configured logger instance
     """
-    # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
-    logger.handlers = []  # Clear any existing handlers
-    
-    # Log format with timestamps
-    log_format = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_format)
-    logger.addHandler(console_handler)
-    
-    # File handler (automatic rotation, max 10MB, keep 10 backup files)
-    if name is None:
-        log_filename = "app.log"
-    else:
-        log_filename = f"{name}.log"
-        
-    file_handler = RotatingFileHandler(
-        os.path.join(logs_dir, log_filename),
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=10,
-        encoding='utf-8'
-    )
-    file_handler.setFormatter(log_format)
-    logger.addHandler(file_handler)
-    
+
+    with _lock:
+        # Already configured (possibly by another import of this module)
+        if any(isinstance(h, QueueHandler) for h in logger.handlers):
+            return logger
+
+        if json_lines is None:
+            json_lines = os.environ.get("CRPT_LOG_JSON", "").lower() in ("1", "true", "yes")
+
+        base_name = "app" if name is None else name
+        log_files = [f"{base_name}.log"]
+        if json_lines:
+            log_files.append(f"{base_name}.jsonl")
+
+        _ensure_listener()
+        _file_handler(log_files[0])
+        if json_lines:
+            _file_handler(log_files[1], json_lines=True)
+
+        logger.handlers = [_LoggerQueueHandler(log_files)]
     return logger
 
 def get_logger(name=None):
     """Get a configured logger instance"""
+    logger = logging.getLogger(name)
+    if any(isinstance(h, QueueHandler) for h in logger.handlers):
+        return logger
     return setup_logger(name)
 
+def shutdown_logging():
+    """Write out queued records and close the log files"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in list(_file_handlers.values()):
+        handler.close()
+
 def log_exception(logger, exc, additional_info=None):
     """
     Log an exception with detailed information and optionally send to Telegram
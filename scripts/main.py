@@ -3,6 +3,11 @@ import sys
 
 # Check for dependencies before importing other modules
 if __name__ == "__main__":
+    if '--profile-imports' in sys.argv:
+        # Cold start profile: python main.py --profile-imports
+        from dependency_manager import print_import_profile
+        print_import_profile("main")
+        sys.exit(0)
     try:
         # First, try to import dependency_manager
         try:
@@ -115,16 +120,14 @@ from datetime import datetime, timedelta
 from get_violations import ViolationsReport, PRODUCT_GROUPS
 from get_report import ReportDownloader
 from process_report import process_reports
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from get_tokens import get_tokens
 from logger_config import get_logger, log_exception
 from file_viewer import view_file_with_menu
 from token_manager import show_tokens_management_menu
 
 # Import utilities from the new modules
-from email_utils import load_email_config
+from email_utils import load_email_config, send_violations_report
+from config_store import load_json, TOKENS_FILE
 from file_utils import (
     list_files_in_directory, 
     delete_file, 
@@ -139,7 +142,8 @@ from report_processor import (
 from file_viewer import view_file_with_menu
 from token_manager import show_tokens_management_menu
 from token_utils import get_any_valid_token
-from scheduler import Scheduler
+from tracing import span, trace_run
+from metrics import ROWS_COUNTED
 
 # Initialize colorama
 colorama.init(autoreset=True)
@@ -177,14 +181,13 @@ def load_product_groups():
 def load_tokens():
     """Load tokens from true_api_tokens.json"""
     try:
-        with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            tokens = [(cert_id, token) for cert_id, token in data['tokens'].items()]
-            tokens_logger.info(f"Loaded {len(tokens)} tokens from true_api_tokens.json")
-            return tokens
-    except FileNotFoundError:
-        tokens_logger.error("File true_api_tokens.json not found")
-        return []
+        data = load_json(TOKENS_FILE)
+        if data is None:
+            tokens_logger.error("File true_api_tokens.json not found")
+            return []
+        tokens = list(data['tokens'].items())
+        tokens_logger.info(f"Loaded {len(tokens)} tokens from true_api_tokens.json")
+        return tokens
     except Exception as e:
         log_exception(tokens_logger, e, "Error reading tokens")
         return []
@@ -227,8 +230,15 @@ def read_csv_with_encoding(file_path: str) -> int:
     reports_logger.error(f"Could not read file {file_path} with any encoding")
     return 0
 
-def create_tasks_for_token(cert_name: str, token: str) -> list:
-    """Create tasks for all product groups and return task IDs"""
+def create_tasks_for_token(cert_name: str, token: str, cancel_event=None, progress_callback=None) -> list:
+    """Create tasks for all product groups and return task IDs
+
+    Args:
+        cert_name: Certificate name
+        token: API token
+        cancel_event: Optional threading.Event, remaining groups are skipped once it is set
+        progress_callback: Optional callable(done, total) called after every group
+    """
     violations_logger.info(f"Creating tasks for certificate: {cert_name}")
     
     task_ids = []
@@ -239,14 +249,18 @@ def create_tasks_for_token(cert_name: str, token: str) -> list:
     yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
     violations_logger.info(f"Using date range: {yesterday} to {yesterday} (yesterday's data)")
     
-    for group_code in load_product_groups():
+    groups = load_product_groups()
+    for index, group_code in enumerate(groups, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            break
         try:
             violations_logger.info(f"Creating task for group {group_code} ({PRODUCT_GROUPS.get(group_code, 'Unknown')})")
-            result = ViolationsReport(token).create_violations_task(
-                start_date=yesterday,
-                end_date=yesterday,  # Use yesterday for both start and end dates
-                product_group_code=group_code
-            )
+            with span("create_task", cert=cert_name, group=group_code):
+                result = ViolationsReport(token).create_violations_task(
+                    start_date=yesterday,
+                    end_date=yesterday,  # Use yesterday for both start and end dates
+                    product_group_code=group_code
+                )
             
             if result and result.get('id'):
                 task_id = result['id']
@@ -255,7 +269,9 @@ def create_tasks_for_token(cert_name: str, token: str) -> list:
                 
         except Exception as e:
             log_exception(violations_logger, e, f"Error creating task for group {group_code}")
-            continue
+        finally:
+            if progress_callback:
+                progress_callback(index, len(groups))
     
     # Save task IDs for this certificate
     if task_ids:
@@ -267,8 +283,12 @@ def create_tasks_for_token(cert_name: str, token: str) -> list:
     
     return task_ids
 
-def download_tasks_for_token(cert_name: str, token: str):
-    """Download all pending tasks for a certificate"""
+def download_tasks_for_token(cert_name: str, token: str, cancel_event=None, progress_callback=None):
+    """Download all pending tasks for a certificate
+
+    Tasks not downloaded before cancel_event is set stay in the pending list.
+    progress_callback(done, total) is called after every task.
+    """
     reports_logger.info(f"Downloading tasks for certificate: {cert_name}")
     
     base_dir = os.path.join('output', cert_name)
@@ -286,13 +306,20 @@ def download_tasks_for_token(cert_name: str, token: str):
     reports_logger.info(f"Found {len(tasks)} pending tasks")
     
     remaining_tasks = []
-    for task_id, group_code in tasks:
+    for index, (task_id, group_code) in enumerate(tasks, 1):
+        if progress_callback:
+            progress_callback(index - 1, len(tasks))
+        if cancel_event is not None and cancel_event.is_set():
+            remaining_tasks.append((task_id, group_code))
+            continue
         try:
             group_code = int(group_code)
             client = ReportDownloader(token, group_code)
             reports_logger.info(f"Downloading task {task_id} for group {group_code}")
             
-            if client.monitor_and_download(task_id, reports_dir):
+            with span("download_task", cert=cert_name, group=group_code, task=task_id):
+                downloaded = client.monitor_and_download(task_id, reports_dir)
+            if downloaded:
                 reports_logger.info(f"Successfully downloaded task {task_id}")
             else:
                 reports_logger.warning(f"Failed to download task {task_id}, will retry later")
@@ -312,74 +339,6 @@ def download_tasks_for_token(cert_name: str, token: str):
         os.remove(tasks_file)
         reports_logger.info("All tasks completed, removed pending tasks file")
 
-def load_email_config():
-    """Load email configuration"""
-    try:
-        with open('email_config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            email_logger.info("Email configuration loaded successfully")
-            return config
-    except Exception as e:
-        log_exception(email_logger, e, "Error loading email config")
-        return None
-
-def send_violations_report(cert_name: str, violations_data: dict, email_config: dict) -> bool:
-    """Send email with violations report"""
-    try:
-        email_logger.info(f"Preparing email report for {cert_name} on {violations_data['date']}")
-        
-        # Create HTML content with clear indication that this is yesterday's data
-        html = f"""
-        <h2>Отчет о нарушениях маркировки за {violations_data['date']} (данные за вчерашний день)</h2>
-        <h3>Сертификат: {cert_name}</h3>
-        <table border="1" style="border-collapse: collapse; width: 100%;">
-            <tr style="background-color: #f2f2f2;">
-                <th style="padding: 8px;">Товарная группа</th>
-                <th style="padding: 8px;">Количество нарушений</th>
-            </tr>
-        """
-        
-        total_violations = 0
-        for group, count in violations_data['violations'].items():
-            total_violations += count
-            html += f"""
-            <tr>
-                <td style="padding: 8px;">{group}</td>
-                <td style="padding: 8px; text-align: center;">{count}</td>
-            </tr>
-            """
-        
-        html += f"""
-            <tr style="background-color: #f2f2f2; font-weight: bold;">
-                <td style="padding: 8px;">Всего нарушений:</td>
-                <td style="padding: 8px; text-align: center;">{total_violations}</td>
-            </tr>
-        </table>
-        """
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"Отчет о нарушениях маркировки - {cert_name} - {violations_data['date']}"
-        msg['From'] = email_config['sender_email']
-        recipients = email_config['recipient_emails']
-        msg['To'] = ', '.join(recipients)
-        msg.attach(MIMEText(html, 'html'))
-        
-        email_logger.info(f"Sending email to {len(recipients)} recipients")
-        
-        # Send email
-        with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-            server.starttls()
-            server.login(email_config['sender_email'], email_config['sender_password'])
-            server.send_message(msg)
-            
-        email_logger.info(f"Email report sent successfully for {cert_name}")
-        return True
-        
-    except Exception as e:
-        log_exception(email_logger, e, f"Error sending email report for {cert_name}")
-        return False
-
 def process_reports_for_token(cert_name: str, email_config: dict = None):
     """Process all reports into single JSON file and send email"""
     reports_logger.info(f"Processing reports for certificate: {cert_name}")
@@ -428,7 +387,9 @@ def process_reports_for_token(cert_name: str, email_config: dict = None):
                 reports_logger.warning(f"Unknown product group code: {group_code}")
                 continue
             
-            violation_count = read_csv_with_encoding(input_path)
+            with span("count_rows", cert=cert_name, group=group_code, file=csv_file):
+                violation_count = read_csv_with_encoding(input_path)
+            ROWS_COUNTED.inc(violation_count, group=group_code)
             violations_data['violations'][product_name] = violation_count
             reports_logger.info(f"Found {violation_count} violations for {product_name}")
             
@@ -452,7 +413,8 @@ def refresh_daily_tokens() -> bool:
     """Refresh tokens daily"""
     try:
         tokens_logger.info("Refreshing tokens...")
-        tokens = get_tokens()
+        with span("refresh_tokens"):
+            tokens = get_tokens()
         if not tokens:
             tokens_logger.error("Failed to get new tokens")
             return False
@@ -740,8 +702,34 @@ def install_certificate():
     except Exception as e:
         log_exception(logger, e, "Error during certificate installation")
 
-def run_daily_process():
-    """Run the daily processing routine"""
+def run_daily_process(cancel_event=None, progress_callback=None, refresh_tokens=True):
+    """Run the daily processing routine
+
+    The run is traced: its spans are saved to logs/traces (see tracing.py).
+
+    Args:
+        cancel_event: Optional threading.Event; when it is set the run stops
+            after the current step and returns False
+        progress_callback: Optional callable(percent, message) receiving the
+            overall progress per certificate and product group
+        refresh_tokens: Refresh tokens before the run; False uses the tokens
+            already saved in true_api_tokens.json (e.g. for load tests
+            without CryptoPro, see load_test.py)
+    """
+    with trace_run("daily_process"):
+        return _run_daily_process(cancel_event, progress_callback, refresh_tokens)
+
+def _run_daily_process(cancel_event, progress_callback, refresh_tokens=True):
+    def report_progress(fraction, message):
+        if progress_callback:
+            progress_callback(max(0, min(int(fraction * 100), 100)), message)
+
+    def cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            logger.warning("Ежедневная обработка отменена")
+            return True
+        return False
+
     logger.info("Запуск ежедневной обработки...")
     logger.info("Будут обработаны данные за вчерашний день")
     
@@ -753,14 +741,18 @@ def run_daily_process():
     try:
         # First refresh tokens - ALWAYS refresh tokens before running daily process
         # This ensures we always have fresh tokens
-        logger.info("Refreshing tokens before daily processing...")
-        if not refresh_daily_tokens():
-            logger.error("Failed to refresh tokens. Retrying once...")
-            # Wait a moment and try again
-            time.sleep(10)
+        report_progress(0, "Обновление токенов")
+        if refresh_tokens:
+            logger.info("Refreshing tokens before daily processing...")
             if not refresh_daily_tokens():
-                logger.error("Failed to refresh tokens after retry.")
-                return False
+                logger.error("Failed to refresh tokens. Retrying once...")
+                # Wait a moment and try again
+                time.sleep(10)
+                if not refresh_daily_tokens():
+                    logger.error("Failed to refresh tokens after retry.")
+                    return False
+        else:
+            logger.info("Token refresh skipped, using saved tokens")
 
         # Load newly generated tokens
         tokens = load_tokens()
@@ -768,25 +760,56 @@ def run_daily_process():
             logger.error("No tokens found in true_api_tokens.json")
             return False
         
+        # Token refresh takes the first 5%, certificates share the next 90%
+        # (20% of each for creating tasks, 70% for downloads, 10% for processing)
+        cert_span = 0.9 / len(tokens)
+        
         # Process each certificate
-        for cert_id, token in tokens:
+        for cert_index, (cert_id, token) in enumerate(tokens):
+            if cancelled():
+                return False
             logger.info(f"Processing certificate: {cert_id}")
+            base = 0.05 + cert_index * cert_span
+            position = f"{cert_index + 1}/{len(tokens)}"
             
             # Phase 1: Create tasks
-            tasks = create_tasks_for_token(cert_id, token)
+            with span("create_tasks", cert=cert_id):
+                tasks = create_tasks_for_token(
+                    cert_id, token, cancel_event,
+                    lambda done, total: report_progress(
+                        base + cert_span * 0.2 * done / total,
+                        f"{cert_id} ({position}): создание заданий {done}/{total}"
+                    )
+                )
+            if cancelled():
+                return False
             
             # Phase 2: Download reports
-            download_tasks_for_token(cert_id, token)
+            with span("download_reports", cert=cert_id):
+                download_tasks_for_token(
+                    cert_id, token, cancel_event,
+                    lambda done, total: report_progress(
+                        base + cert_span * (0.2 + 0.7 * done / total),
+                        f"{cert_id} ({position}): загрузка отчетов {done}/{total}"
+                    )
+                )
+            if cancelled():
+                return False
             
             # Phase 3: Process reports - but don't send emails yet
-            process_reports_for_token(cert_id, None)
+            report_progress(base + cert_span * 0.9, f"{cert_id} ({position}): обработка отчетов")
+            with span("process_reports", cert=cert_id):
+                process_reports_for_token(cert_id, None)
         
         # Now send consolidated reports by region
         logger.info("Processing complete. Sending consolidated regional reports...")
+        report_progress(0.95, "Отправка региональных отчетов")
         
         # Import and use function from send_daily_report.py
         from send_daily_report import process_and_send_reports
-        process_and_send_reports()
+        with span("send_reports"):
+            if not process_and_send_reports():
+                logger.warning("Not all regional reports were delivered, undelivered ones stay in the email outbox")
         
         # Update last run time
         current_time = datetime.now()
@@ -800,6 +823,7 @@ def run_daily_process():
             }, f, indent=2)
         
         logger.info("Daily processing completed successfully")
+        report_progress(1, "Обработка завершена")
         return True
         
     except Exception as e:
@@ -976,10 +1000,9 @@ def main():
     # Check for command line argument to run in scheduler mode
     if len(sys.argv) > 1 and sys.argv[1] == '--scheduler':
         logger.info("Запуск в режиме планировщика")
-        # Run the scheduler without UI
-        scheduler = Scheduler()
-        # Run continuously - this is a blocking call that runs forever
-        scheduler.run_continuously()
+        # Run the scheduler daemon without UI - this is a blocking call
+        from scheduler import start_daemon
+        start_daemon()
         return
     
     # Check for daemon mode - this starts the scheduler and exits
@@ -1010,9 +1033,9 @@ def run_daemon_mode():
     """Run in daemon mode without interactive menu"""
     logger.info("=== True API ЦРПТ Daily Processor (Daemon Mode) ===")
     
-    # Use the scheduler for consistent scheduling
-    scheduler = Scheduler()
-    scheduler.run_continuously()
+    # Use the scheduler daemon for consistent scheduling
+    from scheduler import start_daemon
+    start_daemon()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,203 @@
+"""
+Metrics Module
+
+This module provides in-process counters, gauges and histograms of the
+report pipeline and the scheduler, rendered in the Prometheus text
+exposition format. The scheduler daemon serves them on its control endpoint:
+
+    GET http://127.0.0.1:<control_port>/metrics
+
+Jobs run inside the daemon process, so the values cover every scheduled run
+since the daemon started (runs started from the GUI or the CLI count in
+their own process only). Set "control_port" in scheduler_config.json to a
+fixed port to scrape the endpoint with Prometheus.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds: dispenser requests, SMTP sends, token refreshes
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """Base of a metric family with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Monotonically increasing value, e.g. tasks created"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        """Sum over all label values"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+class Gauge(Counter):
+    """Value that can be set to anything, e.g. a timestamp"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_to_current_time(self, **labels) -> None:
+        self.set(time.time(), **labels)
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, e.g. latencies"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][position] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# -------------------- Pipeline metrics --------------------
+
+TASKS_CREATED = Counter(
+    "crpt_tasks_created_total", "Dispenser tasks created", ["group"])
+TASKS_POLLED = Counter(
+    "crpt_tasks_polled_total", "Dispenser task status requests", ["group"])
+TASKS_DOWNLOADED = Counter(
+    "crpt_tasks_downloaded_total", "Dispenser task results downloaded", ["group"])
+TASKS_FAILED = Counter(
+    "crpt_tasks_failed_total", "Dispenser tasks that failed, by stage (create, poll, download, access)",
+    ["group", "stage"])
+BYTES_DOWNLOADED = Counter(
+    "crpt_downloaded_bytes_total", "Bytes of report files downloaded", ["group"])
+ROWS_COUNTED = Counter(
+    "crpt_rows_counted_total", "Violation rows counted in downloaded reports", ["group"])
+DISPENSER_POLL_SECONDS = Histogram(
+    "crpt_dispenser_poll_seconds", "Latency of dispenser task status and result list requests", ["group"])
+TOKEN_REFRESH_SECONDS = Histogram(
+    "crpt_token_refresh_seconds", "Duration of a token refresh of all certificates, signing included",
+    ["result"], buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+SMTP_SEND_SECONDS = Histogram(
+    "crpt_smtp_send_seconds", "Latency of SMTP message sends", ["result"])
+
+# -------------------- Scheduler metrics --------------------
+
+JOB_RUNS = Counter(
+    "crpt_job_runs_total", "Finished scheduler job runs by status", ["job", "status"])
+JOB_LAST_SUCCESS = Gauge(
+    "crpt_job_last_success_timestamp_seconds", "Unix time of the last successful run of a job", ["job"])
+JOB_LAST_DURATION = Gauge(
+    "crpt_job_last_duration_seconds", "Duration of the last run of a job", ["job"])
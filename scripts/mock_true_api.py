@@ -0,0 +1,488 @@
+"""
+Mock True API Module
+
+This module provides a local stand-in for the CRPT True API, so the daily
+pipeline can be run end to end and load tested without markirovka.crpt.ru.
+It implements the endpoints the pipeline uses:
+
+    GET  /auth/key                     - authorization data to sign
+    POST /auth/simpleSignIn            - token for signed data (any signature is accepted)
+    POST /dispenser/tasks              - create a report task
+    GET  /dispenser/tasks/<id>         - task status
+    GET  /dispenser/results            - results of tasks (task_ids, pg)
+    GET  /dispenser/results/<id>       - result information
+    GET  /dispenser/results/<id>/file  - synthetic CSV report (synthetic_reports.py)
+    GET  /violations/first-date        - date of the first violation of the token's INN in a group
+    GET  /mock/stats                   - request counters of the mock itself
+
+Behaviour is set by a settings dictionary (see DEFAULT_SETTINGS): task
+completion delays, 403 access matrices per token or INN, 429 rate limiting
+per token, injected 500 errors and failed tasks, and the size and encoding
+of the CSV payloads. Tokens are unsigned JWTs carrying the INN given at
+sign-in; the first violation of every (INN, group) falls on a stable day
+within history_days, and reports of periods before it are empty. Point the pipeline at the mock with CRPT_API_URL:
+
+    python mock_true_api.py --port 8099 --task-delay 5 --rows 1000
+    set CRPT_API_URL=http://127.0.0.1:8099/api/v3/true-api
+
+load_test.py starts the mock in-process and runs the daily pipeline against it.
+"""
+
+import base64
+import io
+import json
+import random
+import secrets
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+from logger_config import get_logger
+from synthetic_reports import csv_bytes
+
+# Set up logger
+mock_logger = get_logger("mock_api")
+
+API_PREFIX = "/api/v3/true-api"
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "task_delay": 0.0,          # seconds until the result of a task is ready
+    "task_delay_jitter": 0.0,   # random extra delay, up to this many seconds
+    "rows": 100,                # rows in every report file
+    "rows_jitter": 0,           # random extra rows, up to this many
+    "encoding": "cp1251",       # encoding of the CSV payloads
+    "zip": False,               # wrap the CSV into a ZIP archive like the real API does
+    "forbidden": {},            # token or INN -> group codes answered with 403
+    "forbidden_ratio": 0.0,     # share of (token, group) pairs answered with 403
+    "rate_limit": 0.0,          # requests per second per token, 0 - unlimited; excess gets 429
+    "retry_after": 1,           # Retry-After of 429 responses, seconds
+    "error_rate": 0.0,          # share of requests answered with 500
+    "failed_task_ratio": 0.0,   # share of tasks that end with downloadStatus FAILED
+    "latency": 0.0,             # delay added to every response, seconds
+    "history_days": 365,        # first violations of (INN, group) lie 1 to this many days back
+    "seed": 0,                  # seed of all random decisions
+}
+
+# Seconds a token is valid, like the 10 hours of the real API
+TOKEN_LIFETIME = 36000
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def token_inn(token: str) -> Optional[str]:
+    """INN claim of a token issued by the mock"""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))).get("inn")
+    except (IndexError, ValueError):
+        return None
+
+@lru_cache(maxsize=64)
+def _report_payload(rows: int, group_code: int, date: str, encoding: str, as_zip: bool) -> bytes:
+    # Comma-separated like the files of the real dispenser
+    data = csv_bytes(rows, group_code, date, encoding=encoding, delimiter=",")
+    if not as_zip:
+        return data
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"file-{uuid.uuid4()}.csv", data)
+    return buffer.getvalue()
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """Request handler of the mock API"""
+
+    server_version = "MockTrueAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY every
+    # keep-alive response would wait for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        mock_logger.debug("Mock request: " + format % args)
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.server.count_request(self.command, self._route, status)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 204:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 204:
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   "application/json; charset=utf-8", headers)
+
+    def _error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error_message": message}, headers)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        # Read before any early answer, otherwise the body would be taken for the next request
+        raw = self.rfile.read(length)
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _token(self) -> Optional[str]:
+        authorization = self.headers.get("Authorization", "")
+        if authorization.startswith("Bearer ") and authorization[7:].strip():
+            return authorization[7:].strip()
+        return None
+
+    def _dispatch(self) -> None:
+        body = self._read_json()
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        query = parse_qs(parts.query)
+        segments = [segment for segment in path.split("/") if segment]
+        server = self.server
+
+        # Route template used in the statistics, without task ids
+        self._route = "/" + "/".join("<id>" if index == 2 and segments[0] == "dispenser" else segment
+                                     for index, segment in enumerate(segments))
+
+        if server.settings["latency"]:
+            time.sleep(server.settings["latency"])
+
+        if segments == ["mock", "stats"]:
+            self._send_json(200, server.stats())
+            return
+
+        if server.inject_error():
+            self._error(500, "Injected failure")
+            return
+
+        if segments == ["auth", "key"] and self.command == "GET":
+            self._send_json(200, server.auth_key())
+            return
+        if segments == ["auth", "simpleSignIn"] and self.command == "POST":
+            token = server.sign_in(body)
+            if token is None:
+                self._error(400, "Неизвестный или использованный uuid")
+            else:
+                self._send_json(200, {"token": token})
+            return
+
+        if not segments or segments[0] not in ("dispenser", "violations"):
+            self._error(404, "Not found")
+            return
+
+        token = self._token()
+        if token is None:
+            self._error(401, "Не передан токен авторизации")
+            return
+        if not server.take_rate_limit(token):
+            self._error(429, "Too many requests", {"Retry-After": str(server.settings["retry_after"])})
+            return
+
+        if segments == ["violations", "first-date"] and self.command == "GET":
+            group = int((query.get("productGroupCode") or ["0"])[0])
+            if server.is_forbidden(token, group):
+                self._error(403, f"Нет доступа к товарной группе {group}")
+            else:
+                self._send_json(200, {"firstViolationDate": f"{server.first_violation_date(token, group)}T00:00:00.000Z"})
+        elif segments == ["dispenser", "tasks"] and self.command == "POST":
+            group = int(body.get("productGroupCode") or 0)
+            if server.is_forbidden(token, group):
+                self._error(403, f"Нет доступа к товарной группе {group}")
+                return
+            self._send_json(200, server.create_task(token, body))
+        elif len(segments) == 3 and segments[1] == "tasks" and self.command == "GET":
+            task = server.get_task(segments[2])
+            if task is None:
+                self._error(404, "Задание не найдено")
+            else:
+                self._send_json(200, server.task_info(task))
+        elif segments == ["dispenser", "results"] and self.command == "GET":
+            self._send_json(200, server.results(query.get("task_ids", [])))
+        elif len(segments) == 3 and segments[1] == "results" and self.command == "GET":
+            task = server.get_task(segments[2])
+            if task is None:
+                self._error(404, "Результат не найден")
+            else:
+                self._send_json(200, server.result_info(task))
+        elif len(segments) == 4 and segments[1] == "results" and segments[3] == "file" \
+                and self.command == "GET":
+            task = server.get_task(segments[2])
+            if task is None or server.download_status(task) != "SUCCESS":
+                self._error(404, "Файл не готов")
+            elif server.is_forbidden(token, task["productGroupCode"]):
+                self._error(403, f"Нет доступа к товарной группе {task['productGroupCode']}")
+            elif task["rows"] == 0:
+                self._send(204)
+            else:
+                payload = server.payload(task)
+                content_type = "application/zip" if server.settings["zip"] else \
+                    f"text/csv; charset={server.settings['encoding']}"
+                self._send(200, payload, content_type)
+        else:
+            self._error(404, "Not found")
+
+    def _handle(self) -> None:
+        self._route = self.path
+        try:
+            self._dispatch()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            mock_logger.error(f"Mock API error on {self.command} {self.path}: {e}")
+            self._error(500, str(e))
+
+    do_GET = _handle
+    do_POST = _handle
+
+class MockTrueApi(ThreadingHTTPServer):
+    """Local HTTP server imitating the True API dispenser"""
+
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 128
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, settings: Optional[Dict[str, Any]] = None):
+        super().__init__((host, port), _MockHandler)
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self._lock = threading.Lock()
+        self._random = random.Random(self.settings["seed"])
+        self._auth: Dict[str, str] = {}
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[str, list] = {}
+        self._requests: Counter = Counter()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for CRPT_API_URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> str:
+        """Serve requests in a background thread, returns the base URL"""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-true-api", daemon=True)
+        self._thread.start()
+        mock_logger.info(f"Mock True API listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    # ---- Decisions ----
+
+    def _chance(self, ratio: float) -> bool:
+        if ratio <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < ratio
+
+    def _stable_chance(self, ratio: float, *key) -> bool:
+        """Decision that is the same for the same key in every run"""
+        if ratio <= 0:
+            return False
+        text = ":".join(str(part) for part in (self.settings["seed"],) + key)
+        return zlib.crc32(text.encode("utf-8")) / 0xFFFFFFFF < ratio
+
+    def inject_error(self) -> bool:
+        return self._chance(self.settings["error_rate"])
+
+    def is_forbidden(self, token: str, group: int) -> bool:
+        forbidden = self.settings["forbidden"]
+        for key in (token, token_inn(token)):
+            if key is not None and int(group) in {int(code) for code in forbidden.get(key, [])}:
+                return True
+        return self._stable_chance(self.settings["forbidden_ratio"], token, group)
+
+    def first_violation_date(self, token: str, group: int) -> str:
+        """Stable first violation day of the token's INN in a group"""
+        text = f"{self.settings['seed']}:{token_inn(token) or token}:{group}"
+        days = 1 + zlib.crc32(text.encode("utf-8")) % max(1, int(self.settings["history_days"]))
+        return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    def take_rate_limit(self, token: str) -> bool:
+        """Token bucket per token, one second of burst"""
+        rate = self.settings["rate_limit"]
+        if rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(token, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    # ---- Auth ----
+
+    def auth_key(self) -> Dict[str, str]:
+        key = {"uuid": str(uuid.uuid4()), "data": secrets.token_urlsafe(24)}
+        with self._lock:
+            self._auth[key["uuid"]] = key["data"]
+        return key
+
+    def sign_in(self, body: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            if self._auth.pop(str(body.get("uuid")), None) is None or not body.get("data"):
+                return None
+        # The INN is kept in the token so that access matrices can refer to it
+        claims = {"exp": int(time.time()) + TOKEN_LIFETIME, "jti": secrets.token_hex(8)}
+        inn = str(body.get("inn") or "").strip()
+        if inn:
+            claims["inn"] = inn
+        return ".".join(_b64url(json.dumps(part).encode("utf-8"))
+                        for part in ({"alg": "none", "typ": "JWT"}, claims)) + "." + secrets.token_hex(16)
+
+    # ---- Tasks ----
+
+    def create_task(self, token: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        settings = self.settings
+        with self._lock:
+            delay = settings["task_delay"] + self._random.uniform(0, settings["task_delay_jitter"])
+            rows = settings["rows"] + self._random.randint(0, max(0, int(settings["rows_jitter"])))
+            failed = self._random.random() < settings["failed_task_ratio"]
+        now = datetime.now()
+        group = int(body.get("productGroupCode") or 0)
+        if body.get("dataEndDate", "9999") < self.first_violation_date(token, group):
+            rows = 0
+        task = {
+            "id": str(uuid.uuid4()),
+            "name": body.get("name", "VIOLATIONS"),
+            "format": body.get("format", "CSV"),
+            "productGroupCode": group,
+            "dataStartDate": body.get("dataStartDate", now.strftime("%Y-%m-%d")),
+            "dataEndDate": body.get("dataEndDate", now.strftime("%Y-%m-%d")),
+            "createDate": now.isoformat(),
+            "ready_at": time.monotonic() + delay,
+            "rows": rows,
+            "failed": failed,
+            "token": token,
+        }
+        with self._lock:
+            self._tasks[task["id"]] = task
+        return self.task_info(task)
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def download_status(self, task: Dict[str, Any]) -> str:
+        if time.monotonic() < task["ready_at"]:
+            return "PREPARATION"
+        return "FAILED" if task["failed"] else "SUCCESS"
+
+    def task_info(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        status = {"PREPARATION": "PREPARATION", "SUCCESS": "COMPLETED", "FAILED": "FAILED"}
+        return {
+            "id": task["id"],
+            "name": task["name"],
+            "format": task["format"],
+            "productGroupCode": task["productGroupCode"],
+            "dataStartDate": f"{task['dataStartDate']}T00:00:00.000Z",
+            "dataEndDate": f"{task['dataEndDate']}T23:59:59.999Z",
+            "createDate": task["createDate"],
+            "periodicity": "SINGLE",
+            "currentStatus": status[self.download_status(task)],
+        }
+
+    def result_info(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        status = self.download_status(task)
+        result = {
+            "id": task["id"],
+            "taskId": task["id"],
+            "downloadStatus": status,
+            "productGroupCode": task["productGroupCode"],
+            "task": self.task_info(task),
+        }
+        if status == "FAILED":
+            result["errorMessage"] = "Injected task failure"
+        return result
+
+    def results(self, task_ids) -> Dict[str, Any]:
+        with self._lock:
+            tasks = [self._tasks[task_id] for task_id in task_ids if task_id in self._tasks] \
+                if task_ids else list(self._tasks.values())
+        results = [self.result_info(task) for task in tasks]
+        return {"list": results, "total": len(results)}
+
+    def payload(self, task: Dict[str, Any]) -> bytes:
+        return _report_payload(task["rows"], task["productGroupCode"], task["dataStartDate"],
+                               self.settings["encoding"], bool(self.settings["zip"]))
+
+    # ---- Statistics ----
+
+    def count_request(self, method: str, route: str, status: int) -> None:
+        with self._lock:
+            self._requests[(method, route, status)] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests served by route and status, and task counts"""
+        with self._lock:
+            requests_by_route = {f"{method} {route} {status}": count
+                                 for (method, route, status), count in sorted(self._requests.items())}
+            tasks = list(self._tasks.values())
+        statuses = Counter(self.download_status(task) for task in tasks)
+        return {
+            "requests": requests_by_route,
+            "total_requests": sum(requests_by_route.values()),
+            "tasks": len(tasks),
+            "task_statuses": dict(statuses),
+        }
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Локальная имитация True API для тестов без обращения к markirovka.crpt.ru")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--config", help="JSON-файл с настройками (ключи DEFAULT_SETTINGS)")
+    parser.add_argument("--task-delay", type=float, help="Секунд до готовности задания")
+    parser.add_argument("--rows", type=int, help="Строк в каждом отчете")
+    parser.add_argument("--zip", action="store_true", help="Отдавать отчеты в ZIP, как настоящий API")
+    parser.add_argument("--forbidden-ratio", type=float, help="Доля пар (токен, группа) с ответом 403")
+    parser.add_argument("--rate-limit", type=float, help="Запросов в секунду на токен, сверх - 429")
+    parser.add_argument("--error-rate", type=float, help="Доля запросов с ответом 500")
+    parser.add_argument("--failed-task-ratio", type=float, help="Доля заданий, завершающихся ошибкой")
+    args = parser.parse_args()
+
+    settings: Dict[str, Any] = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            settings.update(json.load(f))
+    for key in ("task_delay", "rows", "forbidden_ratio", "rate_limit", "error_rate", "failed_task_ratio"):
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+    if args.zip:
+        settings["zip"] = True
+
+    server = MockTrueApi(args.host, args.port, settings)
+    print(f"Mock True API: {server.base_url}")
+    print(f"Set CRPT_API_URL={server.base_url} to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
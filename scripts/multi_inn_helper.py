@@ -2,10 +2,9 @@
 Utility for managing certificates with multiple INNs and ТС
 """
 
-import json
-import os
 from colorama import Fore, Style
 import colorama
+from config_store import get_config_store, load_json, save_json, CERTIFICATES_FILE, CERT_INNS_FILE
 
 # Initialize colorama
 colorama.init(autoreset=True)
@@ -13,28 +12,29 @@ colorama.init(autoreset=True)
 def load_certificates():
     """Load certificates from certificates.json"""
     try:
-        with open('certificates.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('certificates', [])
-    except FileNotFoundError:
-        print(f"{Fore.RED}File certificates.json not found")
-        return []
+        data = load_json(CERTIFICATES_FILE)
+        if data is None:
+            print(f"{Fore.RED}File certificates.json not found")
+            return []
+        return data.get('certificates', [])
     except Exception as e:
         print(f"{Fore.RED}Error reading certificates: {e}")
         return []
 
+def save_certificates(certificates):
+    """Save the certificates list to certificates.json, keeping other settings of the file"""
+    data = load_json(CERTIFICATES_FILE, {}) or {}
+    data['certificates'] = certificates
+    save_json(CERTIFICATES_FILE, data)
+
 def load_certificate_inns():
     """Load certificate to ТС-ИНН mapping"""
     try:
-        if not os.path.exists('cert_inns.json'):
+        if not get_config_store().exists(CERT_INNS_FILE):
             # Create empty file if it doesn't exist
-            with open('cert_inns.json', 'w', encoding='utf-8') as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
+            save_json(CERT_INNS_FILE, {})
             return {}
-            
-        with open('cert_inns.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
+        return load_json(CERT_INNS_FILE, {})
     except Exception as e:
         print(f"{Fore.RED}Error loading certificate INNs: {e}")
         return {}
@@ -42,8 +42,7 @@ def load_certificate_inns():
 def save_certificate_inns(cert_inns):
     """Save certificate ТС-ИНН mapping"""
     try:
-        with open('cert_inns.json', 'w', encoding='utf-8') as f:
-            json.dump(cert_inns, f, ensure_ascii=False, indent=2)
+        save_json(CERT_INNS_FILE, cert_inns)
         return True
     except Exception as e:
         print(f"{Fore.RED}Error saving certificate INNs: {e}")
@@ -84,8 +83,7 @@ def add_tc_inn_to_certificate():
                 # Update certificates.json
                 selected_cert['multi_inn'] = True
                 try:
-                    with open('certificates.json', 'w', encoding='utf-8') as f:
-                        json.dump({"certificates": certificates}, f, ensure_ascii=False, indent=2)
+                    save_certificates(certificates)
                     print(f"{Fore.GREEN}Certificate updated to support multiple INNs")
                 except Exception as e:
                     print(f"{Fore.RED}Error updating certificate: {e}")
@@ -184,8 +182,7 @@ def add_multiple_tc_inns_to_certificate():
                 # Update certificates.json
                 selected_cert['multi_inn'] = True
                 try:
-                    with open('certificates.json', 'w', encoding='utf-8') as f:
-                        json.dump({"certificates": certificates}, f, ensure_ascii=False, indent=2)
+                    save_certificates(certificates)
                     print(f"{Fore.GREEN}Certificate updated to support multiple INNs")
                 except Exception as e:
                     print(f"{Fore.RED}Error updating certificate: {e}")
@@ -1,18 +1,30 @@
+from __future__ import annotations
+
 from datetime import datetime
 from collections import defaultdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple, TYPE_CHECKING
 from logger_config import get_logger, log_exception
+from tracing import span
+from xlsx_utils import map_zip_members, open_report, read_report_head, sniff_csv_format, zip_csv_members
 
-# Try to import pandas and chardet, install if missing
-try:
-    import pandas as pd
-except ImportError:
-    import subprocess
-    import sys
-    print("Installing pandas...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas"])
+# pandas takes longer to import than the rest of the CLI, so it is loaded
+# only when a report file is actually read
+if TYPE_CHECKING:
     import pandas as pd
 
+def _pandas():
+    """Import pandas on first use, installing it if missing"""
+    try:
+        import pandas
+    except ImportError:
+        import subprocess
+        import sys
+        print("Installing pandas...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas"])
+        import pandas
+    return pandas
+
+# Try to import chardet, install if missing
 try:
     import chardet
 except ImportError:
@@ -25,51 +37,148 @@ except ImportError:
 # Try to import other required modules
 try:
     import os
+    import re
     import zipfile
     import json
-    import tempfile
-    import shutil
 except ImportError:
     print("Missing standard library modules. Please check your Python installation.")
 
 # Set up logger
 reports_logger = get_logger("reports")
 
-def detect_encoding(file_path: str) -> str:
+# Candidate encodings after the one detected by chardet
+CSV_ENCODINGS = ['cp1251', 'utf-8', 'windows-1251', 'ascii', 'iso-8859-1']
+# Rows per DataFrame when a report is read in chunks
+CHUNK_ROWS = 50000
+
+def detect_encoding(file_path: str, member: str = None, raw_data: bytes = None) -> str:
     """
-    Определяет кодировку файла
+    Определяет кодировку файла или файла внутри ZIP-архива
+
+    Args:
+        raw_data: Уже прочитанное начало файла (иначе читается до 1MB)
     """
     try:
-        with open(file_path, 'rb') as f:
-            raw_data = f.read(1024*1024)  # Read up to 1MB
-            result = chardet.detect(raw_data)
-            encoding = result['encoding'] or 'utf-8'
-            reports_logger.info(f"Detected encoding: {encoding} (confidence: {result['confidence']})")
-            return encoding
+        if raw_data is None:
+            raw_data = read_report_head(file_path, member)  # Read up to 1MB
+        result = chardet.detect(raw_data)
+        encoding = result['encoding'] or 'utf-8'
+        reports_logger.info(f"Detected encoding: {encoding} (confidence: {result['confidence']})")
+        return encoding
     except Exception as e:
         log_exception(reports_logger, e, f"Error detecting encoding for {file_path}")
         return 'utf-8'  # Default to UTF-8
 
+def detect_csv_format(file_path: str, member: str = None) -> Tuple[List[str], Optional[str]]:
+    """
+    Определяет кодировку и разделитель по началу файла (или файла в ZIP-архиве)
+
+    Returns:
+        (кодировки, которыми декодируется начало файла, лучшая первой; разделитель или None)
+    """
+    head = read_report_head(file_path, member)
+    return sniff_csv_format(head, [detect_encoding(file_path, member, head)] + CSV_ENCODINGS)
+
+def iter_report_chunks(file_path: str, member: str = None, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Читает CSV-файл (или файл в ZIP-архиве) порциями DataFrame за один проход
+
+    Кодировка и разделитель определяются один раз по началу файла. Значения
+    читаются как строки, пустые ячейки - пустые строки. Если дальше в файле
+    встретились байты, которые не декодируются, чтение продолжается со
+    следующей подходящей кодировкой без повтора уже выданных строк.
+
+    Raises:
+        ValueError: если не удалось определить кодировку или разделитель
+        UnicodeDecodeError: если файл не декодируется ни одной кодировкой
+    """
+    pd = _pandas()
+    encodings, separator = detect_csv_format(file_path, member)
+    name = f'{file_path}:{member}' if member else file_path
+    if not encodings or separator is None:
+        raise ValueError(f"Could not detect CSV format of {name}")
+    yielded = 0
+    columns = None
+    for position, encoding in enumerate(encodings):
+        skip = yielded
+        try:
+            with open_report(file_path, member) as stream:
+                for chunk in pd.read_csv(stream, encoding=encoding, sep=separator, chunksize=chunksize,
+                                         dtype=object, keep_default_na=False):
+                    if skip:
+                        # Строки, уже выданные с предыдущей кодировкой
+                        if len(chunk) <= skip:
+                            skip -= len(chunk)
+                            continue
+                        chunk = chunk.iloc[skip:]
+                        skip = 0
+                    if columns is None:
+                        columns = chunk.columns
+                    elif len(chunk.columns) == len(columns):
+                        # Заголовок уже прочитан, столбцы не должны меняться
+                        chunk.columns = columns
+                    yielded += len(chunk)
+                    yield chunk
+            return
+        except UnicodeDecodeError:
+            if position == len(encodings) - 1:
+                raise
+            reports_logger.warning(
+                f"{name} is not {encoding} after row {yielded}, retrying with {encodings[position + 1]}"
+            )
+
+def _group_from_file_name(file_path: str) -> Optional[str]:
+    """Название товарной группы по коду groupN в имени файла"""
+    match = re.search(r'group(\d+)', file_path.lower())
+    if not match:
+        return None
+    from get_violations import PRODUCT_GROUPS
+    group_code = int(match.group(1))
+    return PRODUCT_GROUPS.get(group_code, f"Unknown Group {group_code}")
+
+def _collect_violations(zip_file_path: str, member: str) -> Optional[Dict[str, Any]]:
+    """Статистика по товарным группам и строки нарушений одного CSV-файла архива"""
+    statistics = defaultdict(int)
+    violations = []
+    potential_columns = [
+        'Товарная группа', 'Группа товаров', 'Product Group',
+        'ТГ', 'Товарная_группа', 'Группа_товаров'
+    ]
+    try:
+        for chunk in iter_report_chunks(zip_file_path, member):
+            product_group_col = next((col for col in potential_columns if col in chunk.columns), None)
+            rows = chunk.to_dict('records')
+            
+            if product_group_col:
+                # Count violations by product group
+                groups = chunk[product_group_col]
+                for group, count in groups[groups != ''].value_counts().items():
+                    statistics[group] += int(count)
+                violations.extend(rows)
+                continue
+            
+            if not statistics and not violations:
+                reports_logger.warning(f"Product group column not found in {member}")
+            # Try to infer product group from filename
+            group_name = _group_from_file_name(zip_file_path)
+            if group_name:
+                # Count all rows as this group
+                statistics[group_name] += len(chunk)
+                violations.extend({'Товарная группа': group_name, **row} for row in rows)
+    except Exception as e:
+        log_exception(reports_logger, e, f"Could not read {member} from {zip_file_path}")
+        return None
+    return {"statistics": statistics, "violations": violations}
+
 def process_violations_report(zip_file_path: str) -> None:
     """Обрабатывает ZIP-файл с отчетом о нарушениях и сохраняет результаты в JSON"""
-    extract_dir = "report_" + datetime.now().strftime('%Y%m%d_%H%M%S')
-    os.makedirs(extract_dir, exist_ok=True)
-    
     try:
-        # Распаковываем архив
-        reports_logger.info(f"Extracting {zip_file_path}...")
-        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        # Ищем CSV файл
-        csv_files = [f for f in os.listdir(extract_dir) if f.endswith('.csv')]
+        # CSV-файлы читаются прямо из архива, без распаковки на диск
+        csv_files = zip_csv_members(zip_file_path)
         if not csv_files:
             reports_logger.error(f"No CSV files found in {zip_file_path}")
-            shutil.rmtree(extract_dir)
             return
-        
-        csv_file = os.path.join(extract_dir, csv_files[0])
-        reports_logger.info(f"Found file: {csv_files[0]}")
+        reports_logger.info(f"Found files in {zip_file_path}: {', '.join(csv_files)}")
         
         # Подготавливаем структуру для JSON
         result = {
@@ -82,59 +191,14 @@ def process_violations_report(zip_file_path: str) -> None:
             "violations": []
         }
         
-        # Читаем и анализируем CSV
-        df, encoding, separator = try_read_file_with_encodings(csv_file)
+        # Читаем и анализируем CSV порциями, несколько файлов архива - параллельно
+        parts = [part for part in map_zip_members(zip_file_path, _collect_violations, csv_files) if part]
+        for part in parts:
+            for group, count in part["statistics"].items():
+                result["statistics"][group] += count
+            result["violations"].extend(part["violations"])
         
-        if df is not None:
-            # Count violations by product group
-            product_group_col = None
-            
-            # Try to find product group column
-            potential_columns = [
-                'Товарная группа', 'Группа товаров', 'Product Group',
-                'ТГ', 'Товарная_группа', 'Группа_товаров'
-            ]
-            
-            for col in potential_columns:
-                if col in df.columns:
-                    product_group_col = col
-                    break
-            
-            if product_group_col:
-                # Count violations by product group
-                group_counts = df[product_group_col].value_counts().to_dict()
-                
-                for group, count in group_counts.items():
-                    result["statistics"][group] = int(count)
-                
-                # Add all violations to the result
-                for _, row in df.iterrows():
-                    violation = {}
-                    for col in df.columns:
-                        violation[col] = str(row[col])
-                    result["violations"].append(violation)
-            else:
-                reports_logger.warning(f"Product group column not found in {csv_file}")
-                
-                # Try to infer product group from filename
-                if 'group' in zip_file_path.lower():
-                    import re
-                    match = re.search(r'group(\d+)', zip_file_path.lower())
-                    if match:
-                        group_code = int(match.group(1))
-                        from get_violations import PRODUCT_GROUPS
-                        group_name = PRODUCT_GROUPS.get(group_code, f"Unknown Group {group_code}")
-                        
-                        # Count all rows as this group
-                        result["statistics"][group_name] = len(df)
-                        
-                        # Add all violations to the result
-                        for _, row in df.iterrows():
-                            violation = {'Товарная группа': group_name}
-                            for col in df.columns:
-                                violation[col] = str(row[col])
-                            result["violations"].append(violation)
-            
+        if parts:
             # Save results
             output_dir = os.path.join('reports', 'json')
             os.makedirs(output_dir, exist_ok=True)
@@ -151,125 +215,110 @@ def process_violations_report(zip_file_path: str) -> None:
         
     except Exception as e:
         log_exception(reports_logger, e, f"Error processing violations report: {zip_file_path}")
-    finally:
-        # Clean up
-        if os.path.exists(extract_dir):
-            shutil.rmtree(extract_dir)
 
-def try_read_file_with_encodings(file_path: str) -> tuple[pd.DataFrame, str, str]:
+def try_read_file_with_encodings(file_path: str, member: str = None) -> tuple[pd.DataFrame, str, str]:
     """
-    Пытается прочитать файл с разными кодировками и разделителями
+    Читает файл целиком в DataFrame
+    
+    Кодировка и разделитель определяются один раз по началу файла; другая
+    подходящая кодировка пробуется, только если дальше в файле встретились
+    байты, которые выбранная не декодирует.
     
+    Args:
+        file_path: Путь к CSV-файлу или ZIP-архиву
+        member: Имя CSV-файла внутри архива; он читается потоком, без распаковки
     Returns:
         tuple[DataFrame, encoding, separator]
     """
-    encodings = ['cp1251', 'utf-8', 'windows-1251', 'ascii', 'iso-8859-1']
-    separators = [';', ',', '\t', '|']
+    pd = _pandas()
+    source = f"{file_path}:{member}" if member else file_path
     errors = []
 
-    # Сначала пробуем определить кодировку через chardet
     try:
-        detected_encoding = detect_encoding(file_path)
-        encodings.insert(0, detected_encoding)  # Try the detected encoding first
+        encodings, separator = detect_csv_format(file_path, member)
     except Exception as e:
-        reports_logger.warning(f"Error detecting encoding: {e}")
+        log_exception(reports_logger, e, f"Could not read file {source}")
+        return None, None, None
+    if not encodings or separator is None:
+        reports_logger.error(f"Could not detect encoding and separator of {source}")
+        return None, None, None
 
-    # Пробуем все комбинации кодировок и разделителей
-    for encoding in encodings:
-        for separator in separators:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding, sep=separator, low_memory=False)
-                if len(df.columns) > 1:
-                    reports_logger.info(f"Successfully read file with encoding: {encoding}, separator: {separator}")
-                    return df, encoding, separator
-            except Exception as e:
-                errors.append(f"Encoding: {encoding}, Separator: {separator}, Error: {e}")
-    
-    # Если все попытки не удались, пробуем прочитать как текстовый файл
     for encoding in encodings:
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                lines = f.readlines()
-                
-                if len(lines) > 0:
-                    # Try to determine separator from first line
-                    first_line = lines[0].strip()
-                    for sep in separators:
-                        if sep in first_line:
-                            # Manually create dataframe
-                            data = []
-                            header = first_line.split(sep)
-                            
-                            for line in lines[1:]:
-                                row = line.strip().split(sep)
-                                if len(row) == len(header):
-                                    data.append(row)
-                            
-                            df = pd.DataFrame(data, columns=header)
-                            reports_logger.info(f"Manually parsed file with encoding: {encoding}, separator: {sep}")
-                            return df, encoding, sep
+            with open_report(file_path, member) as stream:
+                df = pd.read_csv(stream, encoding=encoding, sep=separator, low_memory=False)
+            if len(df.columns) > 1:
+                reports_logger.info(f"Successfully read file with encoding: {encoding}, separator: {separator}")
+                return df, encoding, separator
+            errors.append(f"Encoding: {encoding}, Separator: {separator}: single column")
+            break
+        except UnicodeDecodeError as e:
+            errors.append(f"Encoding: {encoding}, Separator: {separator}, Error: {e}")
         except Exception as e:
-            errors.append(f"Manual parsing with encoding {encoding} failed: {e}")
+            errors.append(f"Encoding: {encoding}, Separator: {separator}, Error: {e}")
+            break
+    
+    # Если pandas не разобрал файл, читаем его как текст, пропуская строки с другим числом полей
+    encoding = encodings[0]
+    try:
+        with open_report(file_path, member, encoding) as f:
+            header = f.readline().strip().split(separator)
+            data = []
+            for line in f:
+                row = line.strip().split(separator)
+                if len(row) == len(header):
+                    data.append(row)
+        df = pd.DataFrame(data, columns=header)
+        reports_logger.info(f"Manually parsed file with encoding: {encoding}, separator: {separator}")
+        return df, encoding, separator
+    except Exception as e:
+        errors.append(f"Manual parsing with encoding {encoding} failed: {e}")
 
-    reports_logger.error(f"Could not read file {file_path}. Tried combinations:\n" + "\n".join(errors))
+    reports_logger.error(f"Could not read file {source}. Tried:\n" + "\n".join(errors))
     return None, None, None
 
+def _read_records(file_path: str, member: str = None) -> Optional[List[Dict[str, Any]]]:
+    """Строки CSV-файла (или файла в ZIP-архиве) как словари, пустые значения - пустые строки"""
+    records = []
+    try:
+        for chunk in iter_report_chunks(file_path, member):
+            records.extend(chunk.to_dict('records'))
+    except Exception as e:
+        log_exception(reports_logger, e, f"Could not read file: {f'{file_path}:{member}' if member else file_path}")
+        return None
+    return records
+
 def process_reports(input_path: str) -> list:
     """
     Process CSV file and return list of dictionaries
     
+    The file is parsed in chunks in a single pass. CSV files inside a ZIP
+    archive are streamed from the archive without extracting them; several
+    files are read in parallel.
+    
     Args:
-        input_path: Path to input CSV file
+        input_path: Path to input CSV file or ZIP archive
     Returns:
         List of dictionaries containing the processed data
     """
-    temp_dir = None
     try:
-        # Check if input is a ZIP file
-        if input_path.lower().endswith('.zip'):
-            # Create temp directory
-            temp_dir = tempfile.mkdtemp()
-            
-            # Extract ZIP
-            with zipfile.ZipFile(input_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Find CSV file
-            csv_files = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if f.lower().endswith('.csv')]
-            
-            if not csv_files:
-                reports_logger.error(f"No CSV files found in ZIP: {input_path}")
-                return []
-            
-            input_path = csv_files[0]
-        
-        # Process CSV file
-        df, encoding, separator = try_read_file_with_encodings(input_path)
-        
-        if df is None:
-            reports_logger.error(f"Could not read file: {input_path}")
-            return []
-        
-        # Convert to list of dictionaries
-        records = df.to_dict('records')
-        
-        # Clean up any NaN values
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = ""
+        with span("parse_report", file=os.path.basename(input_path)):
+            if zipfile.is_zipfile(input_path):
+                members = zip_csv_members(input_path)
+                if not members:
+                    reports_logger.error(f"No CSV files found in ZIP: {input_path}")
+                    return []
+                parts = map_zip_members(input_path, _read_records, members)
+            else:
+                parts = [_read_records(input_path)]
         
+        records = [record for part in parts if part for record in part]
         reports_logger.info(f"Processed {len(records)} records from {input_path}")
         return records
     
     except Exception as e:
         log_exception(reports_logger, e, f"Error processing file: {input_path}")
         return []
-    
-    finally:
-        # Clean up temp directory
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
 
 def process_multiple_reports(input_files: List[str], output_dir: str = None) -> Dict[str, Any]:
     """
@@ -3,12 +3,11 @@ Region Management Module
 
 This module provides functionality for managing regions and their TC assignments.
 """
-import os
-import json
 import colorama
 from colorama import Fore, Style
 from typing import Dict, List, Any
 from logger_config import get_logger, log_exception
+from config_store import get_config_store, save_json, get_tc_region_map, REGIONS_FILE
 
 # Initialize colorama
 colorama.init(autoreset=True)
@@ -20,18 +19,18 @@ def load_regions_data() -> Dict[str, Any]:
     """
     Load regions data from regions.json
     
+    The file is parsed only when it changes; every call returns a private
+    copy that the caller may modify.
+    
     Returns:
         Dictionary with region data
     """
     try:
-        if not os.path.exists('regions.json'):
-            region_logger.warning("Regions file not found: regions.json")
+        store = get_config_store()
+        if not store.exists(REGIONS_FILE):
+            region_logger.warning(f"Regions file not found: {REGIONS_FILE}")
             return {}
-            
-        with open('regions.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            region_logger.info(f"Loaded {len(data)} regions from regions.json")
-            return data
+        return store.load(REGIONS_FILE, {})
     except Exception as e:
         log_exception(region_logger, e, "Error loading regions data")
         return {}
@@ -47,10 +46,8 @@ def save_regions_data(regions_data: Dict[str, Any]) -> bool:
         True if saved successfully, False otherwise
     """
     try:
-        with open('regions.json', 'w', encoding='utf-8') as f:
-            json.dump(regions_data, f, indent=2, ensure_ascii=False)
-        
-        region_logger.info(f"Saved {len(regions_data)} regions to regions.json")
+        save_json(REGIONS_FILE, regions_data)
+        region_logger.info(f"Saved {len(regions_data)} regions to {REGIONS_FILE}")
         return True
     except Exception as e:
         log_exception(region_logger, e, "Error saving regions data")
@@ -66,14 +63,7 @@ def get_tc_region(tc_name: str) -> str:
     Returns:
         Region identifier or 'Undefined' if not found
     """
-    regions_data = load_regions_data()
-    
-    for region_id, region_data in regions_data.items():
-        tc_list = region_data.get('tc_list', [])
-        if tc_name in tc_list:
-            return region_id
-    
-    return "Undefined"
+    return get_tc_region_map().get(tc_name, "Undefined")
 
 def add_region(region_id: str, region_name: str, emails: List[str] = None) -> bool:
     """
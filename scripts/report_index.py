@@ -0,0 +1,234 @@
+"""
+Report Index Module
+
+This module provides a catalogue of the daily violation reports stored as
+output/<certificate>/violations_<date>.json. The catalogue is built with a
+single pass over the output directory, indexes reports by date, certificate
+and region, and is kept up to date incrementally: only certificate
+directories whose modification time changed are rescanned, and report
+contents are cached until the file changes.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional
+from logger_config import get_logger, log_exception
+
+# Set up logger
+reports_logger = get_logger("reports")
+
+UNDEFINED_REGION = "Undefined"
+
+class ReportIndex:
+    """Catalogue of violations_<date>.json reports by date, certificate and region"""
+
+    def __init__(self, base_dir: str = 'output'):
+        self.base_dir = os.path.abspath(base_dir)
+        self._lock = threading.RLock()
+        self._dir_mtimes: Dict[str, int] = {}
+        self._by_cert: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._by_date: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._data_cache: Dict[str, tuple] = {}
+        self._cert_to_region: Dict[str, str] = {}
+
+    def refresh(self) -> bool:
+        """
+        Bring the index up to date with the output directory
+
+        Returns:
+            bool: True if any report was added or removed
+        """
+        with self._lock:
+            if not os.path.isdir(self.base_dir):
+                changed = bool(self._by_cert)
+                self._clear()
+                return changed
+
+            changed = False
+            seen = set()
+
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    seen.add(entry.name)
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    if self._dir_mtimes.get(entry.name) != mtime:
+                        self._scan_certificate(entry.name, entry.path)
+                        self._dir_mtimes[entry.name] = mtime
+                        changed = True
+
+            for cert_name in set(self._dir_mtimes) - seen:
+                self._drop_certificate(cert_name)
+                changed = True
+
+            return changed
+
+    def _clear(self) -> None:
+        self._dir_mtimes.clear()
+        self._by_cert.clear()
+        self._by_date.clear()
+        self._data_cache.clear()
+
+    def _scan_certificate(self, cert_name: str, cert_path: str) -> None:
+        """Rebuild index entries of one certificate directory"""
+        self._drop_certificate(cert_name)
+
+        reports = {}
+        try:
+            with os.scandir(cert_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not (name.startswith('violations_') and name.endswith('.json')) or not entry.is_file():
+                        continue
+                    date = name[len('violations_'):-len('.json')]
+                    reports[date] = {
+                        'certificate': cert_name,
+                        'date': date,
+                        'filename': name,
+                        'path': entry.path,
+                    }
+        except OSError as e:
+            log_exception(reports_logger, e, f"Error scanning report directory {cert_path}")
+
+        self._by_cert[cert_name] = reports
+        for date, report in reports.items():
+            self._by_date.setdefault(date, {})[cert_name] = report
+
+    def _drop_certificate(self, cert_name: str) -> None:
+        self._dir_mtimes.pop(cert_name, None)
+        for date, report in self._by_cert.pop(cert_name, {}).items():
+            self._data_cache.pop(report['path'], None)
+            certs = self._by_date.get(date)
+            if certs is not None:
+                certs.pop(cert_name, None)
+                if not certs:
+                    del self._by_date[date]
+
+    # -------------------- Queries --------------------
+
+    def count(self) -> int:
+        """Total number of reports"""
+        with self._lock:
+            return sum(len(reports) for reports in self._by_cert.values())
+
+    def dates(self) -> List[str]:
+        """Report dates, newest first"""
+        with self._lock:
+            return sorted(self._by_date, reverse=True)
+
+    def certificates(self) -> List[str]:
+        """Certificates that have at least one report"""
+        with self._lock:
+            return sorted(cert for cert, reports in self._by_cert.items() if reports)
+
+    def all_reports(self) -> List[Dict[str, Any]]:
+        """All reports sorted by certificate and date"""
+        with self._lock:
+            return [
+                report
+                for cert in sorted(self._by_cert)
+                for _, report in sorted(self._by_cert[cert].items())
+            ]
+
+    def reports_for_date(self, date: str) -> List[Dict[str, Any]]:
+        """Reports of all certificates for the given date"""
+        with self._lock:
+            certs = self._by_date.get(date, {})
+            return [certs[cert] for cert in sorted(certs)]
+
+    def reports_for_cert(self, cert_name: str) -> List[Dict[str, Any]]:
+        """Reports of one certificate sorted by date"""
+        with self._lock:
+            return [report for _, report in sorted(self._by_cert.get(cert_name, {}).items())]
+
+    def set_regions(self, regions_data: Dict[str, Any]) -> None:
+        """Update the certificate to region mapping from regions.json data"""
+        mapping = {}
+        for region, region_data in (regions_data or {}).items():
+            if isinstance(region_data, dict):
+                for tc in region_data.get('tc_list', []):
+                    mapping[tc] = region
+        with self._lock:
+            self._cert_to_region = mapping
+
+    def region_for_cert(self, cert_name: str) -> str:
+        """Region of a certificate, or 'Undefined' if it is not assigned"""
+        return self._cert_to_region.get(cert_name, UNDEFINED_REGION)
+
+    def reports_by_region(self, date: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Reports for the given date grouped by region"""
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for report in self.reports_for_date(date):
+            grouped.setdefault(self.region_for_cert(report['certificate']), []).append(report)
+        return grouped
+
+    def load(self, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Load report contents, reusing the cached copy while the file is unchanged
+
+        Returns:
+            Parsed report data or None if it could not be read
+        """
+        path = report['path']
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            log_exception(reports_logger, e, f"Report file is not accessible: {path}")
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._data_cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            log_exception(reports_logger, e, f"Error loading report {path}")
+            return None
+
+        self._data_cache[path] = (key, data)
+        return data
+
+    def total_violations(self, report: Dict[str, Any]) -> int:
+        """Sum of violation counts in a report"""
+        data = self.load(report) or {}
+        violations = data.get('violations', {})
+        total = 0
+        if isinstance(violations, dict):
+            for count in violations.values():
+                try:
+                    total += int(count)
+                except (ValueError, TypeError):
+                    continue
+        return total
+
+_indexes: Dict[str, ReportIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_report_index(base_dir: str = 'output', refresh: bool = True) -> ReportIndex:
+    """
+    Get the shared report index for a directory
+
+    Args:
+        base_dir: Base output directory
+        refresh: Bring the index up to date before returning it
+
+    Returns:
+        ReportIndex instance
+    """
+    path = os.path.abspath(base_dir)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = ReportIndex(path)
+            _indexes[path] = index
+    if refresh:
+        index.refresh()
+    return index
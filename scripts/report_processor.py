@@ -3,12 +3,14 @@ import json
 import sys
 import re  # Add missing import for regular expressions
 import csv  # Add import for CSV handling
-import pandas as pd  # Add pandas for Excel processing
 from datetime import datetime
 from logger_config import get_logger, log_exception
 from token_utils import load_regions_mapping, get_tc_to_region_mapping, group_violations_by_region
 from send_daily_report import process_and_send_reports, load_email_config  # Fix import error - use the correct function name
 from get_violations import PRODUCT_GROUPS  # Import PRODUCT_GROUPS dictionary
+from tracing import span
+from metrics import ROWS_COUNTED
+from xlsx_utils import count_xlsx_rows
 
 # Set up logger
 reports_logger = get_logger("reports")
@@ -136,15 +138,16 @@ def process_reports_for_token(cert_name: str, email_config: dict = None):
             
             # Read count based on file type
             ext = os.path.splitext(report_file)[1].lower()
-            if ext in ['.xlsx', '.xls']:
-                try:
-                    df = pd.read_excel(input_path, engine='openpyxl')
-                    violation_count = len(df)
-                except Exception as e:
-                    reports_logger.error(f"Error reading Excel file {report_file}: {e}")
-                    violation_count = 0
-            else:
-                violation_count = read_csv_with_encoding(input_path)
+            with span("count_rows", cert=cert_name, group=group_code, file=report_file):
+                if ext in ['.xlsx', '.xls']:
+                    try:
+                        violation_count = count_xlsx_rows(input_path)
+                    except Exception as e:
+                        reports_logger.error(f"Error reading Excel file {report_file}: {e}")
+                        violation_count = 0
+                else:
+                    violation_count = read_csv_with_encoding(input_path)
+            ROWS_COUNTED.inc(violation_count, group=group_code)
             
             violations_data['violations'][product_name] = violation_count
             reports_logger.info(f"Found {violation_count} violations for {product_name}")
@@ -0,0 +1,176 @@
+"""
+Report Templates Module
+
+This module provides the HTML templates used for violation report emails.
+Templates are compiled once at import time, tables are rendered with a single
+list join, and per-certificate tables are cached so a certificate whose data
+did not change is rendered only once for both the regional and the
+per-certificate emails.
+"""
+
+import time
+from functools import lru_cache
+from html import escape
+from string import Template
+from typing import Dict, Tuple
+
+TABLE_TEMPLATE = Template("""<table border="1" style="border-collapse: collapse; width: 100%; margin-bottom:20px;">
+    <tr style="background-color: #f2f2f2;">
+        <th style="padding: 8px;">Товарная группа</th>
+        <th style="padding: 8px;">Количество нарушений</th>
+    </tr>
+$rows
+    <tr style="background-color: #f2f2f2; font-weight: bold;">
+        <td style="padding: 8px;">Всего нарушений:</td>
+        <td style="padding: 8px; text-align: center;">$total</td>
+    </tr>
+</table>""")
+
+ROW_TEMPLATE = Template("""    <tr>
+        <td style="padding: 8px;">$group</td>
+        <td style="padding: 8px; text-align: center;">$count</td>
+    </tr>""")
+
+REGIONAL_SECTION_TEMPLATE = Template("""<h4>Торговая точка: $cert_name</h4>
+$table
+<br/>""")
+
+REGIONAL_REPORT_TEMPLATE = Template("""<h2>Отчет о нарушениях маркировки по региону $region_name</h2>
+<h3>Дата: $date (данные за вчерашний день)</h3>
+$sections""")
+
+CERT_REPORT_TEMPLATE = Template("""<h2>Отчет о нарушениях маркировки за $date</h2>
+<h3>Сертификат: $cert_name</h3>
+$table""")
+
+def _to_int(value) -> int:
+    """Convert a violation count to int, treating bad values as zero"""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+@lru_cache(maxsize=2048)
+def _render_table(items: Tuple[Tuple[str, object], ...]) -> str:
+    """Render a violations table for a frozen list of (group, count) pairs"""
+    ordered = sorted(items, key=lambda item: _to_int(item[1]), reverse=True)
+    rows = "\n".join(
+        ROW_TEMPLATE.substitute(group=escape(str(group)), count=escape(str(count)))
+        for group, count in ordered
+    )
+    total = sum(_to_int(count) for _, count in items)
+    return TABLE_TEMPLATE.substitute(rows=rows, total=total)
+
+def render_violations_table(violations: Dict[str, object]) -> str:
+    """
+    Render the table of violations by product group
+
+    Args:
+        violations: Dictionary mapping product group name to violation count
+
+    Returns:
+        HTML table, rows sorted by count in descending order
+    """
+    return _render_table(tuple(violations.items()))
+
+def render_regional_report(region_name: str, date: str, cert_reports: Dict[str, Dict[str, object]]) -> str:
+    """
+    Render the regional email body with one table per certificate
+
+    Args:
+        region_name: Display name of the region
+        date: Report date
+        cert_reports: Dictionary mapping certificate name to its violations
+
+    Returns:
+        HTML document body
+    """
+    sections = "\n".join(
+        REGIONAL_SECTION_TEMPLATE.substitute(
+            cert_name=escape(cert_name),
+            table=render_violations_table(violations)
+        )
+        for cert_name, violations in cert_reports.items()
+    )
+    return REGIONAL_REPORT_TEMPLATE.substitute(
+        region_name=escape(region_name),
+        date=escape(date),
+        sections=sections
+    )
+
+def render_cert_report(cert_name: str, violations_data: Dict) -> str:
+    """
+    Render the email body for a single certificate
+
+    Args:
+        cert_name: Certificate name/ID
+        violations_data: Report data with 'date' and 'violations' keys
+
+    Returns:
+        HTML document body
+    """
+    return CERT_REPORT_TEMPLATE.substitute(
+        date=escape(str(violations_data['date'])),
+        cert_name=escape(cert_name),
+        table=render_violations_table(violations_data.get('violations', {}))
+    )
+
+def regional_report_subject(region_name: str, date: str) -> str:
+    """Subject line for a regional report email"""
+    return f"Отчет о нарушениях маркировки - Регион {region_name} - {date}"
+
+def cert_report_subject(cert_name: str, date: str) -> str:
+    """Subject line for a single certificate report email"""
+    return f"Отчет о нарушениях маркировки - {cert_name} - {date}"
+
+def benchmark_rendering(num_certs: int = 500, num_groups: int = 40, num_regions: int = 20) -> Dict[str, float]:
+    """
+    Measure rendering time for a synthetic set of certificates
+
+    Every certificate is rendered twice, once inside its regional email and
+    once on its own, which is how the daily pipeline uses the templates.
+
+    Returns:
+        Dictionary with timings in milliseconds
+    """
+    cert_reports = {
+        f"ТС {cert:04d} - тс{cert % 100:02d}": {
+            f"Товарная группа {group}": (cert * 31 + group * 17 + cert * group) % 997
+            for group in range(1, num_groups + 1)
+        }
+        for cert in range(num_certs)
+    }
+    regions = {}
+    for index, (cert_name, violations) in enumerate(cert_reports.items()):
+        regions.setdefault(f"Регион {index % num_regions}", {})[cert_name] = violations
+
+    _render_table.cache_clear()
+
+    start = time.perf_counter()
+    for region_name, reports in regions.items():
+        render_regional_report(region_name, "2025-01-01", reports)
+    regional_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for cert_name, violations in cert_reports.items():
+        render_cert_report(cert_name, {'date': "2025-01-01", 'violations': violations})
+    cert_ms = (time.perf_counter() - start) * 1000
+
+    _render_table.cache_clear()
+    start = time.perf_counter()
+    for cert_name, violations in cert_reports.items():
+        render_cert_report(cert_name, {'date': "2025-01-01", 'violations': violations})
+    uncached_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'certificates': num_certs,
+        'groups': num_groups,
+        'regional_ms': round(regional_ms, 2),
+        'per_cert_cached_ms': round(cert_ms, 2),
+        'per_cert_uncached_ms': round(uncached_ms, 2),
+    }
+
+if __name__ == "__main__":
+    # If run directly, benchmark rendering for a few certificate counts
+    for count in (100, 500, 1000):
+        print(benchmark_rendering(num_certs=count))
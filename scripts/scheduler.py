@@ -2,32 +2,115 @@ import os
 import sys
 import time
 import json
+import secrets
 import subprocess
 import signal
-import atexit
 from datetime import datetime, timedelta
+import heapq
+import importlib
 import threading
-from typing import Optional, List, Dict, Any  # Add Optional import
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from typing import Optional, List, Dict, Any, Tuple  # Add Optional import
 from logger_config import get_logger, log_exception
+from config_store import get_config_store, load_json, save_json, EMAIL_CONFIG_FILE
+from cron_schedule import CronSchedule
+from scheduler_control import PID_FILE, PidLock, ControlServer, read_pid_info
+from metrics import JOB_RUNS, JOB_LAST_SUCCESS, JOB_LAST_DURATION
 
 # Set up logger
 scheduler_logger = get_logger("scheduler")
 
+SCHEDULER_STATE_FILE = "scheduler_state.json"
+
+# Longest single sleep; the scheduler also wakes up this often to pick up
+# configuration changes and to notice wall-clock jumps (e.g. after hibernation)
+MAX_SLEEP_SECONDS = 300
+
+# Missed runs older than this are skipped instead of being caught up
+DEFAULT_CATCH_UP_HOURS = 24
+
+# Job name -> (config key with its schedule, method name)
+JOBS = {
+    "token_refresh": ("token_refresh_time", "refresh_tokens"),
+    "daily_report": ("daily_report_time", "run_daily_report"),
+    "email_reports": ("email_time", "send_email_reports"),
+}
+
+# A job waits for these jobs to finish if they are running when it starts
+JOB_DEPENDENCIES = {
+    "daily_report": ("token_refresh",),
+    "email_reports": ("daily_report",),
+}
+
+# Order in which jobs due at the same time are started
+JOB_ORDER = ["token_refresh", "daily_report", "email_reports"]
+
+DEFAULT_MAX_WORKERS = 3
+
+# After the timeout the job's cancel event is set; jobs stop at the next step
+DEFAULT_JOB_TIMEOUT_MINUTES = {
+    "token_refresh": 30,
+    "daily_report": 360,
+    "email_reports": 60,
+}
+
+# Number of runs kept in the history of every job
+JOB_HISTORY_SIZE = 20
+
+# Modules imported once when the daemon starts, so jobs do not pay for
+# importing pandas, the report pipeline and the mail code on every run
+PRELOAD_MODULES = [
+    "main",
+    "send_daily_report",
+    "get_tokens",
+    "email_outbox",
+    "report_templates",
+    "report_index",
+    "xlsx_utils",
+    "http_session",
+]
+
 class Scheduler:
     """
-    A simple scheduler to run tasks at specific times.
-    Provides functionality to run tasks in background.
+    Scheduler running tasks at the times set in scheduler_config.json.
+
+    Next fire times are kept in a heap and the scheduler sleeps until the
+    earliest of them. Every fire is recorded in scheduler_state.json before
+    the task starts, so a run is never repeated after a restart, and runs
+    missed while the process was down are caught up once on startup.
+
+    Jobs run in a thread pool. A job never runs twice at the same time (a
+    fire during a run is deferred until the run ends), waits for the jobs it
+    depends on, and is asked to stop through its cancel event when it
+    exceeds its timeout.
     """
-    def __init__(self, config_file="scheduler_config.json"):
+    def __init__(self, config_file="scheduler_config.json", state_file=SCHEDULER_STATE_FILE):
         self.config_file = config_file
+        self.state_file = state_file
         self.load_config()
         self.running = False
         self.thread = None
+        self._wakeup = threading.Event()
+        self._queue_lock = threading.RLock()
+        self._queue: List[Tuple[datetime, str]] = []
+        self._schedules: Dict[str, CronSchedule] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs_lock = threading.RLock()
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._deferred: Dict[str, datetime] = {}
+        self._state_lock = threading.Lock()
+        state = self._load_state()
+        self._history: Dict[str, deque] = {
+            name: deque(state.get(name, {}).get("history", []), maxlen=JOB_HISTORY_SIZE)
+            for name in JOBS
+        }
+        self._seed_job_metrics()
         scheduler_logger.info("Scheduler initialized")
     
     def is_running(self) -> bool:
         """Lightweight check whether scheduler background thread/process is running.
-        Returns True if a background thread is active or a process is detected by check_if_running()."""
+        Returns True if a background thread is active or the daemon holds the PID file lock."""
         try:
             # Thread mode
             if getattr(self, 'thread', None) and self.thread.is_alive():
@@ -38,33 +121,34 @@ class Scheduler:
         except Exception:
             return False
     
-    def load_config(self):
+    def load_config(self, quiet=False):
         """Load scheduler configuration"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    self.config = json.load(f)
+            if get_config_store().exists(self.config_file):
+                self.config = load_json(self.config_file)
+                if not quiet:
                     scheduler_logger.info(f"Loaded configuration from {self.config_file}")
             else:
                 # Default configuration
                 self.config = {
                     "daily_report_time": "04:00",  # Run at 4 AM by default
-                    "check_interval": 60,          # Check every minute
                     "token_refresh_time": "03:00", # Refresh tokens at 3 AM
                     "enabled": True,
-                    "email_time": "20:04"         # Send email reports at 8:04 PM
+                    "email_time": "20:04",         # Send email reports at 8:04 PM
+                    "catch_up_hours": DEFAULT_CATCH_UP_HOURS,  # Catch up runs missed within a day
+                    "max_workers": DEFAULT_MAX_WORKERS,
+                    "job_timeout_minutes": dict(DEFAULT_JOB_TIMEOUT_MINUTES)
                 }
                 # Save default config
-                with open(self.config_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.config, f, indent=2, ensure_ascii=False)
+                save_json(self.config_file, self.config)
                 scheduler_logger.info(f"Created default configuration in {self.config_file}")
                 
             # Load email config time if available
             try:
-                with open("email_config.json", 'r', encoding='utf-8') as f:
-                    email_config = json.load(f)
-                    if "send_time" in email_config:
-                        self.config["email_time"] = email_config["send_time"]
+                email_config = load_json(EMAIL_CONFIG_FILE, {})
+                if "send_time" in email_config:
+                    self.config["email_time"] = email_config["send_time"]
+                    if not quiet:
                         scheduler_logger.info(f"Using email time from email_config.json: {self.config['email_time']}")
             except Exception as e:
                 scheduler_logger.warning(f"Couldn't read email time from email_config.json: {e}")
@@ -74,49 +158,29 @@ class Scheduler:
             # Set defaults in case of error
             self.config = {
                 "daily_report_time": "04:00",
-                "check_interval": 60,
                 "token_refresh_time": "03:00",
                 "enabled": True,
-                "email_time": "20:04"  # Default email time
+                "email_time": "20:04",  # Default email time
+                "catch_up_hours": DEFAULT_CATCH_UP_HOURS,
+                "max_workers": DEFAULT_MAX_WORKERS,
+                "job_timeout_minutes": dict(DEFAULT_JOB_TIMEOUT_MINUTES)
             }
     
     def save_config(self):
         """Save scheduler configuration"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            save_json(self.config_file, self.config)
             scheduler_logger.info(f"Configuration saved to {self.config_file}")
         except Exception as e:
             log_exception(scheduler_logger, e, "Error saving scheduler configuration")
     
-    def is_time_to_run(self, task_time):
-        """Check if it's time to run a scheduled task"""
-        now = datetime.now()
-        
-        # Parse task time (HH:MM)
-        try:
-            hour, minute = map(int, task_time.split(':'))
-            task_datetime = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            
-            # If the task time has already passed today, it's not time yet
-            if now.hour > hour or (now.hour == hour and now.minute > minute + 2):
-                return False
-                
-            # Check if current time is within 2 minute window
-            time_diff = (now - task_datetime).total_seconds()
-            return 0 <= time_diff <= 120
-            
-        except Exception as e:
-            log_exception(scheduler_logger, e, f"Error parsing task time: {task_time}")
-            return False
-    
-    def run_daily_report(self):
+    def run_daily_report(self, cancel_event=None) -> bool:
         """Run the daily report processing"""
         scheduler_logger.info("Running daily report task")
         try:
             # Import and run the daily process function from main.py
             from main import run_daily_process
-            result = run_daily_process()
+            result = run_daily_process(cancel_event=cancel_event)
             
             # Log the result
             if result:
@@ -138,6 +202,7 @@ class Scheduler:
                 
             # Update last run time
             self.update_last_run_time()
+            return bool(result)
             
         except Exception as e:
             log_exception(scheduler_logger, e, "Error running daily report task")
@@ -147,8 +212,9 @@ class Scheduler:
                 send_telegram_notification(f"❌ Ошибка при выполнении ежедневной обработки: {str(e)}")
             except Exception:
                 pass
+            return False
     
-    def send_email_reports(self):
+    def send_email_reports(self, cancel_event=None) -> bool:
         """Send daily email reports"""
         scheduler_logger.info("Running email reports task")
         try:
@@ -176,9 +242,11 @@ class Scheduler:
                 
             # Update last email run time
             self.update_last_email_run_time()
+            return bool(result)
             
         except ImportError:
             scheduler_logger.error("Could not import process_and_send_reports function")
+            return False
         except Exception as e:
             log_exception(scheduler_logger, e, "Error sending email reports")
             # Send error notification via Telegram
@@ -187,23 +255,26 @@ class Scheduler:
                 send_telegram_notification(f"❌ Ошибка при отправке отчетов по электронной почте: {str(e)}")
             except Exception:
                 pass
+            return False
     
-    def refresh_tokens(self):
+    def refresh_tokens(self, cancel_event=None) -> bool:
         """Refresh API tokens"""
         scheduler_logger.info("Running token refresh task")
         try:
             # Import and run the token refresh function
             from get_tokens import get_tokens
-            tokens = get_tokens()
+            tokens = get_tokens(cancel_event=cancel_event)
             
             # Log the result
             if tokens:
                 scheduler_logger.info(f"Successfully refreshed {len(tokens)} tokens")
-            else:
-                scheduler_logger.error("Failed to refresh tokens")
+                return True
+            scheduler_logger.error("Failed to refresh tokens")
+            return False
                 
         except Exception as e:
             log_exception(scheduler_logger, e, "Error refreshing tokens")
+            return False
     
     def update_last_run_time(self):
         """Update the last run time in the status file"""
@@ -212,12 +283,7 @@ class Scheduler:
                 "last_run": datetime.now().isoformat(),
                 "data_date": (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
                 "scheduler_run": True,
-                "next_scheduled_run": (datetime.now() + timedelta(days=1)).replace(
-                    hour=int(self.config["daily_report_time"].split(':')[0]),
-                    minute=int(self.config["daily_report_time"].split(':')[1]),
-                    second=0,
-                    microsecond=0
-                ).isoformat()
+                "next_scheduled_run": self.next_run_times().get("daily_report")
             }
             
             with open('last_run.json', 'w', encoding='utf-8') as f:
@@ -244,35 +310,342 @@ class Scheduler:
         except Exception as e:
             log_exception(scheduler_logger, e, "Error updating last email run time")
     
-    def check_and_run_tasks(self):
-        """Check scheduled tasks and run them if it's time"""
-        # Check for daily report
-        if self.is_time_to_run(self.config["daily_report_time"]):
-            scheduler_logger.info(f"It's time to run daily report ({self.config['daily_report_time']})")
-            self.run_daily_report()
-        
-        # Check for token refresh
-        if self.is_time_to_run(self.config["token_refresh_time"]):
-            scheduler_logger.info(f"It's time to refresh tokens ({self.config['token_refresh_time']})")
-            self.refresh_tokens()
-        
-        # Check for email reports
-        if self.is_time_to_run(self.config["email_time"]):
-            scheduler_logger.info(f"It's time to send email reports ({self.config['email_time']})")
-            self.send_email_reports()
-    
+    # -------------------- Schedule --------------------
+
+    def _job_expressions(self) -> Dict[str, str]:
+        """Schedule expression of every job from the current configuration"""
+        return {
+            name: str(self.config.get(config_key, ""))
+            for name, (config_key, _) in JOBS.items()
+            if self.config.get(config_key)
+        }
+
+    def _load_state(self) -> Dict[str, Dict[str, str]]:
+        """Load the last fire times of the jobs"""
+        try:
+            return load_json(self.state_file, {})
+        except Exception as e:
+            log_exception(scheduler_logger, e, f"Error loading {self.state_file}")
+            return {}
+
+    def _update_state(self, name: str, values: Dict[str, Any]) -> None:
+        """Merge values into the saved state of a job"""
+        try:
+            with self._state_lock:
+                state = self._load_state()
+                state.setdefault(name, {}).update(values)
+                save_json(self.state_file, state)
+        except Exception as e:
+            log_exception(scheduler_logger, e, f"Error saving {self.state_file}")
+
+    def _record_fire(self, name: str, fire_time: datetime) -> None:
+        """Remember that a job fired for the given deadline"""
+        self._update_state(name, {"last_fire": fire_time.isoformat()})
+
+    def _record_run(self, name: str, entry: Dict[str, Any]) -> None:
+        """Add a finished run to the job history"""
+        with self._jobs_lock:
+            history = self._history.setdefault(name, deque(maxlen=JOB_HISTORY_SIZE))
+            history.append(entry)
+            snapshot = list(history)
+        self._update_state(name, {"history": snapshot})
+
+    def _seed_job_metrics(self) -> None:
+        """Set the last-success gauges from the persisted history, so they survive restarts"""
+        for name, history in self._history.items():
+            for entry in reversed(history):
+                if entry.get("status") == "success" and entry.get("finished"):
+                    try:
+                        JOB_LAST_SUCCESS.set(datetime.fromisoformat(entry["finished"]).timestamp(), job=name)
+                    except ValueError:
+                        pass
+                    break
+
+    def _first_fire_time(self, name: str, schedule: CronSchedule, last_fire: Optional[datetime],
+                         now: datetime) -> datetime:
+        """
+        Get the first deadline of a job when the schedule is (re)built
+
+        If the job missed one or more runs since its last fire, the latest
+        missed run is returned (a past deadline fires immediately); older
+        missed runs are coalesced into it.
+        """
+        if last_fire is not None and last_fire < now:
+            missed = schedule.last_before(now, last_fire)
+            if missed is not None:
+                catch_up_hours = self.config.get("catch_up_hours", DEFAULT_CATCH_UP_HOURS)
+                if now - missed <= timedelta(hours=catch_up_hours):
+                    scheduler_logger.warning(f"Job {name} missed its run at {missed}, catching up")
+                    return missed
+                scheduler_logger.warning(
+                    f"Job {name} missed its run at {missed}, older than {catch_up_hours} h, skipping"
+                )
+        return schedule.next_after(now)
+
+    def _rebuild_queue(self, now: Optional[datetime] = None) -> None:
+        """Build the heap of next fire times from the configuration and saved state"""
+        now = now or datetime.now()
+        state = self._load_state()
+        schedules = {}
+        queue = []
+
+        for name, expression in self._job_expressions().items():
+            try:
+                schedule = CronSchedule(expression)
+            except ValueError as e:
+                scheduler_logger.error(f"Invalid schedule for {name}: {e}")
+                continue
+
+            last_fire = None
+            try:
+                if state.get(name, {}).get("last_fire"):
+                    last_fire = datetime.fromisoformat(state[name]["last_fire"])
+            except (ValueError, TypeError, AttributeError):
+                scheduler_logger.warning(f"Invalid saved fire time for {name}, ignoring it")
+
+            schedules[name] = schedule
+            queue.append((self._first_fire_time(name, schedule, last_fire, now), name))
+
+        heapq.heapify(queue)
+        with self._queue_lock:
+            self._schedules = schedules
+            self._queue = queue
+
+        for fire_time, name in sorted(queue):
+            scheduler_logger.info(f"Next run of {name} ({schedules[name].expression}): {fire_time}")
+
+    def _reload_if_changed(self) -> None:
+        """Rebuild the schedule if the configured times changed"""
+        previous = self._job_expressions()
+        self.load_config(quiet=True)
+        if self._job_expressions() != previous:
+            scheduler_logger.info("Schedule configuration changed, rebuilding")
+            self._rebuild_queue()
+
+    def next_run_times(self) -> Dict[str, str]:
+        """
+        Get the next fire time of every scheduled job
+
+        Returns:
+            Dictionary mapping job name to ISO formatted fire time
+        """
+        with self._queue_lock:
+            return {name: fire_time.isoformat() for fire_time, name in sorted(self._queue)}
+
+    def _pop_due(self, now: datetime) -> Optional[Tuple[datetime, str]]:
+        """Take the earliest job whose deadline passed and schedule its next run"""
+        with self._queue_lock:
+            if not self._queue or self._queue[0][0] > now:
+                return None
+            fire_time, name = heapq.heappop(self._queue)
+            schedule = self._schedules[name]
+            # Slots missed while the scheduler was busy are coalesced into one
+            # run that fires right away, they are not dropped
+            heapq.heappush(self._queue, (schedule.next_after(max(fire_time, now)), name))
+            return fire_time, name
+
+    # -------------------- Job execution --------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._jobs_lock:
+            if self._executor is None:
+                workers = max(int(self.config.get("max_workers", DEFAULT_MAX_WORKERS)), 1)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler-job")
+            return self._executor
+
+    def _job_timeout(self, name: str) -> Optional[float]:
+        """Timeout of a job in seconds, None if it is disabled"""
+        timeouts = self.config.get("job_timeout_minutes") or {}
+        minutes = timeouts.get(name, DEFAULT_JOB_TIMEOUT_MINUTES.get(name))
+        try:
+            return float(minutes) * 60 if minutes else None
+        except (TypeError, ValueError):
+            scheduler_logger.warning(f"Invalid timeout for {name}: {minutes}")
+            return None
+
+    def submit_job(self, name: str, fire_time: Optional[datetime] = None) -> bool:
+        """
+        Start a job in the worker pool
+
+        If the job is already running, the new run is deferred until the
+        current one finishes (several deferred runs are merged into one).
+
+        Args:
+            name: Job name from JOBS
+            fire_time: Deadline the run belongs to, now for manual runs
+
+        Returns:
+            bool: True if the job was started, False if it was deferred
+        """
+        if name not in JOBS:
+            raise ValueError(f"Unknown job: {name}")
+        fire_time = fire_time or datetime.now()
+
+        with self._jobs_lock:
+            if name in self._active:
+                scheduler_logger.warning(f"Job {name} is still running, next run deferred until it finishes")
+                self._deferred[name] = fire_time
+                return False
+
+            dependencies = [
+                self._active[dependency]["future"]
+                for dependency in JOB_DEPENDENCIES.get(name, ())
+                if dependency in self._active
+            ]
+            run = {
+                "fire_time": fire_time,
+                "cancel_event": threading.Event(),
+                "timed_out": False,
+            }
+            self._active[name] = run
+            run["future"] = self._get_executor().submit(self._run_job, name, run, dependencies)
+            return True
+
+    def _run_job(self, name: str, run: Dict[str, Any], dependencies: list) -> None:
+        """Worker body: wait for dependencies, run the job under a timeout, record the result"""
+        cancel_event = run["cancel_event"]
+        timer = None
+        started = None
+        status = "error"
+        try:
+            if dependencies:
+                scheduler_logger.info(f"Job {name} is waiting for {len(dependencies)} running job(s) to finish")
+                wait_futures(dependencies)
+
+            if cancel_event.is_set():
+                status = "cancelled"
+                return
+
+            timeout = self._job_timeout(name)
+            if timeout:
+                timer = threading.Timer(timeout, self._on_timeout, (name, run))
+                timer.daemon = True
+                timer.start()
+
+            started = datetime.now()
+            run["started"] = started
+            method_name = JOBS[name][1]
+            result = getattr(self, method_name)(cancel_event=cancel_event)
+
+            if run["timed_out"]:
+                status = "timeout"
+            elif cancel_event.is_set():
+                status = "cancelled"
+            else:
+                status = "success" if result else "failed"
+
+        except Exception as e:
+            log_exception(scheduler_logger, e, f"Error running scheduled job {name}")
+        finally:
+            if timer:
+                timer.cancel()
+            finished = datetime.now()
+            entry = {
+                "fire_time": run["fire_time"].isoformat(),
+                "started": started.isoformat() if started else None,
+                "finished": finished.isoformat(),
+                "duration_seconds": round((finished - started).total_seconds(), 1) if started else 0,
+                "status": status
+            }
+            self._record_run(name, entry)
+            JOB_RUNS.inc(job=name, status=status)
+            JOB_LAST_DURATION.set(entry["duration_seconds"], job=name)
+            if status == "success":
+                JOB_LAST_SUCCESS.set(finished.timestamp(), job=name)
+            scheduler_logger.info(f"Job {name} finished with status {status} in {entry['duration_seconds']} s")
+
+            with self._jobs_lock:
+                self._active.pop(name, None)
+                deferred = self._deferred.pop(name, None)
+            if deferred is not None and self.running:
+                self.submit_job(name, deferred)
+
+    def _on_timeout(self, name: str, run: Dict[str, Any]) -> None:
+        """Ask a job that exceeded its timeout to stop"""
+        run["timed_out"] = True
+        run["cancel_event"].set()
+        scheduler_logger.error(f"Job {name} exceeded its timeout, cancelling it")
+
+    def running_jobs(self) -> Dict[str, Optional[str]]:
+        """
+        Get the jobs that are currently running
+
+        Returns:
+            Dictionary mapping job name to its start time (None while waiting for dependencies)
+        """
+        with self._jobs_lock:
+            return {
+                name: run["started"].isoformat() if run.get("started") else None
+                for name, run in self._active.items()
+            }
+
+    def get_job_history(self, name: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get recent runs with start, end, duration and status
+
+        Args:
+            name: Job name, or None for all jobs
+
+        Returns:
+            Dictionary mapping job name to its runs, oldest first
+        """
+        with self._jobs_lock:
+            names = [name] if name else list(self._history)
+            return {job: list(self._history.get(job, [])) for job in names}
+
+    def check_and_run_tasks(self) -> Optional[float]:
+        """
+        Start every job whose deadline has passed
+
+        Returns:
+            float or None: Seconds until the next deadline, None if nothing is scheduled
+        """
+        due_jobs = []
+        while True:
+            due = self._pop_due(datetime.now())
+            if due is None:
+                break
+            due_jobs.append(due)
+
+        # Jobs due together start in dependency order
+        due_jobs.sort(key=lambda item: (item[0], JOB_ORDER.index(item[1])))
+        for fire_time, name in due_jobs:
+            # Recorded before running, so a crash or restart never repeats the run
+            self._record_fire(name, fire_time)
+            config_key = JOBS[name][0]
+            scheduler_logger.info(f"It's time to run {name} ({self.config.get(config_key)}, due {fire_time})")
+            self.submit_job(name, fire_time)
+
+        with self._queue_lock:
+            if not self._queue:
+                return None
+            return max(0.0, (self._queue[0][0] - datetime.now()).total_seconds())
+
     def run_continuously(self):
-        """Run the scheduler continuously"""
+        """Run the scheduler until stop() is called, sleeping until the next deadline"""
         self.running = True
+        self._wakeup.clear()
         scheduler_logger.info("Scheduler starting continuous operation")
         
+        # Deliver emails left in the outbox by earlier runs and keep retrying failures
+        try:
+            from email_outbox import get_outbox_sender
+            get_outbox_sender()
+        except Exception as e:
+            log_exception(scheduler_logger, e, "Error starting email outbox sender")
+        
         try:
+            self._rebuild_queue()
             while self.running:
-                # Check if tasks need to be run
-                self.check_and_run_tasks()
+                delay = self.check_and_run_tasks()
+                if not self.running:
+                    break
                 
-                # Sleep for the configured interval
-                time.sleep(self.config.get("check_interval", 60))
+                # Sleep until the next deadline; stop() interrupts the wait
+                timeout = MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+                if self._wakeup.wait(timeout):
+                    self._wakeup.clear()
+                self._reload_if_changed()
                 
         except KeyboardInterrupt:
             scheduler_logger.info("Scheduler stopped by user")
@@ -294,81 +667,51 @@ class Scheduler:
         return True
     
     def stop(self):
-        """Stop the scheduler"""
+        """Stop the scheduler and ask running jobs to cancel"""
         self.running = False
+        self._wakeup.set()
+        with self._jobs_lock:
+            self._deferred.clear()
+            for run in self._active.values():
+                run["cancel_event"].set()
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
         scheduler_logger.info("Scheduler stopped")
 
 
 def get_pid_file_path():
     """Get path to PID file"""
-    return os.path.join(os.getcwd(), "scheduler.pid")
+    return PID_FILE
 
 def check_if_running() -> Optional[int]:
     """
-    Check if the scheduler process is running
-    
+    Check if the scheduler daemon is running
+
+    Only probes the lock on the PID file, so it is cheap enough to be called
+    every second from the GUI.
+
     Returns:
         int or None: PID of the scheduler process if running, None otherwise
     """
     try:
-        # On Windows
-        if os.name == 'nt':
-            import psutil
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    # Check if this is a Python process
-                    if 'python' in proc.info['name'].lower():
-                        # Check the command line arguments
-                        if proc.info['cmdline'] and len(proc.info['cmdline']) > 1:
-                            cmdline = ' '.join(proc.info['cmdline'])
-                            # Look for our scheduler arguments
-                            if '--scheduler' in cmdline and os.path.basename(__file__) in cmdline:
-                                return proc.info['pid']
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
-                    
-        # On Unix-like systems
-        else:
-            import subprocess
-            result = subprocess.run(
-                ["pgrep", "-f", f"python.*{os.path.basename(__file__)}.*--scheduler"],
-                capture_output=True, text=True
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return int(result.stdout.strip().split('\n')[0])
-                
-        # Alternative check for Windows if psutil approach fails
-        if os.name == 'nt':
-            import subprocess
-            result = subprocess.run(
-                ["tasklist", "/FI", f"WINDOWTITLE eq *{os.path.basename(__file__)}*", "/FO", "CSV"],
-                capture_output=True, text=True
-            )
-            if "python" in result.stdout.lower():
-                for line in result.stdout.splitlines():
-                    if "python" in line.lower() and "--scheduler" in line.lower():
-                        parts = line.split(',')
-                        if len(parts) > 1:
-                            pid_part = parts[1].strip('"')
-                            if pid_part.isdigit():
-                                return int(pid_part)
-        
-        return None
+        info = read_pid_info()
+        if info is None:
+            return None
+        return info.get("pid") or -1
     except Exception as e:
         scheduler_logger.error(f"Error checking if scheduler is running: {e}")
         return None
 
-def write_pid_file():
-    """Write current PID to file"""
-    pid_file = get_pid_file_path()
-    with open(pid_file, 'w') as f:
-        f.write(str(os.getpid()))
-
-def remove_pid_file():
-    """Remove PID file on exit"""
-    pid_file = get_pid_file_path()
-    if os.path.exists(pid_file):
-        os.remove(pid_file)
+def wait_until_running(timeout: float = 15.0) -> Optional[int]:
+    """Wait for a starting daemon to take the lock and open its control endpoint"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = read_pid_info()
+        if info and info.get("port"):
+            return info.get("pid")
+        time.sleep(0.1)
+    return None
 
 def ensure_scheduler_running() -> Optional[int]:
     """
@@ -388,10 +731,10 @@ def ensure_scheduler_running() -> Optional[int]:
         # Get the path to the current Python executable
         python_exe = sys.executable
         script_path = os.path.abspath(__file__)
+        script_dir = os.path.dirname(script_path)
         
         # Create a detached process
         if os.name == 'nt':  # Windows
-            import subprocess
             # Use CREATE_NEW_PROCESS_GROUP and DETACHED_PROCESS flags to detach
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
@@ -399,17 +742,16 @@ def ensure_scheduler_running() -> Optional[int]:
             
             process = subprocess.Popen(
                 [python_exe, script_path, "--scheduler"],
+                cwd=script_dir,
                 close_fds=True,
                 creationflags=subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS,
                 startupinfo=startupinfo
             )
-            # Give Windows a moment to register the process
-            time.sleep(2)
             
         else:  # Unix/Linux
-            import subprocess
             process = subprocess.Popen(
                 [python_exe, script_path, "--scheduler"],
+                cwd=script_dir,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 close_fds=True,
@@ -417,13 +759,16 @@ def ensure_scheduler_running() -> Optional[int]:
             )
             
         # Check if it started successfully
-        pid = process.pid if process else None
-        if pid:
-            scheduler_logger.info(f"Started scheduler process with PID {pid}")
-            # Double-check the process is really running
-            time.sleep(1)
-            if check_if_running():
+        if process:
+            scheduler_logger.info(f"Started scheduler process with PID {process.pid}")
+            pid = wait_until_running()
+            if pid:
                 return pid
+            if process.poll() is not None:
+                # Exits right away if another instance won the lock
+                pid = check_if_running()
+                if pid:
+                    return pid
                 
         # If we didn't successfully start it, or validate it running
         scheduler_logger.error("Failed to start scheduler process")
@@ -433,30 +778,97 @@ def ensure_scheduler_running() -> Optional[int]:
         scheduler_logger.error(f"Error ensuring scheduler is running: {e}")
         return None
 
+def _close_connections() -> None:
+    """Close pooled HTTP and SMTP connections of the daemon"""
+    try:
+        from http_session import close_session
+        close_session()
+        from email_utils import close_smtp_connections
+        close_smtp_connections()
+    except Exception as e:
+        scheduler_logger.warning(f"Error closing connections: {e}")
+
+def preload_modules() -> None:
+    """Import the modules used by scheduled jobs and open the shared HTTP session"""
+    started = time.perf_counter()
+    for module_name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            scheduler_logger.warning(f"Could not preload module {module_name}: {e}")
+    try:
+        from http_session import get_session
+        get_session()
+    except Exception as e:
+        scheduler_logger.warning(f"Could not create HTTP session: {e}")
+    scheduler_logger.info(f"Preloaded job modules in {time.perf_counter() - started:.1f} s")
+
 def start_daemon():
-    """Start the scheduler as a daemon process"""
-    pid = check_if_running()
-    
-    if pid:
+    """
+    Run the scheduler daemon in the current process
+
+    Holds the PID file lock and serves the control endpoint until the
+    scheduler is stopped. Job modules are preloaded and HTTP/SMTP connections
+    stay open between jobs; configuration files are re-read when they change.
+    """
+    lock = PidLock()
+    if not lock.acquire():
+        pid = check_if_running()
         print(f"Scheduler is already running with PID {pid}")
         return pid
     
-    # Register clean up function
-    atexit.register(remove_pid_file)
-    
-    # Write PID file
-    write_pid_file()
-    
-    # Start scheduler
     scheduler = Scheduler()
-    scheduler.run_continuously()
+    server = None
+    try:
+        # A fixed port lets Prometheus scrape /metrics; by default any free port is used
+        control_port = int(scheduler.config.get("control_port", 0) or 0)
+        try:
+            server = ControlServer(scheduler, secrets.token_hex(16), port=control_port)
+        except OSError as e:
+            scheduler_logger.warning(f"Control port {control_port} is not available ({e}), using a free port")
+            server = ControlServer(scheduler, secrets.token_hex(16))
+        port = server.start()
+        lock.write_info({
+            "pid": os.getpid(),
+            "started": datetime.now().isoformat(),
+            "port": port,
+            "token": server.token
+        })
+        
+        # Stop gracefully on SIGTERM (and Ctrl+Break on Windows)
+        for sig_name in ("SIGTERM", "SIGBREAK"):
+            if hasattr(signal, sig_name):
+                signal.signal(getattr(signal, sig_name), lambda signum, frame: scheduler.stop())
+        
+        threading.Thread(target=preload_modules, name="scheduler-preload", daemon=True).start()
+        scheduler.run_continuously()
+    finally:
+        if server:
+            server.stop()
+        _close_connections()
+        lock.release()
     
     return os.getpid()
 
-
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == '--daemon':
+    if len(sys.argv) > 1 and sys.argv[1] in ('--daemon', '--scheduler'):
         start_daemon()
+    elif len(sys.argv) > 1 and sys.argv[1] in ('--status', '--run', '--stop'):
+        # Control a running daemon: --status, --run <job>, --stop
+        from scheduler_control import get_scheduler_status, run_job_now, request_stop
+        if not check_if_running():
+            print("Scheduler is not running")
+            sys.exit(1)
+        if sys.argv[1] == '--status':
+            print(json.dumps(get_scheduler_status(), indent=2, ensure_ascii=False))
+        elif sys.argv[1] == '--run':
+            job = sys.argv[2] if len(sys.argv) > 2 else "daily_report"
+            if not run_job_now(job):
+                print(f"Failed to submit job {job}")
+                sys.exit(1)
+            print(f"Job {job} submitted")
+        else:
+            print("Scheduler is stopping" if request_stop() else "Failed to stop scheduler")
     else:
         scheduler = Scheduler()
         scheduler.run_continuously()
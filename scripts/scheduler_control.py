@@ -0,0 +1,299 @@
+"""
+Scheduler Control Module
+
+This module provides the single-instance lock of the scheduler daemon and its
+local control endpoint. The daemon holds an exclusive lock on scheduler.pid
+for as long as it runs and stores its PID, the port of the control server and
+an access token in that file. Clients check liveness by probing the lock (no
+process listing or subprocess) and talk to the daemon over HTTP on 127.0.0.1:
+
+    GET  /status       - PID, start time, running jobs and next run times
+    GET  /next-runs    - next run time of every job
+    GET  /history      - recent runs of every job
+    GET  /metrics      - pipeline and job metrics in the Prometheus text format
+    POST /run/<job>    - start a job now
+    POST /stop         - stop the scheduler
+"""
+
+import http.client
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from logger_config import get_logger, log_exception
+from metrics import render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+# Set up logger
+scheduler_logger = get_logger("scheduler")
+
+PID_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheduler.pid")
+
+CONTROL_HOST = "127.0.0.1"
+TOKEN_HEADER = "X-Scheduler-Token"
+CLIENT_TIMEOUT = 5
+
+# On Windows a locked byte range cannot be read by other processes, so the
+# lock is taken on a byte far beyond the JSON data
+WINDOWS_LOCK_OFFSET = 1 << 20
+
+def _lock_file(f) -> bool:
+    """Take a non-blocking exclusive lock on an open file"""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(WINDOWS_LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _unlock_file(f) -> None:
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(WINDOWS_LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+class PidLock:
+    """Exclusive lock on the PID file held for the lifetime of the daemon"""
+
+    def __init__(self, path: str = PID_FILE):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        Lock the PID file and write the current PID into it
+
+        Returns:
+            bool: False if another process holds the lock
+        """
+        # Opened without truncating: the file belongs to the running daemon until locked
+        f = open(self.path, 'a+', encoding='utf-8')
+        if not _lock_file(f):
+            f.close()
+            return False
+        self._file = f
+        self.write_info({"pid": os.getpid(), "started": datetime.now().isoformat()})
+        return True
+
+    def write_info(self, info: Dict[str, Any]) -> None:
+        """Replace the contents of the locked PID file"""
+        if self._file is None:
+            raise RuntimeError("PID file is not locked")
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(info))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if os.name != 'nt':
+            # The file contains the control token
+            os.chmod(self.path, 0o600)
+
+    def release(self) -> None:
+        """Clear and unlock the PID file"""
+        if self._file is None:
+            return
+        try:
+            self._file.seek(0)
+            self._file.truncate()
+            _unlock_file(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+def is_lock_held(path: str = PID_FILE) -> bool:
+    """Check whether a live process holds the PID file lock"""
+    try:
+        f = open(path, 'r+', encoding='utf-8')
+    except FileNotFoundError:
+        return False
+    with f:
+        if _lock_file(f):
+            _unlock_file(f)
+            return False
+        return True
+
+def read_pid_info(path: str = PID_FILE) -> Optional[Dict[str, Any]]:
+    """
+    Get the daemon information from the PID file
+
+    Returns:
+        Dictionary with 'pid', 'started', 'port' and 'token', or None if the
+        scheduler daemon is not running
+    """
+    if not is_lock_held(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+        info = json.loads(content) if content else {}
+    except (OSError, ValueError):
+        return {}
+    # Files written by older versions contain only the PID
+    return info if isinstance(info, dict) else {"pid": info}
+
+# -------------------- Control server --------------------
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    """Request handler of the control endpoint"""
+
+    server_version = "SchedulerControl/1.0"
+
+    def log_message(self, format, *args):
+        scheduler_logger.debug("Control request: " + format % args)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        return self.headers.get(TOKEN_HEADER) == self.server.token
+
+    def do_GET(self):
+        scheduler = self.server.scheduler
+        path = self.path.rstrip('/')
+        try:
+            if path == "/status":
+                self._send_json(200, self.server.status())
+            elif path == "/next-runs":
+                self._send_json(200, scheduler.next_run_times())
+            elif path == "/history":
+                self._send_json(200, scheduler.get_job_history())
+            elif path == "/metrics":
+                self._send_text(200, render_metrics(), METRICS_CONTENT_TYPE)
+            else:
+                self._send_json(404, {"error": "not found"})
+        except Exception as e:
+            log_exception(scheduler_logger, e, f"Error handling control request {self.path}")
+            self._send_json(500, {"error": str(e)})
+
+    def do_POST(self):
+        if not self._authorized():
+            self._send_json(403, {"error": "forbidden"})
+            return
+
+        scheduler = self.server.scheduler
+        path = self.path.rstrip('/')
+        try:
+            if path.startswith("/run/"):
+                job = path[len("/run/"):]
+                scheduler_logger.info(f"Run of {job} requested through control endpoint")
+                try:
+                    started = scheduler.submit_job(job)
+                except ValueError as e:
+                    self._send_json(404, {"error": str(e)})
+                    return
+                self._send_json(200, {"job": job, "started": started})
+            elif path == "/stop":
+                scheduler_logger.info("Stop requested through control endpoint")
+                self._send_json(200, {"stopping": True})
+                scheduler.stop()
+            else:
+                self._send_json(404, {"error": "not found"})
+        except Exception as e:
+            log_exception(scheduler_logger, e, f"Error handling control request {self.path}")
+            self._send_json(500, {"error": str(e)})
+
+class ControlServer(ThreadingHTTPServer):
+    """Local HTTP endpoint controlling a running Scheduler"""
+
+    daemon_threads = True
+
+    def __init__(self, scheduler, token: str, host: str = CONTROL_HOST, port: int = 0):
+        super().__init__((host, port), _ControlHandler)
+        self.scheduler = scheduler
+        self.token = token
+        self.started = datetime.now().isoformat()
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "started": self.started,
+            "running": self.scheduler.running,
+            "running_jobs": self.scheduler.running_jobs(),
+            "next_runs": self.scheduler.next_run_times(),
+        }
+
+    def start(self) -> int:
+        """Serve requests in a background thread, returns the port"""
+        self._thread = threading.Thread(target=self.serve_forever, name="scheduler-control", daemon=True)
+        self._thread.start()
+        scheduler_logger.info(f"Scheduler control endpoint listening on {CONTROL_HOST}:{self.port}")
+        return self.port
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+# -------------------- Client --------------------
+
+def control_request(method: str, path: str, timeout: float = CLIENT_TIMEOUT) -> Optional[Any]:
+    """
+    Send a request to the running scheduler daemon
+
+    Args:
+        method: 'GET' or 'POST'
+        path: Endpoint path, e.g. '/status'
+        timeout: Connection timeout in seconds
+
+    Returns:
+        Parsed JSON response, or None if the daemon is not running or did not answer
+    """
+    info = read_pid_info()
+    if not info or not info.get("port"):
+        return None
+
+    connection = http.client.HTTPConnection(CONTROL_HOST, info["port"], timeout=timeout)
+    try:
+        connection.request(method, path, headers={TOKEN_HEADER: info.get("token", "")})
+        response = connection.getresponse()
+        payload = json.loads(response.read().decode('utf-8') or 'null')
+        if response.status != 200:
+            scheduler_logger.warning(f"Scheduler control {method} {path} failed: {response.status} {payload}")
+            return None
+        return payload
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        scheduler_logger.warning(f"Scheduler control endpoint is not reachable: {e}")
+        return None
+    finally:
+        connection.close()
+
+def get_scheduler_status() -> Optional[Dict[str, Any]]:
+    """Status of the running daemon, None if it is not running"""
+    return control_request("GET", "/status")
+
+def run_job_now(job: str) -> bool:
+    """Queue a job in the daemon's worker pool to run now"""
+    return control_request("POST", f"/run/{job}") is not None
+
+def request_stop() -> bool:
+    """Ask the daemon to stop"""
+    return control_request("POST", "/stop") is not None
@@ -1,80 +1,83 @@
 import os
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
 from logger_config import get_logger, log_exception
-from email_utils import load_email_config, send_violations_report
+from email_utils import load_email_config, create_html_message
+from report_templates import render_regional_report, regional_report_subject
 from region_manager import load_regions_data
+from email_outbox import enqueue_message, get_outbox_sender, deliver_now, STATE_SENT, STATE_PENDING
+from xlsx_utils import find_report_csvs, build_xlsx_attachment
+from report_index import ReportIndex, get_report_index
+from tracing import span
 
 # Set up logger
 email_logger = get_logger("email")
 
+# Size cap for XLSX attachments unless 'attachment_max_mb' is configured
+DEFAULT_ATTACHMENT_MAX_MB = 10
+
 def get_yesterday_date():
     """Get yesterday's date in YYYY-MM-DD format"""
     return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
 
-def load_all_reports(base_dir='output') -> List[Dict]:
+def load_all_reports(base_dir='output', index: Optional[ReportIndex] = None) -> List[Dict]:
     """
     Load all violation reports for yesterday from all certificates
     
+    Args:
+        base_dir: Base output directory, used when no index is given
+        index: Report index to query instead of scanning the directory
+    
     Returns:
         List of report objects with certificate and violation data
     """
-    if not os.path.exists(base_dir):
-        email_logger.warning(f"Report directory not found: {base_dir}")
-        return []
+    if index is None:
+        if not os.path.exists(base_dir):
+            email_logger.warning(f"Report directory not found: {base_dir}")
+            return []
+        index = get_report_index(base_dir)
     
     yesterday = get_yesterday_date()
     email_logger.info(f"Looking for reports from date: {yesterday}")
     
     all_reports = []
     
-    for cert_dir in os.listdir(base_dir):
-        cert_path = os.path.join(base_dir, cert_dir)
-        if not os.path.isdir(cert_path):
+    for report in index.reports_for_date(yesterday):
+        report_data = index.load(report)
+        if report_data is None:
             continue
-            
-        # Look for yesterday's report
-        report_file = os.path.join(cert_path, f'violations_{yesterday}.json')
         
-        if os.path.exists(report_file):
-            try:
-                with open(report_file, 'r', encoding='utf-8') as f:
-                    report_data = json.load(f)
-                    
-                all_reports.append({
-                    'certificate': cert_dir,
-                    'data': report_data
-                })
-                
-                email_logger.info(f"Loaded report for {cert_dir}")
-                
-            except Exception as e:
-                log_exception(email_logger, e, f"Error loading report for {cert_dir}")
+        all_reports.append({
+            'certificate': report['certificate'],
+            'data': report_data
+        })
+        
+        email_logger.info(f"Loaded report for {report['certificate']}")
     
     email_logger.info(f"Loaded {len(all_reports)} reports in total")
     return all_reports
 
-def generate_consolidated_report_by_region() -> Dict[str, Dict]:
+def generate_consolidated_report_by_region(index: Optional[ReportIndex] = None,
+                                           regions_data: Optional[Dict] = None) -> Dict[str, Dict]:
     """
     Generate consolidated report by region
     
+    Args:
+        index: Report index, the shared one for 'output' is used by default
+        regions_data: Regions configuration, loaded from regions.json by default
+    
     Returns:
         Dictionary with region as key and report data as value
     """
-    all_reports = load_all_reports()
-    regions_data = load_regions_data()
-    
-    # Map certificate names to regions
-    cert_to_region = {}
+    if index is None:
+        index = get_report_index()
+    if regions_data is None:
+        regions_data = load_regions_data()
     
-    for region, region_data in regions_data.items():
-        for tc in region_data.get('tc_list', []):
-            cert_to_region[tc] = region
+    index.set_regions(regions_data)
+    all_reports = load_all_reports(index=index)
     
     # Initialize regional reports
     regional_reports = defaultdict(lambda: {
@@ -88,7 +91,7 @@ def generate_consolidated_report_by_region() -> Dict[str, Dict]:
     # Consolidate reports by region
     for report in all_reports:
         cert_name = report['certificate']
-        region = cert_to_region.get(cert_name, "Undefined")
+        region = index.region_for_cert(cert_name)
         # Store individual certificate report
         regional_reports[region]['cert_reports'][cert_name] = report['data'].get('violations', {})
          
@@ -112,32 +115,68 @@ def generate_consolidated_report_by_region() -> Dict[str, Dict]:
         result[region] = {
             'date': data['date'],
             'certificates': data['certificates'],
+            'cert_reports': data['cert_reports'],
             'violations': dict(data['violations']),
             'total': data['total']
         }
     
     return result
 
-def send_regional_reports() -> bool:
+def build_region_attachment(region_name: str, report_data: Dict, email_config: Dict) -> Optional[Tuple[str, bytes]]:
+    """
+    Build the XLSX attachment with detailed violation rows for a region
+    
+    The workbook is streamed from the downloaded CSVs and zipped if it is
+    larger than 'attachment_max_mb' from the email configuration.
+    
+    Returns:
+        Tuple (filename, content) or None if no attachment should be added
+    """
+    cert_files = {}
+    for cert_name in report_data.get('certificates', []):
+        files = find_report_csvs(cert_name, report_data['date'])
+        if files:
+            cert_files[cert_name] = files
+    
+    if not cert_files:
+        email_logger.info(f"No downloaded reports to attach for region {region_name}")
+        return None
+    
+    max_bytes = int(float(email_config.get('attachment_max_mb', DEFAULT_ATTACHMENT_MAX_MB)) * 1024 * 1024)
+    safe_name = "".join(c if c.isalnum() or c in ' -_' else '_' for c in region_name).strip()
+    return build_xlsx_attachment(cert_files, f"Нарушения {safe_name} {report_data['date']}", max_bytes)
+
+def send_regional_reports(index: Optional[ReportIndex] = None, regions_data: Optional[Dict] = None) -> bool:
     """
-    Send consolidated regional reports
+    Send consolidated regional reports through the outbox
+    
+    Messages are put into the persistent outbox and the first delivery
+    attempt is made right away; failed messages stay queued and the
+    background sender retries them.
+    
+    Args:
+        index: Report index, the shared one for 'output' is used by default
+        regions_data: Regions configuration, loaded from regions.json by default
     
     Returns:
-        bool: True if all reports were sent successfully, False otherwise
+        bool: True if all reports were delivered, False otherwise
     """
     email_config = load_email_config()
     if not email_config:
         email_logger.error("Failed to load email configuration")
         return False
     
-    regional_reports = generate_consolidated_report_by_region()
-    regions_data = load_regions_data()
+    if regions_data is None:
+        regions_data = load_regions_data()
+    with span("consolidate_reports"):
+        regional_reports = generate_consolidated_report_by_region(index, regions_data)
     
     if not regional_reports:
         email_logger.warning("No reports to send")
         return False
     
     success = True
+    queued = []
     
     # Debug log to help diagnose issues
     email_logger.info(f"Found {len(regional_reports)} regional reports: {', '.join(regional_reports.keys())}")
@@ -153,71 +192,52 @@ def send_regional_reports() -> bool:
             region_name = regions_data.get(region, {}).get('name', region)
             email_logger.info(f"Processing report for region: {region} (display name: {region_name})")
             
-            # Create email HTML content with individual tables per certificate
-            html = f"""
-            <h2>Отчет о нарушениях маркировки по региону {region_name}</h2>
-            <h3>Дата: {report_data['date']} (данные за вчерашний день)</h3>
-            """
-            # For each certificate, add its own table
-            for cert in report_data.get('cert_reports', {}):
-                cert_violations = report_data['cert_reports'][cert]
-                html += f"""
-                <h4>Торговая точка: {cert}</h4>
-                <table border=\"1\" style=\"border-collapse: collapse; width: 100%; margin-bottom:20px;\">
-                    <tr style=\"background-color: #f2f2f2;\">
-                        <th style=\"padding: 8px;\">Товарная группа</th>
-                        <th style=\"padding: 8px;\">Количество нарушений</th>
-                    </tr>
-                """
-                # Add rows for each product group in this certificate
-                for product_group, count in sorted(
-                    cert_violations.items(), key=lambda x: x[1], reverse=True
-                ):
-                    html += f"""
-                    <tr>
-                        <td style=\"padding: 8px;\">{product_group}</td>
-                        <td style=\"padding: 8px; text-align: center;\">{count}</td>
-                    </tr>
-                    """
-                # Add total row for this certificate
-                total_count = sum(cert_violations.values())
-                html += f"""
-                    <tr style=\"background-color: #f2f2f2; font-weight: bold;\">
-                        <td style=\"padding: 8px;\">Всего нарушений:</td>
-                        <td style=\"padding: 8px; text-align: center;\">{total_count}</td>
-                    </tr>
-                </table>
-                <br/>
-                """
-            # End for each certificate table
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"Отчет о нарушениях маркировки - Регион {region_name} - {report_data['date']}"
-            msg['From'] = email_config['sender_email']
-            
             # Get recipients for this region
             recipients = regions_data.get(region, {}).get('emails', email_config['recipient_emails'])
             if not recipients:
                 recipients = email_config['recipient_emails']
-                
-            msg['To'] = ', '.join(recipients)
-            msg.attach(MIMEText(html, 'html'))
             
-            email_logger.info(f"Sending email for region {region_name} to {len(recipients)} recipients")
+            attachments = []
+            if email_config.get('attach_xlsx', False):
+                with span("build_attachment", region=region):
+                    attachment = build_region_attachment(region_name, report_data, email_config)
+                if attachment:
+                    attachments.append(attachment)
             
-            # Send email
-            with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
-                server.starttls()
-                server.login(email_config['sender_email'], email_config['sender_password'])
-                server.send_message(msg)
-                
-            email_logger.info(f"Email report sent successfully for region {region_name}")
+            with span("render_email", region=region):
+                msg = create_html_message(
+                    regional_report_subject(region_name, report_data['date']),
+                    render_regional_report(region_name, report_data['date'], report_data.get('cert_reports', {})),
+                    recipients,
+                    email_config,
+                    attachments
+                )
+            
+            # Queue the message; retries happen in the background sender
+            if enqueue_message(region, report_data['date'], msg, recipients):
+                queued.append((region, report_data['date']))
+            else:
+                success = False
             
         except Exception as e:
-            log_exception(email_logger, e, f"Error sending email report for region {region}")
+            log_exception(email_logger, e, f"Error preparing email report for region {region}")
             success = False
     
+    # Report what actually reached the mail server, not just the queue
+    with span("deliver_reports"):
+        states = deliver_now(queued)
+    for (region, report_date), state in states.items():
+        if state == STATE_SENT:
+            continue
+        success = False
+        if state == STATE_PENDING:
+            email_logger.warning(f"Report for region {region} on {report_date} is not delivered yet, will retry")
+        else:
+            email_logger.error(f"Report for region {region} on {report_date} is {state}")
+    
+    # Hand the remaining retries to the background sender
+    get_outbox_sender().notify()
+    
     # Update last email run time
     try:
         last_run = {
@@ -245,22 +265,17 @@ def process_and_send_reports() -> bool:
     email_logger.info("Starting report processing and email sending")
     
     try:
-        # Log debug info about what reports we're finding
-        base_dir = 'output'
-        if os.path.exists(base_dir):
-            for cert_dir in os.listdir(base_dir):
-                cert_path = os.path.join(base_dir, cert_dir)
-                if os.path.isdir(cert_path):
-                    email_logger.debug(f"Checking directory: {cert_path}")
-                    for file in os.listdir(cert_path):
-                        if file.startswith('violations_'):
-                            email_logger.debug(f"Found report file: {file}")
+        # Build the report catalogue once and share it with all stages
+        index = get_report_index()
+        email_logger.debug(
+            f"Report index: {index.count()} reports for {len(index.certificates())} certificates"
+        )
         
         # Send regional reports
-        result = send_regional_reports()
+        result = send_regional_reports(index, load_regions_data())
         
         if result:
-            email_logger.info("Successfully processed and sent all reports")
+            email_logger.info("Successfully processed and delivered all reports")
         else:
             email_logger.warning("Some issues occurred while processing and sending reports")
         
@@ -0,0 +1,215 @@
+"""
+Synthetic Reports Module
+
+This module generates realistic violation reports for benchmarks and load
+tests: CSV files in the layout of the ЦРПТ exports (cp1251, ';' separator,
+CRPT column names), XLSX files and the JSON files produced by
+process_report.py. Rows are generated one at a time from a seeded random
+generator, so the same arguments always give the same file and any size from
+a thousand to ten million rows can be written without holding it in memory.
+
+    python synthetic_reports.py --rows 1000000 --format csv --output big.csv
+"""
+
+import csv
+import io
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+from get_violations import PRODUCT_GROUPS
+
+COLUMNS = [
+    "Вид отклонения",
+    "Результат проверки",
+    "Дата и время регистрации отклонения",
+    "Товарная группа",
+    "Наименование товара",
+    "Регион",
+    "Адрес места фиксации отклонения",
+    "Номер документа",
+    "Код",
+    "GTIN",
+    "ИНН участника",
+    "Номер отклонения",
+    "Нивелировано",
+]
+
+VIOLATION_KINDS = [
+    "Повторные продажи у разных продавцов",
+    "Продажа товара с истекшим сроком годности",
+    "Продажа товара, выведенного из оборота",
+    "Продажа немаркированного товара",
+    "Продажа товара с неверной ценой",
+    "Продажа товара, заблокированного по решению ОГВ",
+]
+
+CHECK_RESULTS = ["Подтверждено", "Не подтверждено", "На проверке"]
+
+REGIONS = [
+    ("Москва", "г Москва, ул Тверская, 7"),
+    ("Московская область", "г Химки, ул Ленинградская, 1"),
+    ("Санкт-Петербург", "г Санкт-Петербург, Невский пр-кт, 28"),
+    ("Красноярский край", "г Норильск, ш Вальковское, 10К"),
+    ("Республика Татарстан", "г Казань, ул Баумана, 44"),
+    ("Новосибирская область", "г Новосибирск, Красный пр-кт, 25"),
+    ("Свердловская область", "г Екатеринбург, ул Малышева, 51"),
+    ("Краснодарский край", "г Краснодар, ул Красная, 122"),
+    ("Республика Башкортостан", "г Уфа, ул Ленина, 14"),
+    ("Самарская область", "г Самара, ул Куйбышева, 90"),
+    ("Забайкальский край", "г Чита, ул Амурская, 91"),
+    ("Приморский край", "г Владивосток, ул Светланская, 33"),
+]
+
+PRODUCT_KINDS = ["Классический", "Премиум", "Эконом", "Детский", "Упаковка 6 шт.", "Без сахара", "Мини"]
+
+# Rows passed to the csv writer at once
+WRITE_BATCH = 10000
+
+def _group_name(group_code: int) -> str:
+    return PRODUCT_GROUPS.get(group_code, f"Группа {group_code}")
+
+def iter_rows(rows: int, group_code: int = 2, date: Optional[str] = None, seed: int = 0) -> Iterator[List[str]]:
+    """
+    Generate violation rows
+
+    Args:
+        rows: Number of rows
+        group_code: Product group code
+        date: Report date YYYY-MM-DD (yesterday by default)
+        seed: Seed of the random generator
+
+    Yields:
+        Lists of values in COLUMNS order
+    """
+    date = date or (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    day = datetime.strptime(date, "%Y-%m-%d")
+    rng = random.Random(f"{seed}:{group_code}:{date}")
+    group_name = _group_name(group_code)
+    products = [f"{group_name.split(',')[0]} {kind}" for kind in PRODUCT_KINDS]
+    gtins = [f"0{4600000000000 + rng.randrange(10 ** 9):013d}" for _ in products]
+
+    for row in range(rows):
+        region, address = REGIONS[rng.randrange(len(REGIONS))]
+        product = rng.randrange(len(products))
+        moment = (day + timedelta(seconds=rng.randrange(86400))).strftime("%Y-%m-%d %H:%M:%S")
+        yield [
+            VIOLATION_KINDS[rng.randrange(len(VIOLATION_KINDS))],
+            CHECK_RESULTS[rng.randrange(len(CHECK_RESULTS))],
+            moment,
+            group_name,
+            products[product],
+            region,
+            f"{region}, {address}",
+            str(282987386440800000 + row),
+            f"01{gtins[product][1:]}21{rng.randrange(16 ** 8):08x}",
+            gtins[product],
+            str(2400000000 + rng.randrange(10 ** 8)),
+            f"{rng.randrange(16 ** 8):08x}-{group_code:04d}-{row % 10000:04d}-{rng.randrange(16 ** 12):012x}",
+            "Да" if rng.random() < 0.1 else "Нет",
+        ]
+
+def write_csv(path: str, rows: int, group_code: int = 2, date: Optional[str] = None, seed: int = 0,
+              encoding: str = "cp1251", delimiter: str = ";") -> int:
+    """
+    Write a violations CSV file
+
+    Returns:
+        int: Size of the file in bytes
+    """
+    with open(path, "w", encoding=encoding, errors="replace", newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter, quoting=csv.QUOTE_MINIMAL, lineterminator="\r\n")
+        writer.writerow(COLUMNS)
+        batch = []
+        for values in iter_rows(rows, group_code, date, seed):
+            batch.append(values)
+            if len(batch) >= WRITE_BATCH:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+    return os.path.getsize(path)
+
+def csv_bytes(rows: int, group_code: int = 2, date: Optional[str] = None, seed: int = 0,
+              encoding: str = "cp1251", delimiter: str = ";") -> bytes:
+    """Violations CSV in memory, for payloads of the mock API"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, quoting=csv.QUOTE_MINIMAL, lineterminator="\r\n")
+    writer.writerow(COLUMNS)
+    writer.writerows(iter_rows(rows, group_code, date, seed))
+    return buffer.getvalue().encode(encoding, errors="replace")
+
+def write_xlsx(path: str, rows: int, group_code: int = 2, date: Optional[str] = None, seed: int = 0) -> int:
+    """
+    Write a violations XLSX file in constant-memory mode
+
+    Rows beyond the Excel limit continue on further sheets.
+
+    Returns:
+        int: Size of the file in bytes
+    """
+    import xlsxwriter
+    from xlsx_utils import MAX_SHEET_ROWS
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        sheet = None
+        sheet_row = 0
+        for values in iter_rows(rows, group_code, date, seed):
+            if sheet is None or sheet_row > MAX_SHEET_ROWS:
+                sheet = workbook.add_worksheet("Нарушения" if sheet is None else f"Нарушения {len(workbook.worksheets()) + 1}")
+                sheet.write_row(0, 0, COLUMNS)
+                sheet_row = 1
+            sheet.write_row(sheet_row, 0, values)
+            sheet_row += 1
+        if sheet is None:
+            workbook.add_worksheet("Нарушения").write_row(0, 0, COLUMNS)
+    finally:
+        workbook.close()
+    return os.path.getsize(path)
+
+def write_violations_json(path: str, rows: int, group_code: int = 2, date: Optional[str] = None,
+                          seed: int = 0) -> int:
+    """
+    Write a JSON file in the format of process_violations_report (input of aggregate_violations)
+
+    Returns:
+        int: Size of the file in bytes
+    """
+    date = date or (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    meta = {"generated": datetime.now().isoformat(), "source_file": "synthetic", "report_date": date}
+    statistics = {_group_name(group_code): rows}
+    with open(path, "w", encoding="utf-8") as f:
+        # The violations list is streamed row by row
+        f.write(f'{{"meta": {json.dumps(meta)}, "statistics": {json.dumps(statistics, ensure_ascii=False)}, '
+                f'"violations": [')
+        for index, values in enumerate(iter_rows(rows, group_code, date, seed)):
+            if index:
+                f.write(", ")
+            f.write(json.dumps(dict(zip(COLUMNS, values)), ensure_ascii=False))
+        f.write("]}")
+    return os.path.getsize(path)
+
+WRITERS = {
+    "csv": write_csv,
+    "xlsx": write_xlsx,
+    "json": write_violations_json,
+}
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Генератор синтетических отчетов о нарушениях")
+    parser.add_argument("--rows", type=int, default=1000, help="Количество строк")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv", help="Формат файла")
+    parser.add_argument("--group", type=int, default=2, help="Код товарной группы")
+    parser.add_argument("--date", help="Дата отчета YYYY-MM-DD (по умолчанию вчера)")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--output", "-o", help="Путь к файлу")
+    args = parser.parse_args()
+
+    output = args.output or f"violations_group{args.group}_synthetic_{args.rows}.{args.format}"
+    size = WRITERS[args.format](output, args.rows, group_code=args.group, date=args.date, seed=args.seed)
+    print(f"{output}: {args.rows} строк, {size / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from datetime import datetime
+from openpyxl import Workbook, load_workbook
+from xlsx_utils import iter_xlsx_rows, write_violations_xlsx
+
+def openpyxl_rows(path):
+    """Rows of the workbook as openpyxl reads them in read-only mode"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [
+            ['' if value is None else str(value) for value in values]
+            for values in workbook.worksheets[0].iter_rows(values_only=True)
+        ]
+    finally:
+        workbook.close()
+
+def test_iter_xlsx_rows_matches_openpyxl():
+    """Test that streamed rows match openpyxl on a workbook written by openpyxl"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Дата", "Количество", "Цена", "Товар", "Нивелировано"])
+    sheet.append([datetime(2024, 1, 2, 3, 4, 5), 5, 1.25, "Обувь", True])
+    sheet.append([datetime(2024, 5, 6), None, 0.5, None, False])
+    # Row 4 is missing from the XML, row 5 is shorter than the sheet
+    sheet.cell(row=5, column=2, value=7)
+    sheet.append([None, None, None, "Одежда"])
+    sheet.cell(row=7, column=5, value="Да")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "openpyxl.xlsx")
+        workbook.save(path)
+
+        expected = openpyxl_rows(path)
+        rows = list(iter_xlsx_rows(path))
+
+    assert rows == expected
+    assert rows[1][0] == "2024-01-02 03:04:05"
+    assert rows[3] == [''] * 5
+
+def test_write_violations_xlsx_maps_columns_by_name():
+    """Test that reports with different columns are joined by column name"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first = os.path.join(temp_dir, "first.csv")
+        second = os.path.join(temp_dir, "second.csv")
+        with open(first, "w", encoding="utf-8") as f:
+            f.write("ИНН;Товар\n1;Обувь\n")
+        with open(second, "w", encoding="utf-8") as f:
+            f.write("Товар;Адрес;ИНН\nОдежда;Москва;2\n")
+        path = os.path.join(temp_dir, "violations.xlsx")
+
+        written = write_violations_xlsx({"Точка 1": [first], "Точка 2": [second]}, path)
+        rows = openpyxl_rows(path)
+
+    assert written == 2
+    assert rows == [
+        ["Торговая точка", "ИНН", "Товар", "Адрес"],
+        ["Точка 1", "1", "Обувь", ""],
+        ["Точка 2", "2", "Одежда", "Москва"],
+    ]
+
+if __name__ == "__main__":
+    test_iter_xlsx_rows_matches_openpyxl()
+    test_write_violations_xlsx_maps_columns_by_name()
+    print("OK")
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta  # Add timedelta import
 import colorama
 from colorama import Fore, Style
 from logger_config import get_logger, log_exception
+from config_store import load_json, save_json, get_thumbprint_map, TOKENS_FILE, CERTIFICATES_FILE
 
 # Initialize colorama
 colorama.init(autoreset=True)
@@ -22,16 +23,13 @@ def mask_token(token, visible_chars=4):
 def load_tokens_file():
     """Load tokens from JSON file"""
     try:
-        file_path = 'true_api_tokens.json'
-        if not os.path.exists(file_path):
+        data = load_json(TOKENS_FILE)
+        if data is None:
             return {
                 "tokens": {},
                 "generated_at": datetime.now().isoformat()
             }
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
+        return data
     except Exception as e:
         token_logger.error(f"Ошибка при загрузке токенов: {str(e)}")
         return {
@@ -42,9 +40,7 @@ def load_tokens_file():
 def save_tokens_file(data):
     """Save tokens to JSON file"""
     try:
-        file_path = 'true_api_tokens.json'
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        save_json(TOKENS_FILE, data)
         return True
     except Exception as e:
         token_logger.error(f"Ошибка при сохранении токенов: {str(e)}")
@@ -78,15 +74,12 @@ def save_tokens(tokens):
 def load_certificates_file():
     """Load certificates from JSON file"""
     try:
-        file_path = 'certificates.json'
-        if not os.path.exists(file_path):
+        data = load_json(CERTIFICATES_FILE)
+        if data is None:
             return {
                 "certificates": []
             }
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
+        return data
     except Exception as e:
         token_logger.error(f"Ошибка при загрузке сертификатов: {str(e)}")
         return {
@@ -96,9 +89,7 @@ def load_certificates_file():
 def save_certificates_file(data):
     """Save certificates to JSON file"""
     try:
-        file_path = 'certificates.json'
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        save_json(CERTIFICATES_FILE, data)
         return True
     except Exception as e:
         token_logger.error(f"Ошибка при сохранении сертификатов: {str(e)}")
@@ -433,12 +424,8 @@ def view_certificates():
     # Load thumbprints
     thumbprints = load_thumbprints_file()
     
-    # Load certificate names
-    cert_data = load_certificates_file()
-    certificates = cert_data.get('certificates', [])
-    
-    # Create mapping of thumbprint to certificate object
-    cert_map = {cert.get('thumbprint'): cert for cert in certificates if cert.get('thumbprint')}
+    # Certificate entries by thumbprint, cached by config_store
+    cert_map = get_thumbprint_map()
     
     print(f"\n{Fore.CYAN}=== Доступные сертификаты ===\n")
     
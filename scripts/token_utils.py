@@ -2,8 +2,6 @@
 Utility functions for token management
 """
 
-import os
-import json
 import datetime
 import jwt
 from typing import Dict, List, Tuple, Optional, Any
@@ -11,6 +9,7 @@ import colorama
 from colorama import Fore
 import logging
 from logger_config import get_logger, log_exception
+from config_store import load_json, save_json, get_tc_region_map, TOKENS_FILE, REGIONS_FILE
 import random
 
 # Initialize colorama
@@ -29,14 +28,11 @@ def load_tokens() -> List[Tuple[str, str]]:
         List of tuples containing certificate IDs and tokens
     """
     try:
-        with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            tokens = [(cert_id, token) for cert_id, token in data.get('tokens', {}).items()]
-            tokens_logger.info(f"Loaded {len(tokens)} tokens from true_api_tokens.json")
-            return tokens
-    except FileNotFoundError:
-        tokens_logger.error("File true_api_tokens.json not found")
-        return []
+        data = load_json(TOKENS_FILE)
+        if data is None:
+            tokens_logger.error("File true_api_tokens.json not found")
+            return []
+        return list(data.get('tokens', {}).items())
     except Exception as e:
         log_exception(tokens_logger, e, "Error loading tokens")
         return []
@@ -88,11 +84,10 @@ def save_tokens(tokens_dict: Dict[str, str]) -> bool:
         True if saved successfully, False otherwise
     """
     try:
-        with open('true_api_tokens.json', 'w', encoding='utf-8') as f:
-            json.dump({
-                'tokens': tokens_dict,
-                'generated_at': datetime.datetime.now().isoformat()
-            }, f, indent=2, ensure_ascii=False)
+        save_json(TOKENS_FILE, {
+            'tokens': tokens_dict,
+            'generated_at': datetime.datetime.now().isoformat()
+        })
         
         tokens_logger.info(f"Saved {len(tokens_dict)} tokens to true_api_tokens.json")
         return True
@@ -144,6 +139,14 @@ def is_token_valid(token: str) -> bool:
     except Exception:
         return False
 
+def get_token_inn(token: str) -> Optional[str]:
+    """Get the participant INN a token was issued for, None if the token has no INN"""
+    try:
+        inn = jwt.decode(token, options={"verify_signature": False}).get('inn')
+        return str(inn) if inn else None
+    except Exception:
+        return None
+
 def get_token_info(token: str) -> Dict[str, Any]:
     """Get information from token"""
     try:
@@ -177,24 +180,13 @@ def update_token(cert_name, token):
     Update a specific token in the JSON file
     """
     try:
-        tokens = {}
-        if os.path.exists('true_api_tokens.json'):
-            with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                tokens = data.get('tokens', {})
-        
+        tokens = load_json(TOKENS_FILE, {}).get('tokens', {})
         tokens[cert_name] = token
         
-        with open('true_api_tokens.json', 'w', encoding='utf-8') as f:
-            json.dump(
-                {
-                    "tokens": tokens,
-                    "generated_at": datetime.datetime.now().isoformat()
-                }, 
-                f, 
-                indent=2,
-                ensure_ascii=False
-            )
+        save_json(TOKENS_FILE, {
+            "tokens": tokens,
+            "generated_at": datetime.datetime.now().isoformat()
+        })
         return True
     except Exception as e:
         print(f"{Fore.RED}Error updating token: {str(e)}")
@@ -205,10 +197,9 @@ def display_all_tokens_info():
     Display information about all available tokens.
     """
     try:
-        if os.path.exists('true_api_tokens.json'):
-            with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-                tokens_data = json.load(f)
-                tokens = tokens_data.get('tokens', {})
+        tokens_data = load_json(TOKENS_FILE)
+        if tokens_data is not None:
+            tokens = tokens_data.get('tokens', {})
                 
             if not tokens:
                 print(f"{Fore.YELLOW}No tokens found in token file.")
@@ -260,12 +251,10 @@ def is_token_expired(token_data):
 def get_token_status():
     """Get status of tokens (valid, expired, etc.)"""
     try:
-        if not os.path.exists('true_api_tokens.json'):
+        data = load_json(TOKENS_FILE)
+        if data is None:
             return {"status": "missing", "message": "Token file not found"}
             
-        with open('true_api_tokens.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
         # Check if we have tokens and when they were generated
         if 'tokens' not in data or not data['tokens']:
             return {"status": "empty", "message": "No tokens found"}
@@ -299,31 +288,22 @@ def get_token_status():
 def load_regions_mapping():
     """Load the mapping of regions to TCs from regions.json"""
     try:
-        if not os.path.exists('regions.json'):
+        regions = load_json(REGIONS_FILE)
+        if regions is None:
             logger.warning("regions.json file not found")
             return {}
-            
-        with open('regions.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return regions
     except Exception as e:
         logger.error(f"Error loading regions mapping: {e}")
         return {}
 
 def get_tc_to_region_mapping():
     """Create a reverse mapping of TC to region"""
-    regions = load_regions_mapping()
-    tc_to_region = {}
-    
-    for region, tc_list in regions.items():
-        for tc in tc_list:
-            tc_to_region[tc] = region
-            
-    return tc_to_region
+    return dict(get_tc_region_map())
 
 def get_region_for_tc(tc_name):
     """Get the region for a specific TC"""
-    tc_to_region = get_tc_to_region_mapping()
-    return tc_to_region.get(tc_name, "Неопределенный регион")
+    return get_tc_region_map().get(tc_name, "Неопределенный регион")
 
 def group_violations_by_region(all_violations):
     """
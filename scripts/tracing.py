@@ -0,0 +1,218 @@
+"""
+Tracing Module
+
+This module provides lightweight timing spans for the daily pipeline:
+
+    with trace_run("daily_process"):
+        with span("download_task", cert=cert_name, group=group_code, task=task_id):
+            ...
+
+Spans are recorded only while a run is traced; outside of trace_run() a span
+costs a single check. When the run finishes, its spans are written to
+logs/traces/<run>_<timestamp>.json in the Chrome Trace Event format (open the
+file in chrome://tracing or https://ui.perfetto.dev) and a table of the top
+time sinks (by self time, i.e. excluding nested spans) is logged.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from logger_config import get_logger, log_exception
+
+# Set up logger
+tracing_logger = get_logger("tracing")
+
+TRACE_DIR = os.path.join("logs", "traces")
+
+# Trace files kept in TRACE_DIR, older ones are removed
+MAX_TRACE_FILES = 30
+
+# Rows of the time sink summary
+SUMMARY_TOP = 15
+
+class Trace:
+    """Spans recorded during one traced run"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = datetime.now()
+        self.pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        stack = self._stack()
+        # Time of nested spans, subtracted to get the self time
+        frame = [0.0]
+        stack.append(frame)
+        start = self._now_us()
+        try:
+            yield
+        except BaseException as e:
+            attributes['error'] = type(e).__name__
+            raise
+        finally:
+            duration = self._now_us() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += duration
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "cat": name.split('.', 1)[0],
+                "ph": "X",
+                "ts": round(start, 1),
+                "dur": round(duration, 1),
+                "pid": self.pid,
+                "tid": thread.ident,
+                "args": {key: value for key, value in attributes.items() if value is not None},
+                "self": max(duration - frame[0], 0.0),
+            }
+            with self._lock:
+                self._events.append(event)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Events in Chrome Trace Event format"""
+        with self._lock:
+            events = [{key: value for key, value in event.items() if key != "self"} for event in self._events]
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}}
+        ] + [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return metadata + events
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Time per span name, largest self time first
+
+        Returns:
+            List of dictionaries with 'name', 'count', 'total_s', 'self_s' and 'max_s'
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for event in self._events:
+                entry = totals.setdefault(event["name"], {
+                    "name": event["name"], "count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0
+                })
+                entry["count"] += 1
+                entry["total_s"] += event["dur"] / 1e6
+                entry["self_s"] += event["self"] / 1e6
+                entry["max_s"] = max(entry["max_s"], event["dur"] / 1e6)
+        return sorted(totals.values(), key=lambda entry: entry["self_s"], reverse=True)
+
+    def format_summary(self, top: int = SUMMARY_TOP) -> str:
+        lines = [f"{'span':<28} {'count':>6} {'self, s':>10} {'total, s':>10} {'max, s':>9}"]
+        for entry in self.summary()[:top]:
+            lines.append(
+                f"{entry['name']:<28} {entry['count']:>6} {entry['self_s']:>10.2f} "
+                f"{entry['total_s']:>10.2f} {entry['max_s']:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def save(self, directory: str = TRACE_DIR) -> Optional[str]:
+        """
+        Write the trace file
+
+        Returns:
+            Path of the trace file, or None on error
+        """
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{self.name}_{self.started.strftime('%Y%m%d_%H%M%S')}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "traceEvents": self.events(),
+                    "displayTimeUnit": "ms",
+                    "otherData": {"run": self.name, "started": self.started.isoformat()},
+                }, f, ensure_ascii=False, default=str)
+            _prune_traces(directory)
+            return path
+        except Exception as e:
+            log_exception(tracing_logger, e, "Error saving trace")
+            return None
+
+_active: Optional[Trace] = None
+_active_lock = threading.Lock()
+
+def _prune_traces(directory: str) -> None:
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')),
+        key=os.path.getmtime
+    )
+    for path in files[:-MAX_TRACE_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def current_trace() -> Optional[Trace]:
+    """The trace being recorded, None outside of trace_run()"""
+    return _active
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span of the current trace
+
+    Args:
+        name: Span name, e.g. 'download_task'
+        **attributes: Values shown with the span (cert, group, task, ...);
+            None values are left out
+    """
+    trace = _active
+    if trace is None:
+        yield
+        return
+    with trace.span(name, **attributes):
+        yield
+
+@contextmanager
+def trace_run(name: str, **attributes):
+    """
+    Trace a pipeline run and write its trace file when it finishes
+
+    A run started while another one is traced is recorded as a span of it.
+
+    Args:
+        name: Run name, used in the file name
+        **attributes: Attributes of the top-level span
+    """
+    global _active
+    with _active_lock:
+        owner = _active is None
+        if owner:
+            _active = Trace(name)
+        trace = _active
+
+    try:
+        with trace.span(name, **attributes):
+            yield trace
+    finally:
+        if owner:
+            with _active_lock:
+                _active = None
+            path = trace.save()
+            tracing_logger.info(
+                f"Trace of {name} saved to {path}\nTop time sinks:\n{trace.format_summary()}"
+            )
@@ -0,0 +1,113 @@
+"""
+Violation Dates Module
+
+This module provides a persistent cache of what is known about the violation
+history of a participant (INN) in a product group:
+
+- the date of the first violation, so that 'all' periods and backfills start
+  at the earliest data instead of a 3-year default, without asking the API
+  again every time;
+- report windows verified to be empty, which backfills do not request again.
+
+Entries are kept in violation_dates_cache.json and expire after TTL_DAYS.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+from config_store import load_json, save_json
+
+CACHE_FILE = 'violation_dates_cache.json'
+
+# Days after which a cached date or empty window is checked again
+TTL_DAYS = 7
+
+class ViolationDatesCache:
+    """First violation dates and empty windows per (INN, product group)"""
+
+    def __init__(self, path: str = CACHE_FILE, ttl_days: float = TTL_DAYS):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _key(inn: str, group: int) -> str:
+        return f"{inn}:{int(group)}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = (load_json(self.path) or {}).get('entries', {})
+        return self._entries
+
+    def _fresh(self, checked_at: str) -> bool:
+        try:
+            return datetime.now() - datetime.fromisoformat(checked_at) < self.ttl
+        except (TypeError, ValueError):
+            return False
+
+    def _save(self) -> None:
+        # Expired records are dropped on every write
+        for key in list(self._entries):
+            entry = self._entries[key]
+            first_date = entry.get('first_date')
+            if first_date and not self._fresh(first_date.get('checked_at')):
+                del entry['first_date']
+            windows = entry.get('empty_windows', {})
+            for window in [window for window, checked_at in windows.items() if not self._fresh(checked_at)]:
+                del windows[window]
+            if not entry.get('first_date') and not windows:
+                del self._entries[key]
+        save_json(self.path, {'updated_at': datetime.now().isoformat(), 'entries': self._entries})
+
+    def lookup_first_date(self, inn: str, group: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached first violation date
+
+        Returns:
+            Dictionary with 'date' (YYYY-MM-DD, or None when the API reported
+            no violations) and 'checked_at', or None if nothing fresh is cached
+        """
+        with self._lock:
+            entry = self._load().get(self._key(inn, group), {}).get('first_date')
+            if entry and self._fresh(entry.get('checked_at')):
+                return dict(entry)
+            return None
+
+    def set_first_date(self, inn: str, group: int, date: Optional[str]) -> None:
+        """Cache the first violation date (None: the API reported no violations)"""
+        with self._lock:
+            entry = self._load().setdefault(self._key(inn, group), {})
+            entry['first_date'] = {'date': date, 'checked_at': datetime.now().isoformat()}
+            self._save()
+
+    def empty_windows(self, inn: str, group: int) -> Set[Tuple[str, str]]:
+        """Windows (start, end) verified to have no violations"""
+        with self._lock:
+            windows = self._load().get(self._key(inn, group), {}).get('empty_windows', {})
+            return {
+                tuple(window.split('|', 1)) for window, checked_at in windows.items() if self._fresh(checked_at)
+            }
+
+    def add_empty_window(self, inn: str, group: int, start_date: str, end_date: str) -> None:
+        """Remember that a window has no violations"""
+        with self._lock:
+            entry = self._load().setdefault(self._key(inn, group), {})
+            entry.setdefault('empty_windows', {})[f"{start_date}|{end_date}"] = datetime.now().isoformat()
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+_cache: Optional[ViolationDatesCache] = None
+_cache_lock = threading.Lock()
+
+def get_violation_dates_cache() -> ViolationDatesCache:
+    """Get the process-wide violation dates cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ViolationDatesCache()
+        return _cache
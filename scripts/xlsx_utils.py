@@ -0,0 +1,618 @@
+"""
+XLSX Utilities Module
+
+This module provides streaming helpers for Excel files built from the
+violation CSVs downloaded from ЦРПТ. Rows are read one at a time and written
+with xlsxwriter in constant-memory mode, so the size of a region does not
+affect memory usage.
+
+Excel reports are read straight from the sheet XML of the package: rows are
+counted from the sheet dimension (count_xlsx_rows) and streamed with an
+incremental XML parser (iter_xlsx_rows), without building a DataFrame or an
+openpyxl workbook.
+
+CSV members of ZIP exports are read straight from the archive (open_report),
+several members in parallel (map_zip_members), without extracting them to disk.
+"""
+
+import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from xml.etree.ElementTree import fromstring, iterparse
+from logger_config import get_logger, log_exception
+
+# Set up logger
+reports_logger = get_logger("reports")
+
+# Excel limit is 1 048 576 rows per sheet, one row is taken by the header
+MAX_SHEET_ROWS = 1048575
+
+CSV_ENCODINGS = ['utf-8-sig', 'cp1251']
+
+# Members of a ZIP export read at the same time
+ZIP_WORKERS = 4
+
+# Bytes from the beginning of a report used to detect its encoding and separator
+HEAD_BYTES = 1024 * 1024
+CSV_SEPARATORS = [';', ',', '\t', '|']
+
+# Worksheet parts of an XLSX package, xl/worksheets/sheet<N>.xml
+SHEET_MEMBER_PATTERN = re.compile(r'^xl/worksheets/sheet(\d+)\.xml$')
+# <dimension ref="A1:M500001"/>, written before the sheet data
+DIMENSION_PATTERN = re.compile(rb'<(?:\w+:)?dimension\s+ref="[A-Z]+(\d+):([A-Z]+)(\d+)"')
+ROW_TAG_PATTERN = re.compile(rb'<(?:\w+:)?row[\s>]')
+SHEET_DATA_TAG = b'sheetData'
+XML_CHUNK_SIZE = 1024 * 1024
+
+SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+# Built-in number formats that display dates and times
+DATE_FORMAT_IDS = set(range(14, 23)) | {45, 46, 47}
+# Date and time codes of a custom number format, after quoted text and [...] sections are removed
+DATE_CODE_PATTERN = re.compile(r'[dmyhs]', re.IGNORECASE)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# violations_group{code}_{date_info}_{YYYYMMDD}_{HHMMSS}.csv (or .xlsx)
+REPORT_FILE_PATTERN = re.compile(r'^violations_group(\d+)_(.*)_(\d{8})_(\d{6})\.(?:csv|xlsx)$')
+
+def find_report_csvs(cert_name: str, report_date: str, base_dir: str = 'output') -> List[str]:
+    """
+    Find report files (CSV or Excel) downloaded for a certificate's daily report
+
+    Reports for a date are downloaded on the following day, so a file belongs
+    to the report if its period starts with the report date or, when the
+    period is missing from the name, if it was downloaded the next day.
+
+    Args:
+        cert_name: Certificate directory name
+        report_date: Report date in YYYY-MM-DD format
+        base_dir: Base output directory
+
+    Returns:
+        Sorted list of report file paths
+    """
+    reports_dir = os.path.join(base_dir, cert_name, 'reports')
+    if not os.path.isdir(reports_dir):
+        return []
+
+    try:
+        download_day = (datetime.strptime(report_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y%m%d')
+    except ValueError:
+        reports_logger.warning(f"Invalid report date: {report_date}")
+        return []
+
+    files = []
+    for filename in os.listdir(reports_dir):
+        match = REPORT_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        date_info, downloaded = match.group(2), match.group(3)
+        if date_info.startswith(report_date) or (not date_info and downloaded == download_day):
+            files.append(os.path.join(reports_dir, filename))
+
+    return sorted(files)
+
+def zip_csv_members(file_path: str) -> List[str]:
+    """CSV members of a ZIP export in archive order"""
+    with zipfile.ZipFile(file_path) as archive:
+        return [
+            info.filename for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.csv')
+        ]
+
+@contextmanager
+def open_report(file_path: str, member: Optional[str] = None, encoding: Optional[str] = None) -> Iterator[IO]:
+    """
+    Open a report file or a member of a ZIP export without extracting it
+
+    The member is decompressed while it is read, so a large archive never
+    touches the disk a second time.
+
+    Args:
+        file_path: Path to the file
+        member: Name of the member inside the archive (None: the file itself)
+        encoding: Text encoding; None opens a binary stream
+
+    Yields:
+        Binary or text file object
+    """
+    if member is None:
+        if encoding is None:
+            with open(file_path, 'rb') as f:
+                yield f
+        else:
+            with open(file_path, 'r', encoding=encoding, newline='') as f:
+                yield f
+        return
+
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(member) as stream:
+            yield stream if encoding is None else io.TextIOWrapper(stream, encoding=encoding, newline='')
+
+def map_zip_members(file_path: str, func: Callable[[str, str], Any], members: Optional[List[str]] = None,
+                    max_workers: int = ZIP_WORKERS) -> List[Any]:
+    """
+    Apply func(file_path, member) to CSV members of a ZIP export in parallel
+
+    Every call opens the archive on its own, so members are decompressed and
+    parsed independently of each other.
+
+    Args:
+        file_path: Path to the archive
+        func: Function reading one member
+        members: Members to read (all CSV members by default)
+        max_workers: Maximum number of members read at the same time
+
+    Returns:
+        Results of func in member order
+    """
+    members = zip_csv_members(file_path) if members is None else members
+    if len(members) <= 1 or max_workers <= 1:
+        return [func(file_path, member) for member in members]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(members)), thread_name_prefix="zip-member") as executor:
+        return list(executor.map(lambda member: func(file_path, member), members))
+
+def read_report_head(file_path: str, member: Optional[str] = None, size: int = HEAD_BYTES) -> bytes:
+    """First bytes of a report file or of a member of a ZIP export"""
+    with open_report(file_path, member) as f:
+        return f.read(size)
+
+def sniff_csv_format(head: bytes, encodings: Sequence[str]) -> Tuple[List[str], Optional[str]]:
+    """
+    Detect the encoding and separator of a CSV from its beginning
+
+    Args:
+        head: First bytes of the file (see read_report_head)
+        encodings: Candidate encodings, most likely first
+
+    Returns:
+        Candidates that decode the head, in the given order, and the separator
+        found in the header line (None if the line has none)
+    """
+    if len(head) >= HEAD_BYTES:
+        # A multi-byte character may be cut at the end of the head
+        head = head[:head.rfind(b'\n') + 1] or head
+    decoded = []
+    first_line = None
+    for encoding in dict.fromkeys(encodings):
+        try:
+            text = head.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        decoded.append(encoding)
+        if first_line is None:
+            first_line = text.split('\n', 1)[0]
+    if first_line is None:
+        return [], None
+    separator = max(CSV_SEPARATORS, key=first_line.count)
+    return decoded, separator if first_line.count(separator) else None
+
+@contextmanager
+def _open_csv_text(file_path: str, encoding: str) -> Iterator[io.TextIOBase]:
+    """Open a report as text, reading the first CSV member if it is a ZIP archive"""
+    member = None
+    if zipfile.is_zipfile(file_path):
+        members = zip_csv_members(file_path)
+        if not members:
+            raise ValueError(f"No CSV files in archive {file_path}")
+        member = members[0]
+    with open_report(file_path, member, encoding) as f:
+        yield f
+
+def _detect_csv_format(file_path: str) -> Tuple[str, str]:
+    """Detect encoding and delimiter from the beginning of a report"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            with _open_csv_text(file_path, encoding) as f:
+                sample = f.read(64 * 1024)
+        except UnicodeDecodeError:
+            continue
+        first_line = sample.split('\n', 1)[0]
+        delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+        return encoding, delimiter
+    raise ValueError(f"Could not detect encoding of {file_path}")
+
+def iter_csv_rows(file_path: str) -> Iterator[List[str]]:
+    """
+    Iterate over rows of a downloaded report without loading it into memory
+
+    Args:
+        file_path: Path to a CSV file or a ZIP archive with a CSV inside
+
+    Yields:
+        Rows as lists of strings, header first
+    """
+    encoding, delimiter = _detect_csv_format(file_path)
+    with _open_csv_text(file_path, encoding) as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+def _sheet_members(archive: zipfile.ZipFile) -> List[str]:
+    """Worksheet parts of an XLSX package in sheet order"""
+    members = [(int(match.group(1)), name) for name in archive.namelist()
+               for match in [SHEET_MEMBER_PATTERN.match(name)] if match]
+    return [name for _, name in sorted(members)]
+
+def _read_dimension(head: bytes) -> Optional[Tuple[int, int, int]]:
+    """First row, last row and last column (1-based) of the used range, if the sheet head has one"""
+    # The dimension element precedes the sheet data and gives the used range
+    # (what openpyxl reports as max_row and max_column) without reading the rows
+    match = DIMENSION_PATTERN.search(head.split(SHEET_DATA_TAG, 1)[0])
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(3)), _column_index(match.group(2).decode()) + 1
+
+def _count_sheet_rows(archive: zipfile.ZipFile, member: str) -> int:
+    """Rows of one worksheet, header included"""
+    with archive.open(member) as stream:
+        head = stream.read(64 * 1024)
+        dimension = _read_dimension(head)
+        if dimension:
+            return dimension[1] - dimension[0] + 1
+
+        # Some writers leave the dimension out or set it to "A1": count the row elements
+        count = 0
+        tail = b''
+        chunk = head
+        while chunk:
+            data = tail + chunk
+            count += len(ROW_TAG_PATTERN.findall(data))
+            # A tag split between chunks is found in the next one, a tag that
+            # ends the kept tail was counted already
+            tail = data[-16:]
+            count -= len(ROW_TAG_PATTERN.findall(tail))
+            chunk = stream.read(XML_CHUNK_SIZE)
+        return count + len(ROW_TAG_PATTERN.findall(tail))
+
+def count_xlsx_rows(file_path: str) -> int:
+    """
+    Count data rows of an Excel report without loading it
+
+    Every sheet is expected to start with a header row, the way the reports
+    and workbooks of this module are written; rows of all sheets are summed.
+    Legacy .xls files, which are not ZIP packages, are read with pandas.
+
+    Args:
+        file_path: Path to the workbook
+
+    Returns:
+        int: Number of rows without headers
+    """
+    if not zipfile.is_zipfile(file_path):
+        import pandas as pd  # Imported on use: only legacy .xls files need it
+        return len(pd.read_excel(file_path))
+
+    with zipfile.ZipFile(file_path) as archive:
+        return sum(max(0, _count_sheet_rows(archive, member) - 1) for member in _sheet_members(archive))
+
+def _shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    try:
+        stream = archive.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with stream:
+        for _, element in iterparse(stream):
+            if element.tag == f'{SPREADSHEET_NS}si':
+                strings.append(''.join(text.text or '' for text in element.iter(f'{SPREADSHEET_NS}t')))
+                element.clear()
+    return strings
+
+def _date_styles(archive: zipfile.ZipFile) -> Set[int]:
+    """Indexes of cell formats (the s attribute of a cell) that display dates"""
+    try:
+        root = fromstring(archive.read('xl/styles.xml'))
+    except KeyError:
+        return set()
+    custom = {int(fmt.get('numFmtId')): fmt.get('formatCode', '') for fmt in root.iter(f'{SPREADSHEET_NS}numFmt')}
+    cell_formats = root.find(f'{SPREADSHEET_NS}cellXfs')
+    styles = set()
+    for index, cell_format in enumerate(cell_formats if cell_formats is not None else []):
+        format_id = int(cell_format.get('numFmtId', 0))
+        code = re.sub(r'"[^"]*"|\[[^\]]*\]', '', custom.get(format_id, ''))
+        if format_id in DATE_FORMAT_IDS or DATE_CODE_PATTERN.search(code):
+            styles.add(index)
+    return styles
+
+def _column_index(reference: str) -> int:
+    """Zero-based column of a cell reference such as 'AB12'"""
+    index = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+def _iter_sheet_rows(archive: zipfile.ZipFile, member: str, shared: List[str],
+                     date_styles: Set[int]) -> Iterator[List[str]]:
+    """
+    Rows of one worksheet the way openpyxl reads them in read-only mode
+
+    Rows and cells left out of the XML come back empty, and rows are padded
+    to the width of the sheet dimension (cells beyond it are dropped).
+    """
+    cell_tag, row_tag = f'{SPREADSHEET_NS}c', f'{SPREADSHEET_NS}row'
+    value_tag, text_tag = f'{SPREADSHEET_NS}v', f'{SPREADSHEET_NS}t'
+    sheet_data_tag = f'{SPREADSHEET_NS}sheetData'
+
+    with archive.open(member) as stream:
+        dimension = _read_dimension(stream.read(64 * 1024))
+    max_row, width = (dimension[1], dimension[2]) if dimension else (None, 0)
+
+    with archive.open(member) as stream:
+        sheet_data = None
+        next_row = 1
+        for event, element in iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == sheet_data_tag:
+                    sheet_data = element
+                continue
+            if element.tag != row_tag:
+                continue
+
+            row_number = int(element.get('r') or next_row)
+            if max_row is not None and row_number > max_row:
+                break
+            while next_row < row_number:
+                # Empty rows are left out of the XML
+                yield [''] * width
+                next_row += 1
+
+            if row_number == next_row:
+                row = []
+                for cell in element.iter(cell_tag):
+                    reference = cell.get('r')
+                    if reference:
+                        # Empty cells are left out of the XML
+                        row.extend([''] * (_column_index(reference) - len(row)))
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        row.append(''.join(text.text or '' for text in cell.iter(text_tag)))
+                        continue
+                    value = cell.findtext(value_tag) or ''
+                    if kind == 's':
+                        value = shared[int(value)] if value else ''
+                    elif kind == 'b':
+                        value = 'True' if value == '1' else 'False'
+                    elif kind in (None, 'n') and value and int(cell.get('s', 0)) in date_styles:
+                        value = str(EXCEL_EPOCH + timedelta(seconds=round(float(value) * 86400)))
+                    row.append(value)
+                if width:
+                    row = row[:width] + [''] * (width - len(row))
+                yield row
+                next_row += 1
+            # Rows already read are dropped, so memory does not grow with the sheet
+            if sheet_data is not None:
+                sheet_data.clear()
+
+def iter_xlsx_rows(file_path: str) -> Iterator[List[str]]:
+    """
+    Iterate over rows of an Excel report without loading it into memory
+
+    The worksheet XML is parsed incrementally; shared strings and date
+    formats are resolved, other numbers are returned as written in the file.
+    Values match openpyxl read-only values converted to strings.
+    Sheets are read one after another and the header of a continuation sheet
+    is skipped when it repeats the first one.
+
+    Args:
+        file_path: Path to the workbook
+
+    Yields:
+        Rows as lists of strings, header first
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        shared = _shared_strings(archive)
+        date_styles = _date_styles(archive)
+        header = None
+        for member in _sheet_members(archive):
+            for index, row in enumerate(_iter_sheet_rows(archive, member, shared, date_styles)):
+                if index == 0:
+                    if header is not None and row == header:
+                        continue
+                    header = header or row
+                yield row
+
+def iter_report_rows(file_path: str) -> Iterator[List[str]]:
+    """Iterate over rows of a CSV, ZIP or XLSX report, header first"""
+    if file_path.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_xlsx_rows(file_path)
+    return iter_csv_rows(file_path)
+
+def write_rows_xlsx(output_path: str, rows: Iterable[Sequence], header: Optional[Sequence] = None,
+                    sheet_name: str = "Нарушения") -> int:
+    """
+    Write rows into a workbook in constant-memory mode
+
+    Every row is flushed to disk as soon as the next one is written. A new
+    sheet with the same header is started whenever the Excel row limit is
+    reached. Empty rows are skipped.
+
+    Args:
+        output_path: Path of the workbook to create
+        rows: Data rows
+        header: Header row; when None the first row of rows is used
+        sheet_name: Name of the first sheet, further sheets get a number
+
+    Returns:
+        int: Number of data rows written
+
+    Raises:
+        ImportError: if xlsxwriter is not installed
+    """
+    import xlsxwriter
+
+    rows = iter(rows)
+    if header is None:
+        header = next(rows, [])
+
+    workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#f2f2f2'})
+    sheet = None
+    sheet_rows = 0
+    sheet_count = 0
+    total_rows = 0
+
+    def new_sheet():
+        nonlocal sheet, sheet_rows, sheet_count
+        sheet_count += 1
+        sheet = workbook.add_worksheet(sheet_name if sheet_count == 1 else f"{sheet_name} {sheet_count}")
+        sheet.write_row(0, 0, list(header), header_format)
+        sheet_rows = 0
+
+    try:
+        new_sheet()
+        for row in rows:
+            if not row:
+                continue
+            if sheet_rows >= MAX_SHEET_ROWS:
+                new_sheet()
+            sheet_rows += 1
+            sheet.write_row(sheet_rows, 0, row)
+            total_rows += 1
+    finally:
+        workbook.close()
+
+    return total_rows
+
+def _column_keys(header: Sequence[str]) -> List[Tuple[str, int]]:
+    """Column names with the number of the occurrence, so repeated names stay distinct"""
+    seen = defaultdict(int)
+    keys = []
+    for name in header:
+        keys.append((name, seen[name]))
+        seen[name] += 1
+    return keys
+
+def read_report_header(file_path: str) -> Optional[List[str]]:
+    """Header row of a CSV, ZIP or XLSX report, None for an empty report"""
+    rows = iter_report_rows(file_path)
+    try:
+        return next(rows, None)
+    finally:
+        rows.close()
+
+def write_violations_xlsx(cert_files: Dict[str, List[str]], output_path: str) -> int:
+    """
+    Write detailed violation rows of several certificates into one workbook
+
+    The workbook header joins the columns of all reports in the order they
+    first appear; rows are placed by column name, so reports with different
+    or reordered columns do not shift values into foreign columns.
+
+    Args:
+        cert_files: Dictionary mapping certificate name to its report files (CSV, ZIP or XLSX)
+        output_path: Path of the workbook to create
+
+    Returns:
+        int: Number of data rows written
+
+    Raises:
+        ImportError: if xlsxwriter is not installed
+    """
+    headers = {}
+    columns = {}
+    for files in cert_files.values():
+        for file_path in files:
+            if file_path in headers:
+                continue
+            try:
+                header = read_report_header(file_path)
+            except Exception as e:
+                log_exception(reports_logger, e, f"Error reading header of {file_path}")
+                continue
+            if header is not None:
+                headers[file_path] = header
+                for key in _column_keys(header):
+                    columns.setdefault(key, len(columns))
+
+    def violation_rows():
+        for cert_name, files in cert_files.items():
+            for file_path in files:
+                if file_path not in headers:
+                    continue
+                positions = [columns[key] for key in _column_keys(headers[file_path])]
+                same_layout = positions == list(range(len(positions)))
+                try:
+                    rows = iter_report_rows(file_path)
+                    next(rows, None)
+                    for row in rows:
+                        if not any(row):
+                            continue
+                        if same_layout:
+                            yield [cert_name] + row
+                            continue
+                        values = [''] * len(columns)
+                        for position, value in zip(positions, row):
+                            values[position] = value
+                        yield [cert_name] + values
+                except Exception as e:
+                    log_exception(reports_logger, e, f"Error adding {file_path} to workbook")
+
+    return write_rows_xlsx(output_path, violation_rows(), ["Торговая точка"] + [name for name, _ in columns])
+
+def build_xlsx_attachment(cert_files: Dict[str, List[str]], base_name: str,
+                          max_bytes: int) -> Optional[Tuple[str, bytes]]:
+    """
+    Build an XLSX attachment, zipping it when it exceeds the size cap
+
+    Args:
+        cert_files: Dictionary mapping certificate name to its report files
+        base_name: Attachment file name without extension
+        max_bytes: Maximum attachment size in bytes
+
+    Returns:
+        Tuple (filename, content) or None if there is nothing to attach or
+        the attachment is too large even after compression
+    """
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        reports_logger.warning("xlsxwriter is not installed, XLSX attachments are disabled")
+        return None
+
+    temp_dir = tempfile.mkdtemp(prefix='xlsx_attachment_')
+    xlsx_name = f"{base_name}.xlsx"
+    xlsx_path = os.path.join(temp_dir, xlsx_name)
+
+    try:
+        rows = write_violations_xlsx(cert_files, xlsx_path)
+        if rows == 0:
+            reports_logger.info(f"No violation rows for {base_name}, attachment skipped")
+            return None
+
+        size = os.path.getsize(xlsx_path)
+        if size <= max_bytes:
+            reports_logger.info(f"Built attachment {xlsx_name}: {rows} rows, {size} bytes")
+            with open(xlsx_path, 'rb') as f:
+                return xlsx_name, f.read()
+
+        zip_name = f"{base_name}.zip"
+        zip_path = os.path.join(temp_dir, zip_name)
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            archive.write(xlsx_path, xlsx_name)
+
+        zip_size = os.path.getsize(zip_path)
+        if zip_size > max_bytes:
+            reports_logger.warning(
+                f"Attachment {base_name} is too large ({zip_size} bytes compressed, "
+                f"limit {max_bytes}), skipping it"
+            )
+            return None
+
+        reports_logger.info(f"Built compressed attachment {zip_name}: {rows} rows, {size} -> {zip_size} bytes")
+        with open(zip_path, 'rb') as f:
+            return zip_name, f.read()
+
+    except Exception as e:
+        log_exception(reports_logger, e, f"Error building attachment {base_name}")
+        return None
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)